@@ -1,6 +1,10 @@
 from flask import Flask, request, jsonify, render_template_string
 from graphene import Schema
 from schema import Query, Mutation
+from cache_graphql import CacheDocumentos
+from cargadores import contexto_peticion
+from respuesta_json import respuesta_json
+from servidor import precargar_modelos, estado_preparacion, es_lider
 import os
 from dotenv import load_dotenv
 from db.connection import init_db  # Agregado
@@ -16,6 +20,7 @@ CORS(app, resources={r"/graphql": {"origins": "http://localhost:4200"}})
 
 # Crear el esquema de GraphQL
 schema = Schema(query=Query, mutation=Mutation)
+cache_documentos = CacheDocumentos(schema)
 
 # HTML simple para usar GraphiQL (interfaz web)
 GRAPHIQL_TEMPLATE = """
@@ -54,37 +59,72 @@ def graphiql_view():
 
 @app.route("/graphql", methods=["POST"])
 def graphql_api():
-    data = request.get_json()
-    result = schema.execute(
-        data.get("query"),
-        variables=data.get("variables")
-    )
+    data = request.get_json(silent=True) or {}
+    # Documentos analizados y validados una sola vez; admite consultas persistidas (solo el hash)
+    # Cargadores de la petición: las predicciones de todo el documento se agrupan en lotes
+    result = cache_documentos.ejecutar(data, context_value=contexto_peticion())
 
     response = {}
     if result.errors:
         print("❌ Errores en GraphQL:", result.errors)
-        response["errors"] = [str(e) for e in result.errors]
+        # Formato estándar ({message, locations, path, extensions}): los clientes de Apollo
+        # reconocen así PersistedQueryNotFound y reenvían la consulta completa
+        response["errors"] = [e.formatted for e in result.errors]
 
     response["data"] = result.data
-    return jsonify(response)
+    # orjson directo a bytes; las respuestas grandes se envían por partes
+    return respuesta_json(response)
+
+@app.route("/graphql/estadisticas", methods=["GET"])
+def estadisticas_graphql():
+    return jsonify(cache_documentos.estadisticas())
+
+@app.route("/salud", methods=["GET"])
+def salud():
+    # El proceso responde (liveness)
+    return jsonify({"ok": True})
+
+@app.route("/listo", methods=["GET"])
+def listo():
+    # Modelos cargados y BD accesible (readiness): hasta entonces el balanceador no envía tráfico
+    estado = estado_preparacion()
+    return jsonify(estado), 200 if estado["listo"] else 503
 
 from apscheduler.schedulers.background import BackgroundScheduler
-from ml.model import entrenar_modelo_con_datos
+from ml.trabajos import encolar_entrenamiento
 
 def entrenar_modelo_diariamente():
+    # Todos los workers tienen el planificador, pero solo el líder entrena
+    if not es_lider():
+        print("⏭️ Entrenamiento automático omitido: otro proceso es el líder del planificador")
+        return
     print("🧠 Entrenando modelo automáticamente...")
     try:
-        resultado = entrenar_modelo_con_datos()
-        print(f"✅ Entrenamiento completado automáticamente: {resultado}")
+        # Se ejecuta en el mismo pool de procesos que los entrenamientos lanzados desde GraphQL.
+        # Solo procesa los triajes nuevos; cada ML_REENTRENO_COMPLETO_CADA noches se reentrena desde cero.
+        id_trabajo = encolar_entrenamiento("infarto", incremental=True)
+        print(f"✅ Entrenamiento automático encolado (trabajo {id_trabajo})")
     except Exception as e:
         print(f"❌ Error durante el entrenamiento automático: {str(e)}")
 
 scheduler = BackgroundScheduler()
 scheduler.add_job(entrenar_modelo_diariamente, 'cron', hour=2, minute=0)
-scheduler.start()
+
+def iniciar_planificador():
+    """
+    Arranca el planificador en este proceso. No se hace al importar: con gunicorn el
+    módulo se importa en el maestro antes del fork y los hilos no pasan a los workers.
+    """
+    if not scheduler.running:
+        scheduler.start()
+    if es_lider():
+        print(f"👑 El proceso {os.getpid()} ejecuta los entrenamientos programados")
 
 if __name__ == "__main__":
+    # Servidor de desarrollo; en producción: gunicorn -c gunicorn.conf.py
     init_db()
+    precargar_modelos()
+    iniciar_planificador()
     port = int(os.getenv("PORT", 5000))
     print(f"🚀 Servidor ML corriendo en http://localhost:{port}/graphql")
     app.run(debug=True, port=port)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga de los datos de entrenamiento: db.query(TriajeML).all() + lista
+de diccionarios + DataFrame frente al cargador con proyección de columnas a NumPy.
+Usa una BD SQLite temporal.
+Ejecuta: python benchmarks/bench_carga_datos.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+_directorio = tempfile.mkdtemp(prefix="bench_carga_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directorio, 'bench.db')}"
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+from db.connection import SessionLocal, init_db, engine
+from db.bulk import insertar_ignorando_duplicados
+from ml.model import TriajeML, COLUMNAS_SIGNOS
+from ml.cargador_datos import cargar_triajes
+
+FILAS = 200_000
+
+
+def poblar(n):
+    rng = np.random.default_rng(0)
+    signos = rng.uniform([35.5, 50, 12, 80, 45, 1.45], [41, 150, 32, 100, 130, 1.95], (n, 6))
+    filas = [
+        {
+            "id_triaje": i + 1, "nombre_paciente": f"Paciente_{i + 1}",
+            **dict(zip(COLUMNAS_SIGNOS, s)),
+            "alergias": "Ninguna conocida", "enfermedades_cronicas": "Hipertensión arterial",
+            "motivo_consulta": "Dolor torácico de varias horas de evolución", "sufre_infarto": bool(i % 2),
+        }
+        for i, s in enumerate(signos.tolist())
+    ]
+    db = SessionLocal()
+    insertar_ignorando_duplicados(db, TriajeML.__table__, filas, claves=["id_triaje"])
+    db.commit()
+    db.close()
+
+
+def carga_orm():
+    db = SessionLocal()
+    registros = db.query(TriajeML).all()
+    df = pd.DataFrame([{
+        **{c: getattr(r, c) for c in COLUMNAS_SIGNOS},
+        "sufre_infarto": int(r.sufre_infarto),
+    } for r in registros])
+    db.close()
+    return df
+
+
+def carga_numpy():
+    return cargar_triajes(con_etiqueta=True, como_dataframe=True)
+
+
+def medir(nombre, funcion):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    df = funcion()
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"   {nombre:<22} {segundos:7.2f} s {pico / 2**20:9.1f} MB pico")
+    return df
+
+
+def main():
+    engine.echo = False
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+    init_db()
+    poblar(FILAS)
+
+    print(f"📊 Carga de {FILAS} triajes para entrenamiento")
+    df_orm = medir("ORM + DataFrame", carga_orm)
+    df_numpy = medir("Core + NumPy", carga_numpy)
+    assert np.allclose(df_orm[COLUMNAS_SIGNOS].to_numpy(), df_numpy[COLUMNAS_SIGNOS].to_numpy())
+    assert (df_orm["sufre_infarto"].to_numpy() == df_numpy["sufre_infarto"].to_numpy()).all()
+
+
+if __name__ == "__main__":
+    main()
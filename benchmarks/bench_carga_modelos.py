@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark de carga de modelos: unpickle del .pkl de sklearn frente a los
+parámetros .npy mapeados en memoria del almacén de artefactos.
+Usa un almacén temporal importado de los .pkl versionados.
+Ejecuta: python benchmarks/bench_carga_modelos.py
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import timeit
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.append(RAIZ)
+
+os.environ["ML_DIR_ARTEFACTOS"] = tempfile.mkdtemp(prefix="bench_artefactos_")
+
+import joblib
+
+from ml import artefactos
+from ml.inferencia_numpy import PredictorInfartoNumpy, PredictorClustersNumpy
+
+MODELOS = {
+    "infarto": ("ml/model_infarto.pkl", PredictorInfartoNumpy),
+    "clusters": ("ml/model_clusters.pkl", PredictorClustersNumpy),
+}
+
+# Proceso nuevo: se mide desde antes de los imports hasta tener el predictor listo
+ARRANQUE_PKL = """
+import time; inicio = time.perf_counter()
+import joblib
+from ml.inferencia_numpy import {clase}
+{clase}.desde_sklearn(joblib.load({ruta!r}))
+print(time.perf_counter() - inicio)
+"""
+
+ARRANQUE_ARTEFACTO = """
+import time; inicio = time.perf_counter()
+from ml.artefactos import cargar_parametros
+from ml.inferencia_numpy import {clase}
+{clase}.desde_parametros(cargar_parametros({nombre!r})[0])
+print(time.perf_counter() - inicio)
+"""
+
+
+def arranque(codigo):
+    salida = subprocess.run(
+        [sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True, env=os.environ
+    )
+    return float(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    print("📊 Carga de modelos (predictor NumPy listo para predecir)")
+    for nombre, (ruta, clase) in MODELOS.items():
+        ruta = os.path.join(RAIZ, ruta)
+        artefactos.importar_pickle(nombre, ruta, lambda m: clase.desde_sklearn(m).parametros())
+
+        pkl = min(timeit.repeat(lambda: clase.desde_sklearn(joblib.load(ruta)), number=50, repeat=5)) / 50
+        npy = min(timeit.repeat(
+            lambda: clase.desde_parametros(artefactos.cargar_parametros(nombre)[0]), number=50, repeat=5
+        )) / 50
+        print(f"   {nombre:<9} en caliente: pkl {pkl * 1e6:9.1f} µs   artefacto {npy * 1e6:9.1f} µs")
+
+        pkl_frio = min(arranque(ARRANQUE_PKL.format(clase=clase.__name__, ruta=ruta)) for _ in range(3))
+        npy_frio = min(arranque(ARRANQUE_ARTEFACTO.format(clase=clase.__name__, nombre=nombre)) for _ in range(3))
+        print(f"   {nombre:<9} proceso nuevo: pkl {pkl_frio * 1e3:7.1f} ms   artefacto {npy_frio * 1e3:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark de memoria del entrenamiento de clusters: KMeans con la tabla completa
+frente al modo out-of-core (StandardScaler.partial_fit + MiniBatchKMeans por bloques).
+Usa una BD SQLite temporal y un modelo temporal; no toca ml/model_clusters.pkl.
+Ejecuta: python benchmarks/bench_clusters_streaming.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+_directorio = tempfile.mkdtemp(prefix="bench_clusters_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directorio, 'bench.db')}"
+
+import numpy as np
+
+from db.connection import SessionLocal, init_db
+from db.bulk import insertar_ignorando_duplicados
+from ml import clustering
+from ml.model import TriajeML
+
+TAMANOS = (20_000, 80_000, 200_000)
+
+
+def poblar(hasta, desde=1):
+    rng = np.random.default_rng(desde)
+    n = hasta - desde + 1
+    signos = np.column_stack([
+        rng.uniform(35.5, 41.0, n), rng.uniform(50, 150, n), rng.uniform(12, 32, n),
+        rng.uniform(80, 100, n), rng.uniform(45, 130, n), rng.uniform(1.45, 1.95, n),
+    ])
+    filas = [
+        {
+            "id_triaje": desde + i, "nombre_paciente": f"Paciente_{desde + i}",
+            "temperatura": s[0], "frecuencia_cardiaca": s[1], "frecuencia_respiratoria": s[2],
+            "saturacion_oxigeno": s[3], "peso": s[4], "estatura": s[5], "sufre_infarto": False,
+        }
+        for i, s in enumerate(signos.tolist())
+    ]
+    db = SessionLocal()
+    insertar_ignorando_duplicados(db, TriajeML.__table__, filas, claves=["id_triaje"])
+    db.commit()
+    db.close()
+
+
+def medir(streaming):
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    clustering.entrenar_clusters(num_clusters=3, streaming=streaming)
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return segundos, pico / 2**20
+
+
+def main():
+    init_db()
+    clustering.MODEL_CLUSTER_PATH = os.path.join(_directorio, "model_clusters.pkl")
+
+    print("📊 Pico de memoria de Python (tracemalloc) al entrenar clusters")
+    print(f"   {'filas':>8} {'completo':>18} {'streaming':>18}")
+    anterior = 0
+    for tamano in TAMANOS:
+        poblar(tamano, anterior + 1)
+        anterior = tamano
+        seg_c, mb_c = medir(streaming=False)
+        seg_s, mb_s = medir(streaming=True)
+        print(f"   {tamano:>8} {mb_c:8.1f} MB {seg_c:6.2f} s {mb_s:8.1f} MB {seg_s:6.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Benchmark del procesamiento de ECG (ml/ecg_senal.py): ECG por segundo y por núcleo,
+analizando señales de 10 s a 500 Hz e imágenes PGM de 1500x200 píxeles, en el
+propio proceso y repartidas en el pool de procesos (ML_WORKERS_ECG).
+Ejecuta: python benchmarks/bench_ecg.py [cantidad]
+"""
+
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from ml import ecg_senal
+from ml.ecg_senal import analizar_entrada, analizar_lote, codificar_pgm, ecg_sintetico, trazar_imagen
+
+
+def medir(nombre, funcion, cantidad, nucleos):
+    inicio = time.perf_counter()
+    funcion()
+    segundos = time.perf_counter() - inicio
+    print(f"   {nombre:<32} {cantidad / segundos:8.1f} ECG/s  {cantidad / segundos / nucleos:8.1f} ECG/s/núcleo")
+
+
+def main():
+    cantidad = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    parametros = [{"frecuencia_cardiaca": 50 + i % 90, "irregularidad": 0.3 * (i % 3 == 0), "semilla": i}
+                  for i in range(cantidad)]
+    senales = [{"senal": ecg_sintetico(**p), "frecuencia": 500} for p in parametros]
+    imagenes = [{"imagen": codificar_pgm(trazar_imagen(s["senal"]))} for s in senales]
+    workers = ecg_senal.WORKERS_ECG
+
+    print(f"=== Análisis de {cantidad} ECG ({os.cpu_count()} núcleos, ML_WORKERS_ECG={workers}) ===")
+    medir("señal, un proceso", lambda: [analizar_entrada(e) for e in senales], cantidad, 1)
+    medir("imagen PGM, un proceso", lambda: [analizar_entrada(e) for e in imagenes], cantidad, 1)
+
+    # El primer lote incluye el arranque de los procesos del pool: se descarta
+    analizar_lote(senales[: max(2, workers)])
+    medir(f"señal, pool de {workers}", lambda: analizar_lote(senales), cantidad, max(workers, 1))
+    medir(f"imagen PGM, pool de {workers}", lambda: analizar_lote(imagenes), cantidad, max(workers, 1))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Benchmark de inferencia por paciente: sklearn (DataFrame + predict_proba)
+frente al predictor NumPy directo.
+Ejecuta: python benchmarks/bench_inferencia.py
+"""
+
+import os
+import sys
+import timeit
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from ml.model import MODEL_PATH, COLUMNAS_SIGNOS
+from ml.clustering import MODEL_CLUSTER_PATH
+from ml.inferencia_numpy import PredictorInfartoNumpy, PredictorClustersNumpy, a_matriz
+
+PACIENTE = {
+    "temperatura": 38.0,
+    "frecuencia_cardiaca": 110,
+    "frecuencia_respiratoria": 22,
+    "saturacion_oxigeno": 90,
+    "peso": 90,
+    "estatura": 1.70,
+}
+
+
+def medir(nombre, funcion, repeticiones=2000):
+    segundos = min(timeit.repeat(funcion, number=repeticiones, repeat=5)) / repeticiones
+    print(f"   {nombre:<28} {segundos * 1e6:10.1f} µs/llamada")
+    return segundos
+
+
+def main():
+    modelo = joblib.load(MODEL_PATH)
+    clusters = joblib.load(MODEL_CLUSTER_PATH)
+    predictor = PredictorInfartoNumpy.desde_sklearn(modelo)
+    predictor_clusters = PredictorClustersNumpy.desde_sklearn(clusters)
+
+    def infarto_sklearn():
+        df = pd.DataFrame([PACIENTE], columns=COLUMNAS_SIGNOS)
+        return modelo.predict(df)[0], modelo.predict_proba(df)[0][1]
+
+    def infarto_numpy():
+        X = a_matriz([PACIENTE], COLUMNAS_SIGNOS)
+        return predictor.predecir(X)[0], predictor.probabilidad(X)[0]
+
+    def clusters_sklearn():
+        df = pd.DataFrame([PACIENTE], columns=COLUMNAS_SIGNOS)
+        return clusters["model"].predict(clusters["scaler"].transform(df))[0]
+
+    def clusters_numpy():
+        return predictor_clusters.asignar(a_matriz([PACIENTE], COLUMNAS_SIGNOS))[0][0]
+
+    assert infarto_sklearn()[0] == infarto_numpy()[0]
+    assert np.isclose(infarto_sklearn()[1], infarto_numpy()[1])
+    assert clusters_sklearn() == clusters_numpy()
+
+    print("=== Inferencia de un paciente ===")
+    print("Infarto (LogisticRegression):")
+    lento = medir("sklearn + DataFrame", infarto_sklearn, 500)
+    rapido = medir("NumPy directo", infarto_numpy)
+    print(f"   Aceleración: x{lento / rapido:.1f}")
+
+    print("Clusters (StandardScaler + KMeans):")
+    lento = medir("sklearn + DataFrame", clusters_sklearn, 500)
+    rapido = medir("NumPy directo", clusters_numpy)
+    print(f"   Aceleración: x{lento / rapido:.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark de throughput del servicio en producción: arranca gunicorn
+(gunicorn.conf.py) con 1, 2, 4... workers y mide peticiones por segundo de
+una predicción de infarto por /graphql con varios clientes concurrentes.
+Usa una BD SQLite y directorios de artefactos temporales.
+Ejecuta: python benchmarks/bench_servidor.py [workers...]
+"""
+
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+RAIZ = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+CLIENTES = 16
+PETICIONES = 2000
+
+CONSULTA = {
+    "query": """
+    mutation($pacientes: [SignosVitalesInput!]!) {
+        predecirPacientesLote(pacientes: $pacientes) { ok predicciones { sufreInfarto probabilidad } }
+    }
+    """,
+    "variables": {"pacientes": [{
+        "temperatura": 38.0, "frecuenciaCardiaca": 110, "frecuenciaRespiratoria": 22,
+        "saturacionOxigeno": 90, "peso": 90, "estatura": 1.70,
+    }]},
+}
+
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _esperar_listo(url, proceso, segundos=60):
+    limite = time.time() + segundos
+    while time.time() < limite:
+        if proceso.poll() is not None:
+            raise RuntimeError("gunicorn terminó antes de estar listo")
+        try:
+            if requests.get(f"{url}/listo", timeout=1).status_code == 200:
+                return
+        except requests.ConnectionError:
+            pass
+        time.sleep(0.2)
+    raise TimeoutError("gunicorn no respondió /listo a tiempo")
+
+
+def medir(workers, directorio):
+    puerto = _puerto_libre()
+    url = f"http://127.0.0.1:{puerto}"
+    entorno = {
+        **os.environ,
+        "PORT": str(puerto),
+        "ML_WORKERS_WEB": str(workers),
+        "DATABASE_URL": f"sqlite:///{os.path.join(directorio, 'bench.db')}",
+        "ML_DIR_ARTEFACTOS": os.path.join(directorio, "artefactos"),
+        "ML_LOCK_PLANIFICADOR": os.path.join(directorio, "planificador.lock"),
+    }
+    proceso = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--log-level", "warning"],
+        cwd=RAIZ, env=entorno, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        _esperar_listo(url, proceso)
+        sesiones = {}
+
+        def peticion(_):
+            # Una sesión (conexión keep-alive) por hilo cliente
+            sesion = sesiones.setdefault(threading.get_ident(), requests.Session())
+            respuesta = sesion.post(f"{url}/graphql", json=CONSULTA, timeout=30)
+            respuesta.raise_for_status()
+            assert respuesta.json()["data"]["predecirPacientesLote"]["ok"]
+
+        with ThreadPoolExecutor(CLIENTES) as pool:
+            list(pool.map(peticion, range(100)))  # calentamiento
+            inicio = time.perf_counter()
+            list(pool.map(peticion, range(PETICIONES)))
+            segundos = time.perf_counter() - inicio
+        for sesion in sesiones.values():
+            sesion.close()
+        return PETICIONES / segundos
+    finally:
+        proceso.terminate()
+        proceso.wait(60)
+
+
+def main():
+    lista_workers = [int(w) for w in sys.argv[1:]] or [1, 2, 4]
+    directorio = tempfile.mkdtemp(prefix="bench_servidor_")
+    print(f"=== Throughput de /graphql ({os.cpu_count()} núcleos, {CLIENTES} clientes, {PETICIONES} peticiones) ===")
+    base = None
+    for workers in lista_workers:
+        rps = medir(workers, directorio)
+        base = base or rps
+        print(f"   {workers} workers: {rps:8.1f} peticiones/s   (x{rps / base:.2f})")
+
+
+if __name__ == "__main__":
+    main()
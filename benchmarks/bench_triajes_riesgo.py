@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la lista de pacientes con riesgo de infarto: la mutación
+obtenerTriajesRiesgo (todas las filas) frente a una página de la query
+triajesRiesgo (índices parciales, cursor y solo los campos pedidos), con
+poblaciones crecientes. Usa una BD SQLite temporal.
+Ejecuta: python benchmarks/bench_triajes_riesgo.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+_directorio = tempfile.mkdtemp(prefix="bench_riesgo_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_directorio, 'bench.db')}"
+
+import logging
+
+import numpy as np
+
+from db.connection import SessionLocal, init_db, engine
+from db.bulk import insertar_ignorando_duplicados
+from ml.model import TriajeML, COLUMNAS_SIGNOS
+
+POBLACIONES = [10_000, 50_000, 200_000]
+# La mutación devuelve todas las filas: solo se mide hasta esta población
+MAXIMO_MUTACION = 50_000
+REPETICIONES = 20
+
+MUTACION = "mutation { obtenerTriajesRiesgo { ok triajes { idTriaje nombrePaciente } } }"
+PAGINA = """
+query($after: Int, $orden: String) {
+    triajesRiesgo(first: 50, after: $after, orden: $orden) { idTriaje nombrePaciente probabilidadInfarto }
+}
+"""
+
+
+def poblar(desde, hasta):
+    rng = np.random.default_rng(desde)
+    signos = rng.uniform([35.5, 50, 12, 80, 45, 1.45], [41, 150, 32, 100, 130, 1.95], (hasta - desde, 6))
+    filas = [
+        {
+            "id_triaje": desde + i + 1, "nombre_paciente": f"Paciente_{desde + i + 1}",
+            **dict(zip(COLUMNAS_SIGNOS, s)),
+            "alergias": "Ninguna conocida", "enfermedades_cronicas": "Hipertensión arterial",
+            "motivo_consulta": "Dolor torácico", "sufre_infarto": bool(i % 4 == 0),
+            "probabilidad_infarto": round(float(rng.uniform(0, 100)), 2),
+        }
+        for i, s in enumerate(signos.tolist())
+    ]
+    db = SessionLocal()
+    insertar_ignorando_duplicados(db, TriajeML.__table__, filas, claves=["id_triaje"])
+    db.commit()
+    db.close()
+
+
+def medir(schema, consulta, variables=None, repeticiones=REPETICIONES):
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        result = schema.execute(consulta, variables=variables)
+        assert not result.errors, result.errors
+    return (time.perf_counter() - inicio) / repeticiones * 1000, result.data
+
+
+def main():
+    engine.echo = False
+    logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
+    init_db()
+    from schema import schema
+
+    print("📊 Pacientes con riesgo (25 % de los triajes): ms por petición")
+    print(f"   {'triajes':>9} {'mutación completa':>18} {'página por id':>14} {'por id, cursor':>15} "
+          f"{'por probabilidad':>17} {'prob., cursor':>14}")
+    poblados = 0
+    for poblacion in POBLACIONES:
+        poblar(poblados, poblacion)
+        poblados = poblacion
+
+        mutacion = "-"
+        if poblacion <= MAXIMO_MUTACION:
+            mutacion = f"{medir(schema, MUTACION, repeticiones=3)[0]:.1f}"
+        por_id, _ = medir(schema, PAGINA, {"orden": "id"})
+        por_id_cursor, _ = medir(schema, PAGINA, {"orden": "id", "after": poblacion // 2})
+        por_prob, datos = medir(schema, PAGINA, {"orden": "probabilidad"})
+        cursor = datos["triajesRiesgo"][-1]["idTriaje"]
+        por_prob_cursor, _ = medir(schema, PAGINA, {"orden": "probabilidad", "after": cursor})
+        print(f"   {poblacion:>9} {mutacion:>18} {por_id:>14.2f} {por_id_cursor:>15.2f} "
+              f"{por_prob:>17.2f} {por_prob_cursor:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
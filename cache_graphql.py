@@ -0,0 +1,183 @@
+"""
+Caché de documentos GraphQL y consultas persistidas para el endpoint /graphql.
+
+Cada consulta se analiza (parse) y valida contra el esquema una sola vez: el
+documento resultante (o sus errores) se guarda en un LRU de hasta
+ML_CACHE_GRAPHQL_TAMANO entradas, con el SHA-256 del texto como clave, y las
+peticiones siguientes con el mismo texto solo ejecutan.
+
+Esa misma clave permite consultas persistidas con el protocolo de Apollo
+(Automatic Persisted Queries): el cliente envía solo
+`extensions.persistedQuery.sha256Hash` y las variables; si el hash no está en
+caché se responde PersistedQueryNotFound y el cliente reenvía el texto junto al
+hash, que queda registrado para las siguientes peticiones.
+
+Los resolvers pueden devolver resultados pendientes (awaitables, ver cargadores.py);
+en ese caso la ejecución se completa en un bucle de eventos propio de cada hilo.
+"""
+
+import asyncio
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from graphql import ExecutionResult, GraphQLError, execute, parse, validate
+from graphql.pyutils import is_awaitable
+
+# Documentos analizados y validados que se guardan en memoria
+TAMANO_CACHE_GRAPHQL = int(os.getenv("ML_CACHE_GRAPHQL_TAMANO", "500"))
+
+PERSISTED_QUERY_NOT_FOUND = "PersistedQueryNotFound"
+
+
+def huella_consulta(consulta):
+    """SHA-256 (hex) del texto de la consulta, el mismo que calculan los clientes de Apollo."""
+    return hashlib.sha256(consulta.encode("utf-8")).hexdigest()
+
+
+class _Documento:
+    """Consulta analizada y validada. Es inmutable y se comparte entre peticiones."""
+
+    __slots__ = ("documento", "errores", "segundos")
+
+    def __init__(self, documento, errores, segundos):
+        self.documento = documento
+        self.errores = errores
+        self.segundos = segundos
+
+
+_hilos = threading.local()
+
+
+def _completar(resultado):
+    """Espera un ExecutionResult pendiente en el bucle de eventos del hilo actual."""
+    bucle = getattr(_hilos, "bucle", None)
+    if bucle is None or bucle.is_closed():
+        bucle = _hilos.bucle = asyncio.new_event_loop()
+
+    async def esperar():
+        return await resultado
+
+    return bucle.run_until_complete(esperar())
+
+
+def _error(mensaje, codigo=None):
+    return ExecutionResult(data=None, errors=[GraphQLError(mensaje, extensions={"code": codigo} if codigo else None)])
+
+
+class CacheDocumentos:
+    """
+    Ejecuta peticiones GraphQL reutilizando los documentos ya analizados y validados.
+
+    Args:
+        schema: Esquema de graphene
+        tamano: Documentos máximos en el LRU
+    """
+
+    def __init__(self, schema, tamano=TAMANO_CACHE_GRAPHQL):
+        self.schema = schema
+        self.tamano = tamano
+        self._documentos = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.persistidas_no_encontradas = 0
+        self.segundos_analisis = 0.0
+        self.segundos_ahorrados = 0.0
+
+    def _buscar(self, huella):
+        with self._lock:
+            entrada = self._documentos.get(huella)
+            if entrada is not None:
+                self._documentos.move_to_end(huella)
+                self.aciertos += 1
+                self.segundos_ahorrados += entrada.segundos
+            return entrada
+
+    def _analizar(self, huella, consulta):
+        inicio = time.perf_counter()
+        try:
+            documento = parse(consulta)
+            errores = validate(self.schema.graphql_schema, documento)
+        except GraphQLError as error:
+            documento, errores = None, [error]
+        entrada = _Documento(documento, errores or None, time.perf_counter() - inicio)
+
+        with self._lock:
+            self.fallos += 1
+            self.segundos_analisis += entrada.segundos
+            self._documentos[huella] = entrada
+            self._documentos.move_to_end(huella)
+            while len(self._documentos) > self.tamano:
+                self._documentos.popitem(last=False)
+        return entrada
+
+    def ejecutar(self, peticion, context_value=None):
+        """
+        Ejecuta el cuerpo de una petición GraphQL.
+
+        Args:
+            peticion: {"query", "variables", "operationName", "extensions"}
+
+        Returns:
+            ExecutionResult
+        """
+        if not isinstance(peticion, dict):
+            return _error("El cuerpo de la petición debe ser un objeto JSON")
+        consulta = peticion.get("query")
+        if consulta is not None and not isinstance(consulta, str):
+            return _error("La consulta (query) debe ser un texto")
+        if not isinstance(peticion.get("variables") or {}, dict):
+            return _error("Las variables (variables) deben ser un objeto")
+        if not isinstance(peticion.get("operationName") or "", str):
+            return _error("El nombre de la operación (operationName) debe ser un texto")
+        extensiones = peticion.get("extensions") or {}
+        persistida = extensiones.get("persistedQuery") if isinstance(extensiones, dict) else None
+        if persistida is not None and not isinstance(persistida, dict):
+            return _error("persistedQuery debe ser un objeto", "PERSISTED_QUERY_NOT_SUPPORTED")
+        huella = None
+        if persistida:
+            if persistida.get("version") != 1:
+                return _error("Versión de consulta persistida no soportada", "PERSISTED_QUERY_NOT_SUPPORTED")
+            huella = persistida.get("sha256Hash")
+
+        if consulta is None:
+            if huella is None:
+                return _error("Falta el texto de la consulta (query)")
+            entrada = self._buscar(huella)
+            if entrada is None:
+                with self._lock:
+                    self.persistidas_no_encontradas += 1
+                return _error(PERSISTED_QUERY_NOT_FOUND, "PERSISTED_QUERY_NOT_FOUND")
+        else:
+            calculada = huella_consulta(consulta)
+            if huella is not None and huella != calculada:
+                return _error("El sha256Hash no corresponde a la consulta", "INVALID_PERSISTED_QUERY_HASH")
+            entrada = self._buscar(calculada) or self._analizar(calculada, consulta)
+
+        if entrada.errores:
+            return ExecutionResult(data=None, errors=entrada.errores)
+        resultado = execute(
+            self.schema.graphql_schema,
+            entrada.documento,
+            context_value=context_value,
+            variable_values=peticion.get("variables"),
+            operation_name=peticion.get("operationName"),
+        )
+        return _completar(resultado) if is_awaitable(resultado) else resultado
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._documentos),
+                "tamano_maximo": self.tamano,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "persistidas_no_encontradas": self.persistidas_no_encontradas,
+                "tasa_aciertos": self.aciertos / consultas if consultas else 0.0,
+                "segundos_analisis": self.segundos_analisis,
+                "segundos_ahorrados": self.segundos_ahorrados,
+            }
@@ -0,0 +1,123 @@
+"""
+Agrupación de predicciones por petición GraphQL (patrón DataLoader).
+
+Cuando un documento pide muchas predicciones (varios `predecirCluster` con alias,
+o el `riesgoInfarto` de cada paciente de `obtenerClusters`), cada campo registra
+sus signos vitales en el cargador de la petición y devuelve un resultado pendiente.
+graphql-core invoca todos los resolvers de un nivel antes de esperar ninguno, así
+que al esperar el primero ya están registradas todas las claves: se hace una sola
+llamada vectorizada al modelo (ml/model.py, ml/clustering.py) y cada campo recibe
+su fila.
+
+Los cargadores viven en el contexto de una petición (contexto_peticion()) y no se
+comparten entre peticiones; dentro de ella, las claves repetidas se calculan una vez.
+"""
+
+import os
+
+from ml.model import COLUMNAS_SIGNOS, predecir_riesgo_triajes
+from ml.clustering import predecir_clusters_lote
+
+# Claves máximas por llamada al modelo; un lote mayor se divide en varias llamadas
+TAMANO_MAXIMO_LOTE_CARGADOR = int(os.getenv("ML_TAMANO_MAXIMO_LOTE_CARGADOR", "1000"))
+
+
+class _Pendiente:
+    """Resultado de una clave; al esperarlo por primera vez se despacha el lote."""
+
+    __slots__ = ("_cargador", "_listo", "_valor", "_error")
+
+    def __init__(self, cargador):
+        self._cargador = cargador
+        self._listo = False
+        self._valor = None
+        self._error = None
+
+    def _resolver(self, valor=None, error=None):
+        self._listo = True
+        self._valor = valor
+        self._error = error
+
+    def __await__(self):
+        if not self._listo:
+            self._cargador.despachar()
+        if self._error is not None:
+            raise self._error
+        return self._valor
+        yield  # noqa: hace de __await__ un generador; nunca suspende
+
+
+class CargadorLotes:
+    """
+    Acumula claves y las resuelve con una única llamada a `funcion_lote`.
+
+    Args:
+        funcion_lote: Recibe la lista de claves y devuelve los valores en el mismo orden
+        clave: Convierte lo recibido en cargar() en una clave hashable (para no repetir cálculos)
+        tamano_maximo: Claves máximas por llamada a funcion_lote
+    """
+
+    def __init__(self, funcion_lote, clave=None, tamano_maximo=TAMANO_MAXIMO_LOTE_CARGADOR):
+        self.funcion_lote = funcion_lote
+        self.clave = clave or (lambda valor: valor)
+        self.tamano_maximo = tamano_maximo
+        self._resultados = {}
+        self._pendientes = {}
+        self.lotes = 0
+        self.claves = 0
+
+    def cargar(self, valor):
+        """Registra `valor` y devuelve un resultado pendiente (awaitable)."""
+        clave = self.clave(valor)
+        pendiente = self._resultados.get(clave)
+        if pendiente is None:
+            pendiente = self._resultados[clave] = _Pendiente(self)
+            self._pendientes[clave] = valor
+        return pendiente
+
+    def despachar(self):
+        """Resuelve todas las claves registradas hasta ahora."""
+        pendientes, self._pendientes = self._pendientes, {}
+        claves, valores = list(pendientes), list(pendientes.values())
+        tamano = self.tamano_maximo or max(len(claves), 1)
+        for inicio in range(0, len(claves), tamano):
+            bloque = slice(inicio, inicio + tamano)
+            self.lotes += 1
+            self.claves += len(claves[bloque])
+            try:
+                resultados = self.funcion_lote(valores[bloque])
+            except Exception as e:
+                for clave in claves[bloque]:
+                    self._resultados[clave]._resolver(error=e)
+                continue
+            for clave, resultado in zip(claves[bloque], resultados):
+                self._resultados[clave]._resolver(resultado)
+
+
+def _signos(datos):
+    return tuple(float(datos[columna]) for columna in COLUMNAS_SIGNOS)
+
+
+class CargadoresPrediccion:
+    """Cargadores de una petición: cluster por signos vitales y riesgo de infarto por id de triaje."""
+
+    def __init__(self):
+        self.clusters = CargadorLotes(predecir_clusters_lote, clave=_signos)
+        self.infarto_triaje = CargadorLotes(predecir_riesgo_triajes)
+
+    def estadisticas(self):
+        return {
+            nombre: {"lotes": cargador.lotes, "claves": cargador.claves}
+            for nombre, cargador in vars(self).items()
+        }
+
+
+def contexto_peticion():
+    """Contexto de ejecución de una petición GraphQL con sus cargadores."""
+    return {"cargadores": CargadoresPrediccion()}
+
+
+def cargadores(info):
+    """Cargadores de la petición en curso, o None si se ejecuta sin contexto (schema.execute)."""
+    contexto = info.context
+    return contexto.get("cargadores") if isinstance(contexto, dict) else None
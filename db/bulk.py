@@ -0,0 +1,63 @@
+"""
+Escrituras masivas en una sola sentencia por lote.
+
+Usa INSERT ... ON CONFLICT de PostgreSQL o SQLite según el motor conectado,
+de forma que insertar o actualizar N filas cuesta un viaje a la BD por lote
+en lugar de una consulta por fila.
+"""
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+
+def _insert_para(db, tabla):
+    dialecto = db.get_bind().dialect.name
+    if dialecto == "postgresql":
+        return postgresql.insert(tabla)
+    if dialecto == "sqlite":
+        return sqlite.insert(tabla)
+    raise NotImplementedError(f"❌ Escritura masiva no soportada para el motor '{dialecto}'.")
+
+
+def insertar_ignorando_duplicados(db, tabla, filas, claves):
+    """
+    Inserta las filas en un único executemany; las que chocan con una clave
+    existente se descartan (ON CONFLICT DO NOTHING).
+
+    Args:
+        db: Sesión de SQLAlchemy (no se hace commit)
+        tabla: Objeto Table de destino
+        filas: Lista de diccionarios columna -> valor
+        claves: Columnas que forman la clave de conflicto
+
+    Returns:
+        list: Claves de las filas insertadas realmente (RETURNING), tuplas si hay varias columnas
+    """
+    if not filas:
+        return []
+    stmt = (
+        _insert_para(db, tabla)
+        .on_conflict_do_nothing(index_elements=claves)
+        .returning(*(tabla.c[c] for c in claves))
+    )
+    resultado = db.execute(stmt, filas)
+    return resultado.scalars().all() if len(claves) == 1 else [tuple(fila) for fila in resultado]
+
+
+def insertar_o_actualizar(db, tabla, filas, claves):
+    """
+    Inserta las filas y, si ya existe una con la misma clave, actualiza el resto de columnas.
+
+    Args:
+        db: Sesión de SQLAlchemy (no se hace commit)
+        tabla: Objeto Table de destino
+        filas: Lista de diccionarios columna -> valor
+        claves: Columnas que forman la clave de conflicto
+    """
+    if not filas:
+        return
+    stmt = _insert_para(db, tabla)
+    columnas = [c for c in filas[0] if c not in claves]
+    stmt = stmt.on_conflict_do_update(
+        index_elements=claves, set_={c: stmt.excluded[c] for c in columnas}
+    )
+    db.execute(stmt, filas)
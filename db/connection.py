@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 import os
@@ -16,5 +16,45 @@ Base = declarative_base()
 
 def init_db():
     from ml.model import TriajeML
+    from ml.clustering import AsignacionClusterML
+    from ml.utils import EstadoSincronizacion
+    from ml.historico_ecg import AnalisisECGML
+    from ml.trabajos import TrabajoEntrenamientoML
     Base.metadata.create_all(bind=engine)
+    _migrar_tablas_existentes()
     print("✅ Tablas creadas correctamente")
+    _completar_datos_existentes()
+
+
+def _completar_datos_existentes():
+    """
+    Rellena una sola vez, al arrancar, los datos derivados que faltan en filas guardadas
+    por versiones anteriores (probabilidad_infarto), para que las lecturas no escriban.
+    """
+    from ml.triajes_riesgo import completar_probabilidades_riesgo
+
+    try:
+        completar_probabilidades_riesgo()
+    except Exception as e:
+        print(f"⚠️ No se pudieron completar las probabilidades de infarto: {str(e)}")
+
+
+def _migrar_tablas_existentes():
+    """
+    create_all() no modifica tablas que ya existen: se agregan las columnas nuevas
+    (nulables) y los índices que falten, para BD creadas con versiones anteriores.
+    """
+    inspector = inspect(engine)
+    for tabla in Base.metadata.sorted_tables:
+        existentes = {c["name"] for c in inspector.get_columns(tabla.name)}
+        faltantes = [c for c in tabla.columns if c.name not in existentes]
+        with engine.begin() as conexion:
+            for columna in faltantes:
+                if not columna.nullable:
+                    print(f"⚠️ La columna {tabla.name}.{columna.name} no es nulable; hay que agregarla a mano")
+                    continue
+                tipo = columna.type.compile(dialect=engine.dialect)
+                conexion.execute(text(f"ALTER TABLE {tabla.name} ADD COLUMN {columna.name} {tipo}"))
+                print(f"🛠️ Columna agregada: {tabla.name}.{columna.name}")
+            for indice in tabla.indexes:
+                indice.create(bind=conexion, checkfirst=True)
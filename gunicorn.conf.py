@@ -0,0 +1,35 @@
+"""
+Configuración de gunicorn para producción.
+Ejecuta: gunicorn -c gunicorn.conf.py
+
+Los modelos se cargan en el maestro (preload_app) y los workers los heredan
+al hacer fork. Cada worker arranca su propio planificador, pero solo el líder
+(servidor.es_lider) ejecuta los entrenamientos programados.
+"""
+
+import os
+
+wsgi_app = "wsgi:app"
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# Procesos que atienden peticiones (por defecto, uno por núcleo) y hilos por proceso
+workers = int(os.getenv("ML_WORKERS_WEB", str(os.cpu_count() or 1)))
+# La app (preload_app) reparte los núcleos de los pools de ECG entre los workers
+os.environ["ML_WORKERS_WEB"] = str(workers)
+worker_class = "gthread"
+threads = int(os.getenv("ML_HILOS_WEB", "4"))
+
+preload_app = True
+timeout = 120
+graceful_timeout = 30
+
+
+def post_fork(server, worker):
+    # Las conexiones a la BD abiertas en el maestro no se comparten entre procesos
+    from db.connection import engine
+
+    engine.dispose(close=False)
+
+    from app import iniciar_planificador
+
+    iniciar_planificador()
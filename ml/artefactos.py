@@ -0,0 +1,256 @@
+"""
+Almacén versionado de artefactos de modelos.
+
+Cada versión de un modelo vive en su propio directorio:
+
+    ml/artefactos/<nombre>/<version>/
+        manifest.json     metadatos (versión, fecha, forma, tipo y posición de cada parámetro, métricas...)
+        parametros.bin    parámetros numéricos (coeficientes, media, escala, centroides...) contiguos
+        modelo.pkl        objeto sklearn original, solo para ML_INFERENCIA_NUMPY=0
+        <adjunto>.pkl     estado asociado a la versión (p. ej. el estado incremental del SGD)
+    ml/artefactos/<nombre>/ACTUAL   versión publicada
+
+parametros.bin se mapea en memoria con un único mmap y cada parámetro es una
+vista de solo lectura sobre él: sin unpickle, sin importar sklearn y sin abrir
+un archivo por array, así que cargar un modelo cuesta microsegundos. Una versión se escribe completa en un
+directorio temporal que luego se renombra, y el puntero ACTUAL se reemplaza con
+os.replace: ningún lector ve una versión a medio escribir. Las versiones
+anteriores se conservan (hasta ML_MAX_VERSIONES_ARTEFACTO) para poder revertir.
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import uuid
+from datetime import datetime
+
+import numpy as np
+
+DIR_ARTEFACTOS = os.getenv("ML_DIR_ARTEFACTOS", "ml/artefactos")
+
+# Versiones guardadas por modelo (la publicada nunca se borra)
+MAX_VERSIONES_ARTEFACTO = int(os.getenv("ML_MAX_VERSIONES_ARTEFACTO", "10"))
+
+_PUNTERO = "ACTUAL"
+_MANIFIESTO = "manifest.json"
+_MODELO_SKLEARN = "modelo.pkl"
+_PARAMETROS = "parametros.bin"
+
+# Cada parámetro empieza en un múltiplo de este número de bytes
+_ALINEACION = 64
+
+
+def _dir_modelo(nombre):
+    return os.path.join(DIR_ARTEFACTOS, nombre)
+
+
+def _dir_version(nombre, version):
+    return os.path.join(DIR_ARTEFACTOS, nombre, version)
+
+
+def ruta_puntero(nombre):
+    """Archivo con la versión publicada; su firma cambia con cada publicación o reversión."""
+    return os.path.join(_dir_modelo(nombre), _PUNTERO)
+
+
+def version_actual(nombre):
+    """Versión publicada del modelo, o None si todavía no hay ninguna."""
+    try:
+        with open(ruta_puntero(nombre), encoding="utf-8") as archivo:
+            return archivo.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _apuntar(nombre, version):
+    temporal = f"{ruta_puntero(nombre)}.{uuid.uuid4().hex}.tmp"
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        archivo.write(version)
+    os.replace(temporal, ruta_puntero(nombre))
+
+
+def publicar_artefacto(nombre, parametros, modelo=None, metadatos=None, adjuntos=None):
+    """
+    Guarda una versión nueva del modelo y la publica como actual.
+
+    Args:
+        nombre: Modelo ("infarto", "clusters", ...)
+        parametros: Diccionario nombre -> array numérico
+        modelo: Objeto sklearn original (opcional), para la inferencia sin NumPy
+        metadatos: Información adicional para el manifiesto (tipo, filas, métricas...)
+        adjuntos: Diccionario nombre -> objeto guardado con joblib junto a la versión
+            (se recupera con cargar_adjunto(), p. ej. al revertir)
+
+    Returns:
+        str: Identificador de la versión publicada
+    """
+    arrays = {clave: np.ascontiguousarray(valor) for clave, valor in parametros.items()}
+    huella = hashlib.sha1()
+    for clave in sorted(arrays):
+        huella.update(clave.encode())
+        huella.update(arrays[clave].tobytes())
+    version = f"{datetime.now():%Y%m%dT%H%M%S%f}-{huella.hexdigest()[:8]}"
+
+    os.makedirs(_dir_modelo(nombre), exist_ok=True)
+    temporal = os.path.join(_dir_modelo(nombre), f".tmp-{uuid.uuid4().hex}")
+    os.makedirs(temporal)
+    try:
+        posiciones = {}
+        with open(os.path.join(temporal, _PARAMETROS), "wb") as archivo:
+            for clave, valor in arrays.items():
+                archivo.write(b"\0" * (-archivo.tell() % _ALINEACION))
+                posiciones[clave] = archivo.tell()
+                archivo.write(valor.tobytes())
+        if modelo is not None or adjuntos:
+            import joblib
+        if modelo is not None:
+            joblib.dump(modelo, os.path.join(temporal, _MODELO_SKLEARN))
+        for clave, objeto in (adjuntos or {}).items():
+            joblib.dump(objeto, os.path.join(temporal, f"{clave}.pkl"))
+
+        manifiesto = {
+            "nombre": nombre,
+            "version": version,
+            "creado_en": datetime.now().isoformat(),
+            "parametros": {
+                clave: {"posicion": posiciones[clave], "forma": list(valor.shape), "tipo": valor.dtype.str}
+                for clave, valor in arrays.items()
+            },
+            "modelo_sklearn": _MODELO_SKLEARN if modelo is not None else None,
+            "adjuntos": {clave: f"{clave}.pkl" for clave in adjuntos or {}},
+            "metadatos": metadatos or {},
+        }
+        with open(os.path.join(temporal, _MANIFIESTO), "w", encoding="utf-8") as archivo:
+            json.dump(manifiesto, archivo, indent=2, default=str)
+
+        os.rename(temporal, _dir_version(nombre, version))
+    except Exception:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+
+    _apuntar(nombre, version)
+    _descartar_antiguas(nombre)
+    print(f"📦 Artefacto '{nombre}' publicado: versión {version}")
+    return version
+
+
+def importar_pickle(nombre, ruta, a_parametros):
+    """
+    Si el modelo todavía no tiene versiones, publica como primera el modelo sklearn
+    guardado con joblib en `ruta` (formato anterior, p. ej. ml/model_infarto.pkl).
+
+    Args:
+        a_parametros: Función que recibe el objeto cargado y devuelve sus parámetros
+
+    Returns:
+        bool: True si hay una versión publicada (ya existía o se acaba de importar)
+    """
+    if version_actual(nombre) is not None:
+        return True
+    if not os.path.exists(ruta):
+        return False
+
+    import joblib
+    modelo = joblib.load(ruta)
+    publicar_artefacto(nombre, a_parametros(modelo), modelo=modelo, metadatos={"origen": ruta})
+    return True
+
+
+def leer_manifiesto(nombre, version=None):
+    version = version or version_actual(nombre)
+    if version is None:
+        raise FileNotFoundError(f"❌ No hay ninguna versión publicada del modelo '{nombre}'.")
+    with open(os.path.join(_dir_version(nombre, version), _MANIFIESTO), encoding="utf-8") as archivo:
+        return json.load(archivo)
+
+
+def cargar_parametros(nombre, version=None):
+    """
+    Abre los parámetros de una versión (la actual por defecto) mapeados en memoria.
+
+    Returns:
+        tuple: (diccionario nombre -> array de solo lectura, manifiesto)
+    """
+    manifiesto = leer_manifiesto(nombre, version)
+    with open(os.path.join(_dir_version(nombre, manifiesto["version"]), _PARAMETROS), "rb") as archivo:
+        # El mapa sigue siendo válido después de cerrar el archivo (y de que se borre la versión)
+        mapa = mmap.mmap(archivo.fileno(), 0, access=mmap.ACCESS_READ) if os.fstat(archivo.fileno()).st_size else b""
+
+    parametros = {}
+    for clave, info in manifiesto["parametros"].items():
+        tipo = np.dtype(info["tipo"])
+        cantidad = int(np.prod(info["forma"], dtype=np.int64))
+        parametros[clave] = np.frombuffer(mapa, dtype=tipo, count=cantidad, offset=info["posicion"]).reshape(
+            info["forma"]
+        )
+    return parametros, manifiesto
+
+
+def cargar_modelo_sklearn(nombre, version=None):
+    """Objeto sklearn guardado junto a una versión (la actual por defecto)."""
+    import joblib
+
+    manifiesto = leer_manifiesto(nombre, version)
+    if not manifiesto.get("modelo_sklearn"):
+        raise FileNotFoundError(f"❌ La versión {manifiesto['version']} de '{nombre}' no incluye el modelo sklearn.")
+    return joblib.load(os.path.join(_dir_version(nombre, manifiesto["version"]), manifiesto["modelo_sklearn"]))
+
+
+def cargar_adjunto(nombre, clave, version=None):
+    """Objeto adjunto a una versión (la actual por defecto), o None si la versión no lo tiene."""
+    import joblib
+
+    manifiesto = leer_manifiesto(nombre, version)
+    archivo = (manifiesto.get("adjuntos") or {}).get(clave)
+    if archivo is None:
+        return None
+    return joblib.load(os.path.join(_dir_version(nombre, manifiesto["version"]), archivo))
+
+
+def listar_versiones(nombre):
+    """Manifiestos de las versiones guardadas, de la más reciente a la más antigua."""
+    if not os.path.isdir(_dir_modelo(nombre)):
+        return []
+    actual = version_actual(nombre)
+    versiones = []
+    for version in sorted(os.listdir(_dir_modelo(nombre)), reverse=True):
+        if version.startswith(".") or not os.path.isdir(_dir_version(nombre, version)):
+            continue
+        try:
+            manifiesto = leer_manifiesto(nombre, version)
+        except (FileNotFoundError, ValueError):
+            continue
+        versiones.append({**manifiesto, "actual": version == actual})
+    return versiones
+
+
+def revertir_artefacto(nombre, version=None):
+    """
+    Vuelve a publicar una versión guardada. Sin `version`, se publica la anterior a la actual.
+
+    Returns:
+        str: Versión publicada tras revertir
+    """
+    actual = version_actual(nombre)
+    versiones = [v["version"] for v in listar_versiones(nombre)]
+    if version is None:
+        anteriores = [v for v in versiones if actual is None or v < actual]
+        if not anteriores:
+            raise ValueError(f"❌ No hay una versión anterior a {actual} del modelo '{nombre}'.")
+        version = anteriores[0]
+    elif version not in versiones:
+        raise ValueError(f"❌ La versión {version} del modelo '{nombre}' no existe.")
+
+    _apuntar(nombre, version)
+    print(f"↩️ Modelo '{nombre}' revertido a la versión {version}")
+    return version
+
+
+def _descartar_antiguas(nombre):
+    actual = version_actual(nombre)
+    versiones = [v["version"] for v in listar_versiones(nombre)]
+    for version in versiones[MAX_VERSIONES_ARTEFACTO:]:
+        if version != actual:
+            shutil.rmtree(_dir_version(nombre, version), ignore_errors=True)
@@ -0,0 +1,131 @@
+"""
+Caché de resultados de análisis de ECG direccionada por contenido.
+
+La clave es la huella SHA-256 de la imagen (ver ecg_model.huella_ecg) junto con
+la versión del modelo ECG que hizo el análisis. Tiene dos niveles:
+  - memoria: un LRU (OrderedDict) de hasta ML_CACHE_ECG_TAMANO entradas por proceso;
+  - disco: un JSON por análisis en ML_DIR_CACHE_ECG/<version>/<huella>.json,
+    compartido entre procesos y reinicios.
+Al publicarse una versión nueva del modelo ECG las claves cambian solas; la
+primera consulta con la versión nueva vacía el LRU y borra del disco las
+versiones anteriores. Con ML_CACHE_ECG=0 no se guarda nada.
+"""
+
+import json
+import os
+import shutil
+import threading
+import uuid
+from collections import OrderedDict
+
+CACHE_ECG = os.getenv("ML_CACHE_ECG", "1") == "1"
+DIR_CACHE_ECG = os.getenv("ML_DIR_CACHE_ECG", "ml/cache/ecg")
+
+# Análisis guardados en memoria por proceso
+TAMANO_CACHE_ECG = int(os.getenv("ML_CACHE_ECG_TAMANO", "1024"))
+
+
+class CacheECG:
+    """
+    Caché de dos niveles (LRU en memoria + archivos JSON) de resultados de ECG.
+
+    Args:
+        directorio: Directorio del nivel en disco (None para usar solo memoria)
+        tamano: Entradas máximas del LRU en memoria
+    """
+
+    def __init__(self, directorio=DIR_CACHE_ECG, tamano=TAMANO_CACHE_ECG):
+        self.directorio = directorio
+        self.tamano = tamano
+        self._entradas = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self.aciertos_memoria = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+
+    def _ruta(self, version, huella):
+        return os.path.join(self.directorio, version, f"{huella}.json")
+
+    def _cambiar_version(self, version):
+        """Descarta lo calculado con otras versiones del modelo; se llama con el lock tomado."""
+        if version == self._version:
+            return
+        self._entradas.clear()
+        self._version = version
+        if self.directorio and os.path.isdir(self.directorio):
+            for anterior in os.listdir(self.directorio):
+                if anterior != version:
+                    shutil.rmtree(os.path.join(self.directorio, anterior), ignore_errors=True)
+
+    def _recordar(self, huella, resultado):
+        self._entradas[huella] = resultado
+        self._entradas.move_to_end(huella)
+        while len(self._entradas) > self.tamano:
+            self._entradas.popitem(last=False)
+
+    def obtener(self, huella, version):
+        """Resultado guardado para la imagen y versión del modelo, o None."""
+        with self._lock:
+            self._cambiar_version(version)
+            resultado = self._entradas.get(huella)
+            if resultado is not None:
+                self._entradas.move_to_end(huella)
+                self.aciertos_memoria += 1
+                return resultado
+
+        resultado = None
+        if self.directorio:
+            try:
+                with open(self._ruta(version, huella), encoding="utf-8") as archivo:
+                    resultado = json.load(archivo)
+            except (FileNotFoundError, ValueError):
+                pass
+
+        with self._lock:
+            if resultado is None:
+                self.fallos += 1
+                return None
+            self.aciertos_disco += 1
+            if version == self._version:
+                self._recordar(huella, resultado)
+            return resultado
+
+    def guardar(self, huella, version, resultado):
+        with self._lock:
+            self._cambiar_version(version)
+            self._recordar(huella, resultado)
+
+        if self.directorio:
+            # Escritura atómica: otro proceso nunca lee un JSON a medio escribir
+            ruta = self._ruta(version, huella)
+            os.makedirs(os.path.dirname(ruta), exist_ok=True)
+            temporal = f"{ruta}.{uuid.uuid4().hex}.tmp"
+            with open(temporal, "w", encoding="utf-8") as archivo:
+                json.dump(resultado, archivo)
+            os.replace(temporal, ruta)
+
+    def limpiar(self):
+        """Vacía los dos niveles y reinicia los contadores."""
+        with self._lock:
+            self._entradas.clear()
+            self._version = None
+            self.aciertos_memoria = self.aciertos_disco = self.fallos = 0
+        if self.directorio:
+            shutil.rmtree(self.directorio, ignore_errors=True)
+
+    def estadisticas(self):
+        with self._lock:
+            consultas = self.aciertos_memoria + self.aciertos_disco + self.fallos
+            return {
+                "version_modelo": self._version,
+                "entradas_memoria": len(self._entradas),
+                "tamano_maximo": self.tamano,
+                "aciertos_memoria": self.aciertos_memoria,
+                "aciertos_disco": self.aciertos_disco,
+                "fallos": self.fallos,
+                "tasa_aciertos": (self.aciertos_memoria + self.aciertos_disco) / consultas if consultas else 0.0,
+            }
+
+
+cache_ecg = CacheECG()
@@ -0,0 +1,144 @@
+"""
+Carga de los datos de entrenamiento directamente en arrays de NumPy.
+
+Se seleccionan con SQLAlchemy Core solo las columnas de signos vitales (y, si
+se piden, el id y la etiqueta sufre_infarto), sin hidratar objetos TriajeML ni
+leer columnas de texto como alergias o motivo_consulta. Cada bloque de filas se
+convierte de una sola vez a un array float y se copia en arrays ya reservados
+(carga completa) o se entrega por separado (carga por bloques).
+"""
+
+import os
+from itertools import chain
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import select, func
+
+from db.connection import SessionLocal
+from ml.model import TriajeML, COLUMNAS_SIGNOS
+
+# Filas convertidas a NumPy por bloque
+TAMANO_LOTE_CARGA = int(os.getenv("ML_TAMANO_LOTE_CARGA", "5000"))
+
+
+def _consulta(desde_id=None):
+    """SELECT id_triaje, <signos vitales>, sufre_infarto ordenado por id_triaje."""
+    consulta = select(
+        TriajeML.id_triaje, *[getattr(TriajeML, c) for c in COLUMNAS_SIGNOS], TriajeML.sufre_infarto
+    ).order_by(TriajeML.id_triaje)
+    if desde_id is not None:
+        consulta = consulta.where(TriajeML.id_triaje > desde_id)
+    return consulta
+
+
+def _a_array(filas):
+    # id, 6 signos y etiqueta en un único array (n, 8); los NULL quedan como NaN.
+    # fromiter recorre los valores en plano: np.array() sobre objetos Row es mucho más lento.
+    columnas = len(COLUMNAS_SIGNOS) + 2
+    valores = (np.nan if v is None else v for v in chain.from_iterable(filas))
+    return np.fromiter(valores, dtype=float, count=len(filas) * columnas).reshape(len(filas), columnas)
+
+
+def empaquetar(ids, X, y, con_id, con_etiqueta, como_dataframe):
+    """Devuelve {"X", "ids", "y"} o un DataFrame con las columnas pedidas."""
+    if como_dataframe:
+        df = pd.DataFrame(X, columns=COLUMNAS_SIGNOS, copy=False)
+        if con_id:
+            df.insert(0, "id_triaje", ids)
+        if con_etiqueta:
+            df["sufre_infarto"] = y
+        return df
+
+    resultado = {"X": X}
+    if con_id:
+        resultado["ids"] = ids
+    if con_etiqueta:
+        resultado["y"] = y
+    return resultado
+
+
+def cargar_triajes(desde_id=None, con_id=False, con_etiqueta=False, como_dataframe=False,
+                   tamano_lote=TAMANO_LOTE_CARGA):
+    """
+    Carga todos los triajes (o los que tienen id mayor a `desde_id`) en arrays reservados de antemano.
+
+    Args:
+        desde_id: Solo se cargan triajes con id_triaje mayor a este valor
+        con_id: Incluir los id_triaje
+        con_etiqueta: Incluir sufre_infarto como 0/1 (NULL cuenta como 0)
+        como_dataframe: Devolver un DataFrame en lugar de un diccionario de arrays
+        tamano_lote: Filas leídas y convertidas por bloque
+
+    Returns:
+        dict | DataFrame: {"X": (n, 6) float, "ids": (n,) int64, "y": (n,) int8}
+    """
+    db = SessionLocal()
+    try:
+        filtro = [] if desde_id is None else [TriajeML.id_triaje > desde_id]
+        total, maximo = db.execute(
+            select(func.count(), func.max(TriajeML.id_triaje)).where(*filtro)
+        ).one()
+
+        X = np.empty((total, len(COLUMNAS_SIGNOS)), dtype=float)
+        ids = np.empty(total, dtype=np.int64)
+        y = np.empty(total, dtype=np.int8)
+
+        posicion = 0
+        if total:
+            # Las filas insertadas después del conteo quedan fuera: caben en lo reservado
+            consulta = _consulta(desde_id).where(TriajeML.id_triaje <= maximo)
+            # Ejecución en la conexión (Core): no pasa por la capa de carga del ORM
+            resultado = db.connection().execute(consulta, execution_options={"yield_per": tamano_lote})
+            for filas in resultado.partitions():
+                bloque = _a_array(filas)
+                fin = posicion + len(bloque)
+                ids[posicion:fin] = bloque[:, 0]
+                X[posicion:fin] = bloque[:, 1:-1]
+                y[posicion:fin] = np.nan_to_num(bloque[:, -1])
+                posicion = fin
+    finally:
+        db.close()
+
+    # Si se borraron filas entre el conteo y la lectura, se descarta lo no usado
+    return empaquetar(ids[:posicion], X[:posicion], y[:posicion], con_id, con_etiqueta, como_dataframe)
+
+
+def iterar_bloques_triajes(tamano_lote=TAMANO_LOTE_CARGA, desde_id=None, con_id=False, con_etiqueta=False,
+                           como_dataframe=False, filtrar=None):
+    """
+    Recorre los triajes por id_triaje en bloques de `tamano_lote` filas con paginación
+    por clave (sin OFFSET). Cada bloque se pide con una consulta nueva, por lo que se
+    puede escribir en la BD entre un bloque y otro. Solo un bloque está en memoria a la vez.
+
+    Args:
+        filtrar: Función opcional que recibe el select y devuelve otro (joins, WHERE adicionales)
+
+    Yields:
+        dict | DataFrame: Un bloque con el mismo formato que cargar_triajes()
+    """
+    consulta = _consulta(desde_id).limit(tamano_lote)
+    if filtrar is not None:
+        consulta = filtrar(consulta)
+
+    ultimo_id = None
+    db = SessionLocal()
+    try:
+        while True:
+            pagina = consulta if ultimo_id is None else consulta.where(TriajeML.id_triaje > ultimo_id)
+            filas = db.connection().execute(pagina).all()
+            if not filas:
+                return
+            ultimo_id = filas[-1][0]
+
+            bloque = _a_array(filas)
+            yield empaquetar(
+                bloque[:, 0].astype(np.int64),
+                np.ascontiguousarray(bloque[:, 1:-1]),
+                np.nan_to_num(bloque[:, -1]).astype(np.int8),
+                con_id,
+                con_etiqueta,
+                como_dataframe,
+            )
+    finally:
+        db.close()
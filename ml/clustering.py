@@ -1,34 +1,80 @@
+import numpy as np
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
-from sklearn.cluster import KMeans
-import joblib
+from sklearn.cluster import KMeans, MiniBatchKMeans
+from sklearn.metrics import silhouette_score
+from joblib import Parallel, delayed
 import os
-from db.connection import SessionLocal
-from ml.model import TriajeML
+import time
+from sqlalchemy import Column, Integer, Float, String, ForeignKey, select, or_, func
+from db.connection import Base, SessionLocal
+from db.bulk import insertar_o_actualizar
+from ml.model import TriajeML, COLUMNAS_SIGNOS, INFERENCIA_NUMPY
+from ml.registro import registro
+from ml.artefactos import (
+    publicar_artefacto, importar_pickle, cargar_parametros, cargar_modelo_sklearn, ruta_puntero, version_actual
+)
+from ml.inferencia_numpy import PredictorClustersNumpy, a_matriz
+from ml.progreso import reportar_progreso
+from ml.cargador_datos import iterar_bloques_triajes
+from ml.instantanea import leer_triajes, iterar_bloques, INSTANTANEA_TRIAJES
 
+ARTEFACTO_CLUSTERS = "clusters"
+
+# Modelo sklearn inicial: se importa al almacén de artefactos si todavía no hay ninguna versión
 MODEL_CLUSTER_PATH = "ml/model_clusters.pkl"
 
-def entrenar_clusters(num_clusters=3):
+# Filas leídas de la BD y asignadas por bloque al recorrer la tabla
+TAMANO_LOTE_CLUSTERS = int(os.getenv("ML_TAMANO_LOTE_CLUSTERS", "1000"))
+
+# A partir de estas filas entrenar_clusters() entrena por bloques (MiniBatchKMeans)
+UMBRAL_CLUSTERS_STREAMING = int(os.getenv("ML_UMBRAL_CLUSTERS_STREAMING", "100000"))
+
+# Pasadas completas sobre la tabla del MiniBatchKMeans en modo streaming
+EPOCAS_CLUSTERS_STREAMING = int(os.getenv("ML_EPOCAS_CLUSTERS_STREAMING", "3"))
+
+# Selección automática de k: procesos en paralelo y filas usadas para la silueta
+WORKERS_AUTO_K = int(os.getenv("ML_WORKERS_AUTO_K", "-1"))
+MUESTRA_SILUETA = int(os.getenv("ML_MUESTRA_SILUETA", "5000"))
+
+
+# --- ASIGNACIONES PERSISTIDAS ---
+class AsignacionClusterML(Base):
+    """Cluster de cada triaje junto con la versión del modelo K-Means que lo calculó."""
+
+    __tablename__ = "asignaciones_cluster"
+
+    id_triaje = Column(Integer, ForeignKey("triajes_ml.id_triaje", ondelete="CASCADE"), primary_key=True)
+    cluster = Column(Integer, nullable=False)
+    distancia = Column(Float)
+    version_modelo = Column(String(40), nullable=False, index=True)
+
+
+def entrenar_clusters(num_clusters=3, streaming=None, tamano_lote=TAMANO_LOTE_CLUSTERS):
     """
     Entrena un modelo K-Means con los datos de la BD triajes_ml.
     Agrupa pacientes según sus características fisiológicas.
+
+    Si la tabla supera ML_UMBRAL_CLUSTERS_STREAMING filas (o con streaming=True)
+    se entrena en modo out-of-core con entrenar_clusters_streaming().
     """
     db = SessionLocal()
-    registros = db.query(TriajeML).all()
-
-    if not registros:
+    try:
+        total = db.execute(select(func.count()).select_from(TriajeML)).scalar()
+    finally:
         db.close()
+
+    if streaming is None:
+        streaming = total > UMBRAL_CLUSTERS_STREAMING
+    if total and streaming:
+        return entrenar_clusters_streaming(num_clusters, tamano_lote)
+
+    # Solo las seis columnas de signos vitales, leídas de la instantánea local
+    df = leer_triajes(como_dataframe=True)
+    if df.empty:
         return "⚠️ No hay datos en la base de datos para agrupar."
 
-    # Crear DataFrame con los datos clínicos
-    df = pd.DataFrame([{
-        "temperatura": r.temperatura,
-        "frecuencia_cardiaca": r.frecuencia_cardiaca,
-        "frecuencia_respiratoria": r.frecuencia_respiratoria,
-        "saturacion_oxigeno": r.saturacion_oxigeno,
-        "peso": r.peso,
-        "estatura": r.estatura
-    } for r in registros])
+    reportar_progreso(0.3, "datos cargados")
 
     # Estandarizar los datos
     scaler = StandardScaler()
@@ -38,84 +84,376 @@ def entrenar_clusters(num_clusters=3):
     kmeans = KMeans(n_clusters=num_clusters, random_state=42)
     kmeans.fit(datos_scaled)
 
-    # Guardar modelo y scaler
-    os.makedirs("ml", exist_ok=True)
-    joblib.dump({"model": kmeans, "scaler": scaler}, MODEL_CLUSTER_PATH)
+    return _publicar_modelo_clusters(kmeans, scaler, len(df), num_clusters)
 
-    db.close()
-    return f"✅ Modelo K-Means entrenado con {len(df)} pacientes en {num_clusters} grupos."
 
+def _publicar_modelo_clusters(kmeans, scaler, filas, num_clusters, metadatos=None):
+    # Guardar modelo y scaler como nueva versión del artefacto
+    modelo_guardado = {"model": kmeans, "scaler": scaler}
+    publicar_artefacto(
+        ARTEFACTO_CLUSTERS,
+        PredictorClustersNumpy.desde_sklearn(modelo_guardado).parametros(),
+        modelo=modelo_guardado,
+        metadatos={
+            "tipo": type(kmeans).__name__, "num_clusters": num_clusters, "filas_entrenamiento": filas,
+            **(metadatos or {}),
+        },
+    )
+    reportar_progreso(0.7, "modelo guardado")
 
-def predecir_cluster(datos):
+    # El modelo cambió de versión: todas las asignaciones guardadas quedan obsoletas
+    reasignados = actualizar_asignaciones()
+
+    return (
+        f"✅ Modelo K-Means entrenado con {filas} pacientes en {num_clusters} grupos "
+        f"({reasignados} asignaciones recalculadas)."
+    )
+
+
+def entrenar_clusters_streaming(num_clusters=3, tamano_lote=TAMANO_LOTE_CLUSTERS, epocas=None):
     """
-    Asigna un paciente nuevo a un grupo basado en el modelo K-Means entrenado.
+    Entrena el modelo de clusters sin cargar la tabla completa en memoria.
+
+    Primera pasada: el StandardScaler acumula media y varianza con partial_fit.
+    Siguientes pasadas (`epocas`): un MiniBatchKMeans se actualiza con partial_fit
+    sobre cada bloque ya estandarizado. La memoria usada depende de `tamano_lote`,
+    no del tamaño de la tabla, y el modelo se guarda en el mismo formato
+    {"model", "scaler"} que entrenar_clusters().
     """
-    if not os.path.exists(MODEL_CLUSTER_PATH):
+    epocas = epocas or EPOCAS_CLUSTERS_STREAMING
+    # partial_fit inicializa los centroides con el primer bloque: debe tener al menos num_clusters filas
+    tamano_lote = max(tamano_lote, num_clusters)
+
+    scaler = StandardScaler()
+    filas = 0
+    for bloque in iterar_bloques(tamano_lote, como_dataframe=True):
+        scaler.partial_fit(bloque)
+        filas += len(bloque)
+
+    if filas == 0:
+        return "⚠️ No hay datos en la base de datos para agrupar."
+    if filas < num_clusters:
+        raise ValueError(f"❌ Se necesitan al menos {num_clusters} pacientes para formar {num_clusters} grupos.")
+    reportar_progreso(0.2, "scaler ajustado")
+
+    kmeans = MiniBatchKMeans(n_clusters=num_clusters, batch_size=tamano_lote, random_state=42, n_init=3)
+    for epoca in range(epocas):
+        for bloque in iterar_bloques(tamano_lote, como_dataframe=True):
+            kmeans.partial_fit(scaler.transform(bloque))
+        reportar_progreso(0.2 + 0.4 * (epoca + 1) / epocas, f"época {epoca + 1}/{epocas}")
+
+    return _publicar_modelo_clusters(kmeans, scaler, filas, num_clusters)
+
+
+# --- SELECCIÓN AUTOMÁTICA DEL NÚMERO DE CLUSTERS ---
+def _evaluar_k(X_scaled, muestra, k, tamano_lote):
+    """
+    Entrena un candidato con k grupos y lo puntúa. Se ejecuta en un proceso del pool
+    de joblib, que comparte X_scaled entre procesos mapeándolo en memoria si es grande.
+    """
+    inicio = time.perf_counter()
+    if len(X_scaled) > UMBRAL_CLUSTERS_STREAMING:
+        kmeans = MiniBatchKMeans(n_clusters=k, batch_size=tamano_lote, random_state=42, n_init=3)
+    else:
+        kmeans = KMeans(n_clusters=k, random_state=42)
+    kmeans.fit(X_scaled)
+    segundos_entrenamiento = time.perf_counter() - inicio
+
+    # La silueta es O(n²): se calcula sobre una muestra fija, igual para todos los k
+    etiquetas = kmeans.predict(X_scaled[muestra])
+    silueta = None
+    if 1 < len(np.unique(etiquetas)) < len(muestra):
+        silueta = float(silhouette_score(X_scaled[muestra], etiquetas))
+
+    return {
+        "k": k,
+        "modelo": kmeans,
+        "inercia": float(kmeans.inertia_),
+        "silueta": silueta,
+        "segundos": round(time.perf_counter() - inicio, 3),
+        "segundos_entrenamiento": round(segundos_entrenamiento, 3),
+    }
+
+
+def _k_codo(puntajes):
+    """k del "codo" de la inercia: el de mayor segunda diferencia (necesita al menos 3 candidatos)."""
+    if len(puntajes) < 3:
+        return puntajes[0]["k"]
+    inercias = [p["inercia"] for p in puntajes]
+    curvaturas = [inercias[i - 1] - 2 * inercias[i] + inercias[i + 1] for i in range(1, len(inercias) - 1)]
+    return puntajes[1 + int(np.argmax(curvaturas))]["k"]
+
+
+def entrenar_clusters_auto(k_min=2, k_max=8, criterio="silueta", n_jobs=None, tamano_lote=TAMANO_LOTE_CLUSTERS):
+    """
+    Elige el número de grupos entrenando en paralelo (joblib, un proceso por candidato)
+    un modelo por cada k en [k_min, k_max] y publica el mejor.
+
+    Args:
+        criterio: "silueta" (mayor silueta sobre una muestra de ML_MUESTRA_SILUETA filas)
+            o "codo" (mayor curvatura de la inercia)
+        n_jobs: Procesos en paralelo (por defecto ML_WORKERS_AUTO_K; -1 usa todos los núcleos)
+
+    Returns:
+        dict: {"mensaje", "num_clusters", "criterio", "segundos", "puntajes": [{k, inercia, silueta, segundos}]}
+    """
+    if criterio not in ("silueta", "codo"):
+        raise ValueError(f"❌ Criterio desconocido: {criterio}")
+
+    inicio = time.perf_counter()
+    X = leer_triajes()["X"]
+    k_max = min(k_max, len(X) - 1)
+    if k_max < max(k_min, 2):
+        return {"mensaje": "⚠️ No hay suficientes pacientes para comparar varios números de grupos.",
+                "num_clusters": None, "criterio": criterio, "segundos": 0.0, "puntajes": []}
+
+    scaler = StandardScaler().fit(pd.DataFrame(X, columns=COLUMNAS_SIGNOS))
+    X_scaled = scaler.transform(pd.DataFrame(X, columns=COLUMNAS_SIGNOS))
+    muestra = np.random.default_rng(42).choice(len(X_scaled), min(MUESTRA_SILUETA, len(X_scaled)), replace=False)
+    muestra.sort()
+    reportar_progreso(0.2, "datos cargados")
+
+    candidatos = Parallel(n_jobs=n_jobs or WORKERS_AUTO_K)(
+        delayed(_evaluar_k)(X_scaled, muestra, k, tamano_lote) for k in range(max(k_min, 2), k_max + 1)
+    )
+    reportar_progreso(0.6, f"{len(candidatos)} candidatos evaluados")
+
+    puntajes = [{clave: valor for clave, valor in c.items() if clave != "modelo"} for c in candidatos]
+    if criterio == "silueta" and any(p["silueta"] is not None for p in puntajes):
+        mejor_k = max(puntajes, key=lambda p: (p["silueta"] if p["silueta"] is not None else -1, -p["k"]))["k"]
+    else:
+        criterio = "codo"
+        mejor_k = _k_codo(puntajes)
+    mejor = next(c for c in candidatos if c["k"] == mejor_k)
+
+    mensaje = _publicar_modelo_clusters(
+        mejor["modelo"], scaler, len(X), mejor_k, metadatos={"criterio": criterio, "puntajes": puntajes}
+    )
+    return {
+        "mensaje": f"{mensaje} k elegido por {criterio} entre {puntajes[0]['k']} y {puntajes[-1]['k']}.",
+        "num_clusters": mejor_k,
+        "criterio": criterio,
+        "segundos": round(time.perf_counter() - inicio, 3),
+        "puntajes": puntajes,
+    }
+
+
+def _verificar_modelo_clusters():
+    if not importar_pickle(
+        ARTEFACTO_CLUSTERS, MODEL_CLUSTER_PATH, lambda m: PredictorClustersNumpy.desde_sklearn(m).parametros()
+    ):
         raise FileNotFoundError("❌ No se encontró el modelo K-Means entrenado. Ejecuta entrenar_clusters().")
 
-    modelo_guardado = joblib.load(MODEL_CLUSTER_PATH)
-    kmeans = modelo_guardado["model"]
-    scaler = modelo_guardado["scaler"]
 
-    df = pd.DataFrame([{
-        "temperatura": datos["temperatura"],
-        "frecuencia_cardiaca": datos["frecuencia_cardiaca"],
-        "frecuencia_respiratoria": datos["frecuencia_respiratoria"],
-        "saturacion_oxigeno": datos["saturacion_oxigeno"],
-        "peso": datos["peso"],
-        "estatura": datos["estatura"]
-    }])
+def _cargar_modelo_clusters():
+    _verificar_modelo_clusters()
+    modelo_guardado = registro.obtener(
+        ruta_puntero(ARTEFACTO_CLUSTERS), lambda _: cargar_modelo_sklearn(ARTEFACTO_CLUSTERS), clave="clusters_sklearn"
+    )
+    return modelo_guardado["model"], modelo_guardado["scaler"]
+
+
+def _cargar_predictor_clusters_numpy():
+    _verificar_modelo_clusters()
+    return registro.obtener(
+        ruta_puntero(ARTEFACTO_CLUSTERS),
+        lambda _: PredictorClustersNumpy.desde_parametros(cargar_parametros(ARTEFACTO_CLUSTERS)[0]),
+        clave="clusters_numpy",
+    )
 
-    df_scaled = scaler.transform(df)
-    cluster = kmeans.predict(df_scaled)[0]
+
+def precargar_modelo_clusters():
+    """Carga en el registro el modelo K-Means que usa la asignación (p. ej. antes del fork de los workers)."""
+    return _cargar_predictor_clusters_numpy() if INFERENCIA_NUMPY else _cargar_modelo_clusters()
+
+
+def version_modelo_clusters():
+    """
+    Identificador de la versión publicada del modelo K-Means en el almacén de artefactos,
+    estable entre procesos y reinicios.
+    """
+    _verificar_modelo_clusters()
+    return version_actual(ARTEFACTO_CLUSTERS)
+
+
+def _asignar_matriz(X):
+    """Devuelve (clusters, distancias al centroide) para una matriz de signos vitales."""
+    if INFERENCIA_NUMPY:
+        return _cargar_predictor_clusters_numpy().asignar(X)
+
+    kmeans, scaler = _cargar_modelo_clusters()
+    datos_scaled = scaler.transform(pd.DataFrame(X, columns=COLUMNAS_SIGNOS))
+    clusters = kmeans.predict(datos_scaled)
+    distancias = np.linalg.norm(datos_scaled - kmeans.cluster_centers_[clusters], axis=1)
+    return clusters, distancias
+
+
+def predecir_cluster(datos):
+    """
+    Asigna un paciente nuevo a un grupo basado en el modelo K-Means entrenado.
+    """
+    cluster = predecir_clusters_lote([datos])[0]["cluster"]
 
     return {
-        "cluster": int(cluster),
+        "cluster": cluster,
         "mensaje": f"El paciente pertenece al grupo {cluster}."
     }
 
-def agrupar_pacientes():
+
+def predecir_clusters_lote(lista_datos):
     """
-    Usa el modelo entrenado para asignar un cluster a todos los pacientes de la BD.
-    Devuelve una lista con el ID del paciente y su grupo.
+    Asigna un grupo a varios pacientes a la vez: se escala una sola matriz y se
+    hace una única asignación vectorizada (NumPy directo o kmeans.predict si
+    ML_INFERENCIA_NUMPY=0). Para cada paciente devuelve el
+    cluster y la distancia a su centroide (en el espacio estandarizado),
+    en el mismo orden que la entrada.
     """
-    if not os.path.exists(MODEL_CLUSTER_PATH):
-        raise FileNotFoundError("❌ No se encontró el modelo K-Means entrenado. Ejecuta entrenar_clusters().")
+    if not lista_datos:
+        return []
+
+    clusters, distancias = _asignar_matriz(a_matriz(lista_datos, COLUMNAS_SIGNOS))
 
-    # Cargar modelo y scaler
-    modelo_guardado = joblib.load(MODEL_CLUSTER_PATH)
-    kmeans = modelo_guardado["model"]
-    scaler = modelo_guardado["scaler"]
+    return [
+        {"cluster": int(cluster), "distancia": float(distancia)}
+        for cluster, distancia in zip(clusters, distancias)
+    ]
+
+
+def _bloques_sin_asignacion_instantanea(db, version, tamano_lote):
+    """
+    Triajes sin asignación de la versión actual, con los signos vitales leídos de la
+    instantánea local: de la BD solo se leen los id_triaje ya asignados.
+    """
+    datos = leer_triajes(con_id=True)
+    vigentes = np.fromiter(
+        db.execute(
+            select(AsignacionClusterML.id_triaje).where(AsignacionClusterML.version_modelo == version)
+        ).scalars(),
+        dtype=np.int64,
+    )
+    pendientes = ~np.isin(datos["ids"], vigentes, assume_unique=True)
+    ids, X = datos["ids"][pendientes], datos["X"][pendientes]
+    for inicio in range(0, len(ids), tamano_lote):
+        yield {"ids": ids[inicio:inicio + tamano_lote], "X": X[inicio:inicio + tamano_lote]}
+
+
+def _guardar_asignaciones(db, ids, X, version):
+    clusters, distancias = _asignar_matriz(X)
+    insertar_o_actualizar(
+        db,
+        AsignacionClusterML.__table__,
+        [
+            {
+                "id_triaje": int(id_triaje),
+                "cluster": int(cluster),
+                "distancia": float(distancia),
+                "version_modelo": version,
+            }
+            for id_triaje, cluster, distancia in zip(ids, clusters, distancias)
+        ],
+        claves=["id_triaje"],
+    )
+    db.commit()
+
+
+def asignar_triajes_nuevos(filas):
+    """
+    Guarda el cluster de triajes recién insertados (lo llama la sincronización),
+    para que obtenerClusters sea solo una lectura.
 
-    # Conectar a la base
+    Args:
+        filas: Diccionarios con id_triaje y los signos vitales
+
+    Returns:
+        int: Número de asignaciones guardadas
+    """
+    if not filas:
+        return 0
+    version = version_modelo_clusters()
     db = SessionLocal()
-    registros = db.query(TriajeML).all()
+    try:
+        _guardar_asignaciones(
+            db, [f["id_triaje"] for f in filas], a_matriz(filas, COLUMNAS_SIGNOS), version
+        )
+    finally:
+        db.close()
+    return len(filas)
+
 
-    if not registros:
+def actualizar_asignaciones(tamano_lote=TAMANO_LOTE_CLUSTERS):
+    """
+    Calcula y guarda el cluster solo de los triajes que no tienen asignación o
+    cuya asignación proviene de otra versión del modelo. Tras reentrenar,
+    esto equivale a una reasignación completa; en el resto de casos solo se
+    procesan los triajes nuevos. Los signos vitales se leen de la instantánea
+    local (ml/instantanea.py) salvo con ML_INSTANTANEA_TRIAJES=0.
+
+    Returns:
+        int: Número de asignaciones calculadas
+    """
+    version = version_modelo_clusters()
+
+    def sin_asignacion_vigente(consulta):
+        return consulta.outerjoin(
+            AsignacionClusterML, AsignacionClusterML.id_triaje == TriajeML.id_triaje
+        ).where(or_(AsignacionClusterML.id_triaje.is_(None), AsignacionClusterML.version_modelo != version))
+
+    total = 0
+    db = SessionLocal()
+    try:
+        if INSTANTANEA_TRIAJES:
+            bloques = _bloques_sin_asignacion_instantanea(db, version, tamano_lote)
+        else:
+            bloques = iterar_bloques_triajes(tamano_lote, con_id=True, filtrar=sin_asignacion_vigente)
+
+        for bloque in bloques:
+            _guardar_asignaciones(db, bloque["ids"], bloque["X"], version)
+            total += len(bloque["ids"])
+    finally:
         db.close()
-        return []
 
-    # Crear DataFrame con los datos clínicos
-    df = pd.DataFrame([{
-        "id_triaje": r.id_triaje,  # 👈 reemplazado aquí
-        "temperatura": r.temperatura,
-        "frecuencia_cardiaca": r.frecuencia_cardiaca,
-        "frecuencia_respiratoria": r.frecuencia_respiratoria,
-        "saturacion_oxigeno": r.saturacion_oxigeno,
-        "peso": r.peso,
-        "estatura": r.estatura
-    } for r in registros])
-
-    # Escalar los datos
-    datos_scaled = scaler.transform(df[[
-        "temperatura", "frecuencia_cardiaca", "frecuencia_respiratoria",
-        "saturacion_oxigeno", "peso", "estatura"
-    ]])
-
-    # Predecir clusters
-    df["cluster"] = kmeans.predict(datos_scaled)
-
-    db.close()
-
-    # Convertir resultado a lista de diccionarios
-    return df[["id_triaje", "cluster"]].to_dict(orient="records")  # 👈 y aquí también
+    if total:
+        print(f"🧩 {total} asignaciones de cluster actualizadas (modelo {version})")
+    return total
+
+
+def iterar_clusters_pacientes(despues_de=None, limite=None, tamano_lote=TAMANO_LOTE_CLUSTERS):
+    """
+    Recorre en orden de id_triaje las asignaciones de cluster guardadas en la BD.
+
+    Es solo una lectura por clave primaria de asignaciones_cluster (WHERE id_triaje >
+    :despues_de ORDER BY id_triaje LIMIT :limite), hecha en bloques de `tamano_lote`
+    filas (yield_per). Las asignaciones se escriben al sincronizar triajes
+    (asignar_triajes_nuevos) y al publicar o revertir el modelo (actualizar_asignaciones).
+
+    Args:
+        despues_de: Cursor; solo se devuelven pacientes con id_triaje mayor a este valor
+        limite: Número máximo de pacientes a devolver
+        tamano_lote: Filas leídas por bloque
+
+    Yields:
+        dict: {"id_triaje", "cluster", "distancia"} de cada paciente
+    """
+    consulta = select(
+        AsignacionClusterML.id_triaje, AsignacionClusterML.cluster, AsignacionClusterML.distancia
+    ).order_by(AsignacionClusterML.id_triaje)
+    if despues_de is not None:
+        consulta = consulta.where(AsignacionClusterML.id_triaje > despues_de)
+    if limite is not None:
+        consulta = consulta.limit(limite)
+
+    db = SessionLocal()
+    try:
+        resultado = db.execute(consulta, execution_options={"yield_per": tamano_lote})
+        for id_triaje, cluster, distancia in resultado:
+            yield {"id_triaje": id_triaje, "cluster": cluster, "distancia": distancia}
+    finally:
+        db.close()
+
+
+def agrupar_pacientes(despues_de=None, limite=None):
+    """
+    Usa el modelo entrenado para asignar un cluster a los pacientes de la BD.
+    Devuelve una lista con el ID del paciente y su grupo, ordenada por id_triaje.
+    """
+    return list(iterar_clusters_pacientes(despues_de, limite))
@@ -1,143 +1,277 @@
 """
-Módulo para análisis de imágenes de ECG con resultados simulados.
-Implementación rápida para proyecto de prueba.
+Módulo para análisis de imágenes de ECG.
+
+Si se envía el contenido (imagen o señal), el ECG se procesa con
+ml/ecg_senal.py: digitalización del trazo, picos R, frecuencia cardíaca,
+variabilidad RR y desnivel ST. El cálculo corre en el pool de procesos de ese
+módulo, fuera del bucle de eventos de MotorECG, así que un mismo proceso
+atiende muchos análisis a la vez.
+
+Con solo el nombre del archivo no hay nada que procesar y se devuelve el
+resultado simulado anterior: depende del nombre a través de un SHA-256 (igual en
+cualquier proceso o worker), usa su propio random.Random y espera el tiempo de
+procesamiento simulado (ML_ECG_RETARDO) con asyncio.sleep.
+Los resultados se guardan en ml/cache_ecg.py por huella y versión del modelo.
 """
 
+import asyncio
+import hashlib
+import os
 import random
+import threading
 import time
+from concurrent.futures import Future
 from datetime import datetime
 
+import numpy as np
 
-def analizar_ecg_mock(archivo_imagen, id_paciente):
-    """
-    Simula el análisis de una imagen de ECG.
-    Retorna un resultado "realista" pero ficticio.
+from ml.artefactos import publicar_artefacto, version_actual
+from ml.cache_ecg import cache_ecg, CACHE_ECG
+from ml.ecg_senal import analizar_entrada, pool_ecg, MODELO_SENAL_ECG, NO_INTERPRETABLE
+from ml.progreso import reportar_progreso
 
-    Args:
-        archivo_imagen: Nombre del archivo de imagen
-        id_paciente: ID del paciente
+# Segundos de procesamiento simulado por análisis (solo sin contenido de imagen o señal)
+RETARDO_ECG = float(os.getenv("ML_ECG_RETARDO", "0.5"))
+
+MODELO_ECG = "ECG-Mock-DeepLearning-v1.0"
+ARTEFACTO_ECG = "ecg"
+
+# Tipos de diagnóstico con probabilidades realistas
+DIAGNOSTICOS_ECG = [
+    {
+        "tipo": "Normal",
+        "probabilidad": 65,
+        "descripcion": "Ritmo sinusal normal. Ondas P, QRS y T dentro de parámetros normales.",
+        "riesgo": "Bajo",
+    },
+    {
+        "tipo": "Arritmia Supraventricular",
+        "probabilidad": 15,
+        "descripcion": "Arritmia que se origina por encima de los ventrículos. Se requiere seguimiento.",
+        "riesgo": "Medio",
+    },
+    {
+        "tipo": "Isquemia Subendocárdica",
+        "probabilidad": 10,
+        "descripcion": "Cambios sugestivos de isquemia subendocárdica. Considerar evaluación adicional.",
+        "riesgo": "Medio-Alto",
+    },
+    {
+        "tipo": "Fibrilación Auricular",
+        "probabilidad": 5,
+        "descripcion": "Ritmo cardíaco irregular con actividad auricular caótica.",
+        "riesgo": "Alto",
+    },
+    {
+        "tipo": "Infarto Agudo",
+        "probabilidad": 5,
+        "descripcion": "Elevación del segmento ST sugestiva de infarto agudo. Requiere atención inmediata.",
+        "riesgo": "Crítico",
+    },
+    {
+        "tipo": NO_INTERPRETABLE,
+        "probabilidad": 0,
+        "descripcion": "No se detectaron suficientes latidos en el trazo. Repetir el registro.",
+        "riesgo": "Indeterminado",
+    },
+]
 
-    Returns:
-        dict: Resultado del análisis simulado
-    """
-    print(f"[ECG] Analizando imagen: {archivo_imagen} para paciente {id_paciente}")
 
-    # Usar hash del nombre de imagen como semilla para resultados consistentes
-    seed = hash(archivo_imagen) & 0xFFFFFFFF  # Asegurar que sea positivo
-    random.seed(seed)
-
-    # Simular tiempo de procesamiento
-    time.sleep(0.5)
-
-    # Tipos de diagnóstico con probabilidades realistas
-    diagnosticos = [
-        {
-            "tipo": "Normal",
-            "probabilidad": 65,
-            "descripcion": "Ritmo sinusal normal. Ondas P, QRS y T dentro de parámetros normales.",
-            "riesgo": "Bajo",
-        },
-        {
-            "tipo": "Arritmia Supraventricular",
-            "probabilidad": 15,
-            "descripcion": "Arritmia que se origina por encima de los ventrículos. Se requiere seguimiento.",
-            "riesgo": "Medio",
-        },
-        {
-            "tipo": "Isquemia Subendocárdica",
-            "probabilidad": 10,
-            "descripcion": "Cambios sugestivos de isquemia subendocárdica. Considerar evaluación adicional.",
-            "riesgo": "Medio-Alto",
-        },
-        {
-            "tipo": "Fibrilación Auricular",
-            "probabilidad": 5,
-            "descripcion": "Ritmo cardíaco irregular con actividad auricular caótica.",
-            "riesgo": "Alto",
-        },
-        {
-            "tipo": "Infarto Agudo",
-            "probabilidad": 5,
-            "descripcion": "Elevación del segmento ST sugestiva de infarto agudo. Requiere atención inmediata.",
-            "riesgo": "Crítico",
-        },
-    ]
-
-    # Seleccionar diagnóstico basado en probabilidades (ahora determinístico)
-    rand = random.randint(1, 100)
+def huella_ecg(archivo_imagen, imagen=None, senal=None, frecuencia=None):
+    """SHA-256 (hex) del contenido de la imagen o de la señal, o del nombre del archivo si no se envía contenido."""
+    if imagen is not None:
+        return hashlib.sha256(imagen).hexdigest()
+    if senal is not None:
+        huella = hashlib.sha256(f"senal:{frecuencia}:".encode())
+        huella.update(np.ascontiguousarray(senal, dtype=np.float64).tobytes())
+        return huella.hexdigest()
+    return hashlib.sha256(archivo_imagen.encode("utf-8")).hexdigest()
+
+
+def _generar_resultado(rng):
+    """Diagnóstico y frecuencia cardíaca simulados con el generador `rng`."""
+    # Seleccionar diagnóstico basado en probabilidades (determinístico para la misma semilla)
+    rand = rng.randint(1, 100)
     if rand <= 65:
-        resultado = diagnosticos[0]  # Normal
+        resultado = DIAGNOSTICOS_ECG[0]  # Normal
     elif rand <= 80:
-        resultado = diagnosticos[1]  # Arritmia
+        resultado = DIAGNOSTICOS_ECG[1]  # Arritmia
     elif rand <= 90:
-        resultado = diagnosticos[2]  # Isquemia
+        resultado = DIAGNOSTICOS_ECG[2]  # Isquemia
     elif rand <= 95:
-        resultado = diagnosticos[3]  # Fibrilación
+        resultado = DIAGNOSTICOS_ECG[3]  # Fibrilación
     else:
-        resultado = diagnosticos[4]  # Infarto
+        resultado = DIAGNOSTICOS_ECG[4]  # Infarto
 
     # Añadir valores simulados de medición
-    medicion_heart_rate = random.randint(60, 100)
+    medicion_heart_rate = rng.randint(60, 100)
     if resultado["tipo"] == "Fibrilación Auricular":
-        medicion_heart_rate = random.randint(90, 150)
+        medicion_heart_rate = rng.randint(90, 150)
     elif resultado["tipo"] == "Infarto Agudo":
-        medicion_heart_rate = random.randint(80, 130)
+        medicion_heart_rate = rng.randint(80, 130)
 
     return {
-        "id_paciente": id_paciente,
-        "archivo_imagen": archivo_imagen,
-        "fecha_analisis": datetime.now().isoformat(),
         "diagnostico": resultado["tipo"],
         "descripcion": resultado["descripcion"],
         "probabilidad": resultado["probabilidad"],
         "nivel_riesgo": resultado["riesgo"],
         "frecuencia_cardiaca": medicion_heart_rate,
+    }
+
+
+def version_modelo_ecg():
+    """Versión del procesamiento y versión publicada del modelo ECG (cambia con cada entrenamiento)."""
+    return f"{MODELO_SENAL_ECG}@{version_actual(ARTEFACTO_ECG) or 'base'}"
+
+
+def _simular_analisis(huella):
+    # Semilla estable: los primeros 64 bits del SHA-256 (hash() cambia en cada proceso)
+    return {**_generar_resultado(random.Random(int(huella[:16], 16))), "modelo_utilizado": MODELO_ECG}
+
+
+def _analisis_senal(rasgos):
+    """Resultado de ecg_senal.analizar_entrada() con la descripción y el riesgo del diagnóstico."""
+    diagnostico = next(d for d in DIAGNOSTICOS_ECG if d["tipo"] == rasgos["tipo"])
+    redondear = lambda valor, decimales: None if valor is None else round(valor, decimales)  # noqa: E731
+    return {
+        "diagnostico": diagnostico["tipo"],
+        "descripcion": diagnostico["descripcion"],
+        "probabilidad": diagnostico["probabilidad"],
+        "nivel_riesgo": diagnostico["riesgo"],
+        "frecuencia_cardiaca": redondear(rasgos["frecuencia_cardiaca"], None),
+        "latidos": rasgos["latidos"],
+        "rr_medio_ms": redondear(rasgos["rr_medio_ms"], 1),
+        "sdnn_ms": redondear(rasgos["sdnn_ms"], 1),
+        "rmssd_ms": redondear(rasgos["rmssd_ms"], 1),
+        "desnivel_st": redondear(rasgos["desnivel_st"], 3),
+        "modelo_utilizado": MODELO_SENAL_ECG,
+    }
+
+
+def _resultado_analisis(archivo_imagen, id_paciente, analisis, segundos, desde_cache=False):
+    return {
+        "id_paciente": id_paciente,
+        "archivo_imagen": archivo_imagen,
+        "fecha_analisis": datetime.now().isoformat(),
+        **analisis,
         "estado": "Completado",
-        "tiempo_procesamiento": "0.5 segundos",
-        "modelo_utilizado": "ECG-Mock-DeepLearning-v1.0",
+        "tiempo_procesamiento": f"{segundos:.2f} segundos",
+        "desde_cache": desde_cache,
     }
 
 
-def obtener_historico_ecg_mock(id_paciente):
+class MotorECG:
     """
-    Simula el histórico de análisis ECG para un paciente.
+    Ejecuta los análisis de ECG en un bucle asyncio propio, en un hilo en segundo plano.
 
-    Args:
-        id_paciente: ID del paciente
+    Desde código síncrono (resolvers de GraphQL) se usa analizar() o analizar_lote();
+    desde código asíncrono, directamente `await motor.analizar_async(...)`. Los
+    resultados en `cache` se devuelven sin pasar por el bucle ni por el pool.
 
-    Returns:
-        list: Lista de análisis previos
+    Args:
+        retardo: Segundos de procesamiento simulado por análisis sin contenido
+        cache: CacheECG donde buscar y guardar los resultados (None para no usar caché)
     """
-    print(f"[ECG] Obteniendo historico ECG para paciente {id_paciente}")
 
-    # Generar 2-5 análisis previos aleatorios
-    num_analisis = random.randint(2, 5)
-    historico = []
+    def __init__(self, retardo=RETARDO_ECG, cache=None):
+        self.retardo = retardo
+        self.cache = cache
+        self._bucle = None
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def _bucle_activo(self):
+        # Se crea al primer uso y de nuevo en los procesos hijos (tras un fork el hilo no existe)
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._bucle = asyncio.new_event_loop()
+                self._hilo = threading.Thread(target=self._bucle.run_forever, name="motor-ecg", daemon=True)
+                self._hilo.start()
+            return self._bucle
+
+    def _buscar(self, archivo_imagen, id_paciente, imagen, senal, frecuencia):
+        """(huella, versión, resultado en caché o None)."""
+        inicio = time.perf_counter()
+        huella = huella_ecg(archivo_imagen, imagen, senal, frecuencia)
+        version = version_modelo_ecg()
+        analisis = self.cache.obtener(huella, version) if self.cache is not None else None
+        if analisis is None:
+            return huella, version, None
+        return huella, version, _resultado_analisis(
+            archivo_imagen, id_paciente, analisis, time.perf_counter() - inicio, desde_cache=True
+        )
+
+    async def _calcular(self, archivo_imagen, id_paciente, huella, version, imagen, senal, frecuencia):
+        inicio = time.perf_counter()
+        if imagen is None and senal is None:
+            if self.retardo > 0:
+                await asyncio.sleep(self.retardo)
+            analisis = _simular_analisis(huella)
+        else:
+            entrada = {"imagen": imagen} if imagen is not None else {"senal": senal, "frecuencia": frecuencia}
+            # Cálculo de CPU: en el pool de procesos (o en un hilo con ML_WORKERS_ECG=0)
+            rasgos = await asyncio.get_running_loop().run_in_executor(pool_ecg(), analizar_entrada, entrada)
+            analisis = _analisis_senal(rasgos)
+        if self.cache is not None:
+            self.cache.guardar(huella, version, analisis)
+        return _resultado_analisis(archivo_imagen, id_paciente, analisis, time.perf_counter() - inicio)
 
-    for i in range(num_analisis):
-        # Fecha aleatoria en los últimos 6 meses
-        dias_atras = random.randint(1, 180)
-        fecha = datetime.now().replace(day=max(1, datetime.now().day - dias_atras))
+    async def analizar_async(self, archivo_imagen, id_paciente, imagen=None, senal=None, frecuencia=None):
+        huella, version, resultado = self._buscar(archivo_imagen, id_paciente, imagen, senal, frecuencia)
+        if resultado is not None:
+            return resultado
+        return await self._calcular(archivo_imagen, id_paciente, huella, version, imagen, senal, frecuencia)
 
-        # Generar resultado aleatorio
-        resultado = analizar_ecg_mock(f"ecg_hist_{i + 1}.jpg", id_paciente)
-        resultado["fecha_analisis"] = fecha.isoformat()
-        resultado["id_analisis"] = f"ECG_{id_paciente}_{i + 1:03d}"
+    def enviar(self, archivo_imagen, id_paciente, imagen=None, senal=None, frecuencia=None):
+        """Programa un análisis y devuelve un concurrent.futures.Future con su resultado."""
+        huella, version, resultado = self._buscar(archivo_imagen, id_paciente, imagen, senal, frecuencia)
+        if resultado is not None:
+            futuro = Future()
+            futuro.set_result(resultado)
+            return futuro
+        return asyncio.run_coroutine_threadsafe(
+            self._calcular(archivo_imagen, id_paciente, huella, version, imagen, senal, frecuencia),
+            self._bucle_activo(),
+        )
 
-        # Filtrar solo los campos que están en HistoricoECG
-        historico_item = {
-            "id_analisis": resultado["id_analisis"],
-            "fecha_analisis": resultado["fecha_analisis"],
-            "diagnostico": resultado["diagnostico"],
-            "descripcion": resultado["descripcion"],
-            "probabilidad": resultado["probabilidad"],
-            "nivel_riesgo": resultado["nivel_riesgo"],
-            "archivo_imagen": resultado["archivo_imagen"],
-        }
+    def analizar(self, archivo_imagen, id_paciente, imagen=None, senal=None, frecuencia=None):
+        return self.enviar(archivo_imagen, id_paciente, imagen, senal, frecuencia).result()
 
-        historico.append(historico_item)
+    def analizar_lote(self, solicitudes):
+        """
+        Analiza varios ECG a la vez, repartidos entre los procesos del pool.
 
-    return historico
+        Args:
+            solicitudes: Lista de tuplas (archivo_imagen, id_paciente[, imagen, senal, frecuencia])
+        """
+        futuros = [self.enviar(*solicitud) for solicitud in solicitudes]
+        return [futuro.result() for futuro in futuros]
+
+
+motor_ecg = MotorECG(cache=cache_ecg if CACHE_ECG else None)
+
+
+def analizar_ecg(archivo_imagen, id_paciente, imagen=None, senal=None, frecuencia=None):
+    """
+    Analiza un ECG a partir de su imagen o de su señal.
+    Sin contenido, retorna un resultado simulado a partir del nombre del archivo.
+
+    Args:
+        archivo_imagen: Nombre del archivo de imagen
+        id_paciente: ID del paciente
+        imagen: Contenido de la imagen en bytes (PNG/JPG con Pillow, PGM/PPM o .npy)
+        senal: Muestras de una derivación (alternativa a la imagen)
+        frecuencia: Frecuencia de muestreo de `senal` en Hz (por defecto ML_ECG_FRECUENCIA)
+
+    Returns:
+        dict: Resultado del análisis
+    """
+    print(f"[ECG] Analizando imagen: {archivo_imagen} para paciente {id_paciente}")
+    return motor_ecg.analizar(archivo_imagen, id_paciente, imagen, senal, frecuencia)
+
+
+# Nombre anterior (test_consistency.py y scripts de prueba)
+analizar_ecg_mock = analizar_ecg
 
 
 def entrenar_modelo_ecg_mock():
@@ -149,12 +283,15 @@ def entrenar_modelo_ecg_mock():
     """
     print("[ECG] Iniciando entrenamiento de modelo ECG...")
     time.sleep(1)  # Simular tiempo de entrenamiento
+    reportar_progreso(0.9, "modelo entrenado")
 
-    return {
+    resultado = {
         "estado": "Completado",
         "precision": round(random.uniform(85.0, 95.0), 2),
         "dataset_size": random.randint(10000, 50000),
         "epocas": 50,
         "tiempo_entrenamiento": "45 minutos",
-        "modelo_version": "ECG-Mock-DeepLearning-v1.0",
     }
+    # Cada entrenamiento publica una versión nueva: los análisis en caché de la anterior dejan de usarse
+    resultado["modelo_version"] = publicar_artefacto(ARTEFACTO_ECG, {}, metadatos={"modelo": MODELO_ECG, **resultado})
+    return resultado
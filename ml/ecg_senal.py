@@ -0,0 +1,326 @@
+"""
+Procesamiento de señales de ECG con NumPy (solo CPU).
+
+Etapas, todas vectorizadas (sin bucles de Python por muestra o por latido):
+  1. digitalizar_trazo(): imagen -> señal. En cada columna se buscan los píxeles
+     oscuros del trazo (la cuadrícula, roja o gris clara, queda por encima del umbral)
+     y se toma el extremo más alejado de la línea base, para no aplanar los QRS.
+  2. detectar_picos_r(): filtro pasa banda 5-15 Hz por FFT, derivada, cuadrado e
+     integración en ventana móvil (Pan-Tompkins); los picos son máximos locales en
+     un periodo refractario de 250 ms y se ubican luego en la señal filtrada.
+  3. caracteristicas(): frecuencia cardíaca, intervalos RR y su variabilidad
+     (SDNN, RMSSD, coeficiente de variación) y desnivel del segmento ST.
+  4. clasificar(): reglas sobre esas características.
+
+Las imágenes PNG/JPG se leen con Pillow si está instalado; sin él se aceptan
+imágenes PGM/PPM binarias y arrays .npy (una señal si tienen una dimensión).
+analizar_lote() reparte un lote de ECG entre los procesos de un pool.
+"""
+
+import io
+import math
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import threading
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow es opcional: sin él solo se leen PGM/PPM y .npy
+    Image = None
+
+MODELO_SENAL_ECG = "ECG-Senal-NumPy-v1.0"
+
+# Segundos que abarca el trazo de una imagen (tira de ritmo estándar de 10 s)
+SEGUNDOS_IMAGEN_ECG = float(os.getenv("ML_ECG_SEGUNDOS_IMAGEN", "10"))
+
+# Frecuencia de muestreo (Hz) de las señales recibidas sin frecuencia explícita
+FRECUENCIA_ECG = float(os.getenv("ML_ECG_FRECUENCIA", "500"))
+
+# Procesos para analizar ECG (0: en el propio proceso). Cada worker web tiene su propio pool,
+# así que por defecto se reparten los núcleos entre los ML_WORKERS_WEB workers de gunicorn
+# (gunicorn.conf.py lo define al arrancar; fuera de gunicorn hay un solo proceso web)
+WORKERS_WEB = max(1, int(os.getenv("ML_WORKERS_WEB", "1")))
+WORKERS_ECG = int(os.getenv("ML_WORKERS_ECG", str(max(1, (os.cpu_count() or 1) // WORKERS_WEB))))
+
+# Periodo refractario entre dos latidos (s); las señales de menos de VENTANAS_MINIMAS_ECG
+# periodos no tienen latidos suficientes y se dan por no interpretables sin analizarlas
+PERIODO_REFRACTARIO_ECG = 0.25
+VENTANAS_MINIMAS_ECG = 4
+
+# Umbrales de clasificación
+UMBRAL_CV_RR_IRREGULAR = 0.12  # variación de los intervalos RR de un ritmo irregular
+UMBRAL_ST_ELEVACION = 0.2  # desnivel ST relativo a la amplitud de la R
+UMBRAL_ST_DEPRESION = -0.1
+
+NO_INTERPRETABLE = "Señal no interpretable"
+
+
+# --- LECTURA DE IMÁGENES ---
+_CABECERA_NETPBM = re.compile(rb"P([56])\s+(?:#[^\n]*\s+)*(\d+)\s+(\d+)\s+(\d+)\s")
+
+
+def _leer_netpbm(contenido):
+    cabecera = _CABECERA_NETPBM.match(contenido)
+    if cabecera is None:
+        raise ValueError("❌ Cabecera PGM/PPM no válida.")
+    tipo, ancho, alto, maximo = (int(v) for v in cabecera.groups())
+    canales = 1 if tipo == 5 else 3
+    dtype = np.uint8 if maximo < 256 else np.dtype(">u2")
+    pixeles = np.frombuffer(contenido, dtype=dtype, count=ancho * alto * canales, offset=cabecera.end())
+    return pixeles.reshape((alto, ancho, canales) if canales == 3 else (alto, ancho))
+
+
+def decodificar(contenido):
+    """
+    Convierte el contenido recibido en una imagen (array 2D o 3D) o, para un .npy
+    de una dimensión, en una señal.
+    """
+    if contenido[:6] == b"\x93NUMPY":
+        return np.load(io.BytesIO(contenido), allow_pickle=False)
+    if contenido[:2] in (b"P5", b"P6"):
+        return _leer_netpbm(contenido)
+    if Image is None:
+        raise ValueError("❌ Para leer imágenes PNG/JPG hay que instalar Pillow (o enviar PGM/PPM).")
+    return np.asarray(Image.open(io.BytesIO(contenido)).convert("RGB"))
+
+
+def codificar_pgm(imagen):
+    """Imagen en escala de grises (uint8) como PGM binario."""
+    imagen = np.ascontiguousarray(imagen, dtype=np.uint8)
+    return b"P5\n%d %d\n255\n" % (imagen.shape[1], imagen.shape[0]) + imagen.tobytes()
+
+
+# --- 1. DIGITALIZACIÓN ---
+def digitalizar_trazo(imagen):
+    """
+    Extrae el trazo de una imagen de ECG.
+
+    Args:
+        imagen: Array (alto, ancho) en escala de grises o (alto, ancho, 3) RGB
+
+    Returns:
+        np.ndarray: Una muestra por columna, en píxeles sobre la línea base (positivo hacia arriba)
+    """
+    imagen = np.asarray(imagen, dtype=np.float32)
+    # El máximo de los canales deja clara la cuadrícula roja y oscuro solo el trazo negro
+    intensidad = imagen.max(axis=2) if imagen.ndim == 3 else imagen
+    alto, ancho = intensidad.shape
+
+    minimo = intensidad.min()
+    oscuro = intensidad < minimo + 0.5 * (np.median(intensidad) - minimo)
+    con_trazo = oscuro.any(axis=0)
+    if con_trazo.sum() < 2:
+        raise ValueError("❌ No se encontró el trazo del ECG en la imagen.")
+
+    # Primer y último píxel oscuro de cada columna
+    arriba = np.argmax(oscuro, axis=0).astype(float)
+    abajo = (alto - 1 - np.argmax(oscuro[::-1], axis=0)).astype(float)
+    linea_base = np.median(((arriba + abajo) / 2)[con_trazo])
+    fila = np.where(np.abs(arriba - linea_base) > np.abs(abajo - linea_base), arriba, abajo)
+
+    # Columnas sin trazo (cortes, rótulos): interpolación lineal
+    columnas = np.arange(ancho)
+    fila = np.interp(columnas, columnas[con_trazo], fila[con_trazo])
+    return linea_base - fila
+
+
+# --- 2. DETECCIÓN DE PICOS R ---
+def _pasa_banda(senal, frecuencia, bajo=5.0, alto=15.0):
+    espectro = np.fft.rfft(senal - senal.mean())
+    frecuencias = np.fft.rfftfreq(len(senal), d=1.0 / frecuencia)
+    espectro[(frecuencias < bajo) | (frecuencias > alto)] = 0
+    return np.fft.irfft(espectro, n=len(senal))
+
+
+def detectar_picos_r(senal, frecuencia):
+    """
+    Posiciones (índices de muestra) de los picos R.
+
+    Args:
+        senal: Señal de una derivación
+        frecuencia: Frecuencia de muestreo en Hz
+    """
+    senal = np.asarray(senal, dtype=float)
+    filtrada = _pasa_banda(senal, frecuencia)
+    energia = np.square(np.gradient(filtrada))
+    ventana = max(1, int(round(0.15 * frecuencia)))
+    integrada = np.convolve(energia, np.ones(ventana) / ventana, mode="same")
+
+    # Máximos locales dentro del periodo refractario (250 ms) que superan el umbral
+    refractario = max(1, int(round(PERIODO_REFRACTARIO_ECG * frecuencia)))
+    maximos = sliding_window_view(
+        np.pad(integrada, refractario, constant_values=-np.inf), 2 * refractario + 1
+    ).max(axis=1)
+    umbral = 0.3 * np.percentile(integrada, 99)
+    candidatos = np.flatnonzero((integrada >= maximos) & (integrada > umbral))
+    if len(candidatos) == 0:
+        return candidatos
+    # Mesetas: de varios máximos iguales y seguidos se queda el primero
+    candidatos = candidatos[np.diff(candidatos, prepend=-refractario - 1) > refractario]
+
+    # La integración desplaza el pico: se busca el extremo de la señal filtrada alrededor
+    margen = ventana // 2 + 1
+    indices = np.clip(candidatos[:, None] + np.arange(-margen, margen + 1), 0, len(senal) - 1)
+    picos = indices[np.arange(len(indices)), np.argmax(np.abs(filtrada[indices]), axis=1)]
+    return np.unique(picos)
+
+
+# --- 3. CARACTERÍSTICAS ---
+def _medianas_ventana(senal, centros, desde, hasta):
+    """Mediana de senal[c + desde : c + hasta] para cada centro (ventanas fuera de rango recortadas)."""
+    indices = np.clip(centros[:, None] + np.arange(desde, hasta), 0, len(senal) - 1)
+    return np.median(senal[indices], axis=1)
+
+
+def caracteristicas(senal, frecuencia, picos=None):
+    """
+    Frecuencia cardíaca, variabilidad RR y desnivel ST de una señal.
+
+    Returns:
+        dict: latidos, frecuencia_cardiaca (lpm), rr_medio_ms, sdnn_ms, rmssd_ms,
+            cv_rr y desnivel_st (relativo a la amplitud de la R)
+    """
+    senal = np.asarray(senal, dtype=float)
+    if picos is None:
+        # Demasiado corta (o vacía) para detectar latidos: 0 latidos, no interpretable
+        refractario = max(1, int(round(PERIODO_REFRACTARIO_ECG * frecuencia)))
+        corta = senal.ndim != 1 or len(senal) < VENTANAS_MINIMAS_ECG * refractario
+        picos = np.array([], dtype=int) if corta else detectar_picos_r(senal, frecuencia)
+    resultado = {"latidos": int(len(picos)), "frecuencia_cardiaca": None, "rr_medio_ms": None,
+                 "sdnn_ms": None, "rmssd_ms": None, "cv_rr": None, "desnivel_st": None}
+    if len(picos) < 3:
+        return resultado
+
+    rr = np.diff(picos) / frecuencia
+    rr_medio = rr.mean()
+    resultado.update(
+        frecuencia_cardiaca=float(60.0 / rr_medio),
+        rr_medio_ms=float(rr_medio * 1000),
+        sdnn_ms=float(rr.std() * 1000),
+        rmssd_ms=float(np.sqrt(np.mean(np.square(np.diff(rr)))) * 1000),
+        cv_rr=float(rr.std() / rr_medio),
+    )
+
+    # ST: nivel 60-100 ms después de la R frente al segmento PR (80-50 ms antes)
+    muestras = lambda segundos: int(round(segundos * frecuencia))  # noqa: E731
+    base = _medianas_ventana(senal, picos, -muestras(0.08), -muestras(0.05))
+    st = _medianas_ventana(senal, picos, muestras(0.06), muestras(0.10))
+    amplitud_r = np.abs(senal[picos] - base)
+    validos = amplitud_r > 0
+    if validos.any():
+        resultado["desnivel_st"] = float(np.median((st - base)[validos] / amplitud_r[validos]))
+    return resultado
+
+
+# --- 4. CLASIFICACIÓN ---
+def clasificar(rasgos):
+    """Nombre del diagnóstico según las características de caracteristicas()."""
+    if rasgos["latidos"] < 3:
+        return NO_INTERPRETABLE
+    desnivel_st = rasgos["desnivel_st"] or 0.0
+    if desnivel_st > UMBRAL_ST_ELEVACION:
+        return "Infarto Agudo"
+    if rasgos["cv_rr"] > UMBRAL_CV_RR_IRREGULAR:
+        return "Fibrilación Auricular"
+    if desnivel_st < UMBRAL_ST_DEPRESION:
+        return "Isquemia Subendocárdica"
+    # Ritmo regular fuera del rango sinusal normal
+    if not 50 <= rasgos["frecuencia_cardiaca"] <= 100:
+        return "Arritmia Supraventricular"
+    return "Normal"
+
+
+def analizar_entrada(entrada):
+    """
+    Analiza un ECG completo.
+
+    Args:
+        entrada: {"imagen": bytes} o {"senal": array, "frecuencia": Hz}
+
+    Returns:
+        dict: Características de caracteristicas() más el diagnóstico ("tipo")
+    """
+    if entrada.get("imagen") is not None:
+        datos = decodificar(entrada["imagen"])
+        if datos.ndim == 1:
+            senal, frecuencia = datos.astype(float), FRECUENCIA_ECG
+        else:
+            senal = digitalizar_trazo(datos)
+            frecuencia = len(senal) / SEGUNDOS_IMAGEN_ECG
+    else:
+        senal = np.asarray(entrada["senal"], dtype=float)
+        frecuencia = float(entrada.get("frecuencia") or FRECUENCIA_ECG)
+
+    rasgos = caracteristicas(senal, frecuencia)
+    return {**rasgos, "tipo": clasificar(rasgos)}
+
+
+# --- LOTES EN PARALELO ---
+_pool = None
+_lock_pool = threading.Lock()
+
+
+def pool_ecg():
+    """Pool de procesos compartido para los análisis (se crea al primer uso), o None con ML_WORKERS_ECG=0."""
+    global _pool
+    if WORKERS_ECG <= 0:
+        return None
+    with _lock_pool:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=WORKERS_ECG, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def analizar_lote(entradas):
+    """Analiza una lista de entradas (ver analizar_entrada) repartiéndolas entre los procesos del pool."""
+    pool = pool_ecg()
+    if pool is None or len(entradas) < 2:
+        return [analizar_entrada(entrada) for entrada in entradas]
+    tamano_bloque = max(1, math.ceil(len(entradas) / (WORKERS_ECG * 4)))
+    return list(pool.map(analizar_entrada, entradas, chunksize=tamano_bloque))
+
+
+# --- SEÑALES SINTÉTICAS (pruebas y benchmarks) ---
+def ecg_sintetico(frecuencia_cardiaca=70, segundos=10, frecuencia=FRECUENCIA_ECG, irregularidad=0.0,
+                  desnivel_st=0.0, ruido=0.02, semilla=0):
+    """
+    Señal de ECG sintética: cada latido es una suma de gaussianas (P, Q, R, S, T).
+
+    Args:
+        irregularidad: Variación relativa máxima de cada intervalo RR (0.3 ~ fibrilación)
+        desnivel_st: Elevación (positiva) o depresión del segmento ST, relativa a la R
+    """
+    rng = np.random.default_rng(semilla)
+    rr = 60.0 / frecuencia_cardiaca * (1 + irregularidad * rng.uniform(-1, 1, int(segundos * 4) + 2))
+    latidos = np.cumsum(rr) - rr[0] / 2
+    latidos = latidos[latidos < segundos]
+
+    t = np.arange(int(segundos * frecuencia)) / frecuencia
+    desde_r = t[None, :] - latidos[:, None]
+    ondas = ((0.15, -0.2, 0.025), (-0.1, -0.03, 0.01), (1.0, 0.0, 0.012), (-0.25, 0.03, 0.01), (0.3, 0.25, 0.04))
+    senal = sum(a * np.exp(-0.5 * ((desde_r - centro) / ancho) ** 2) for a, centro, ancho in ondas)
+    # Segmento ST: meseta suave entre el final del QRS y la onda T
+    senal = senal + desnivel_st * 0.5 * (np.tanh((desde_r - 0.045) / 0.008) - np.tanh((desde_r - 0.2) / 0.02))
+    return senal.sum(axis=0) + ruido * rng.standard_normal(len(t))
+
+
+def trazar_imagen(senal, alto=200, pixeles_por_segundo=150, segundos=SEGUNDOS_IMAGEN_ECG):
+    """Dibuja la señal sobre papel cuadriculado: imagen en escala de grises (uint8)."""
+    ancho = int(pixeles_por_segundo * segundos)
+    muestras = np.interp(np.linspace(0, len(senal) - 1, ancho), np.arange(len(senal)), senal)
+    escala = 0.35 * alto / max(np.ptp(muestras), 1e-9)
+    fila = np.round(alto * 0.6 - (muestras - np.median(muestras)) * escala).clip(0, alto - 1)
+
+    imagen = np.full((alto, ancho), 255, dtype=np.uint8)
+    imagen[::20, :] = 200
+    imagen[:, ::20] = 200
+    # Cada columna une su punto con el de la anterior: trazo continuo en los QRS
+    anterior = np.concatenate(([fila[0]], fila[:-1]))
+    filas = np.arange(alto)[:, None]
+    imagen[(filas >= np.minimum(fila, anterior)) & (filas <= np.maximum(fila, anterior))] = 0
+    return imagen
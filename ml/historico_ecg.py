@@ -0,0 +1,150 @@
+"""
+Historial persistido de análisis de ECG.
+
+Cada análisis hecho con analizarEcg se guarda en la tabla analisis_ecg, indexada
+por (id_paciente, fecha_analisis). El historial de un paciente se lee con ese
+índice, del más reciente al más antiguo, con filtros de fechas y paginación por
+cursor (el id_analisis del último análisis recibido), sin OFFSET.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+from sqlalchemy import Column, Integer, String, DateTime, Index, select, or_, and_
+
+from db.connection import Base, SessionLocal
+
+# Análisis devueltos por página cuando no se indica `first`
+TAMANO_PAGINA_HISTORICO_ECG = int(os.getenv("ML_TAMANO_PAGINA_HISTORICO_ECG", "50"))
+
+
+class AnalisisECGML(Base):
+    """Resultado de un análisis de ECG de un paciente."""
+
+    __tablename__ = "analisis_ecg"
+    __table_args__ = (Index("ix_analisis_ecg_paciente_fecha", "id_paciente", "fecha_analisis"),)
+
+    id_analisis = Column(Integer, primary_key=True, autoincrement=True)
+    id_paciente = Column(Integer, nullable=False)
+    fecha_analisis = Column(DateTime, nullable=False)
+    archivo_imagen = Column(String(255))
+    huella = Column(String(64))
+    diagnostico = Column(String(60))
+    descripcion = Column(String(255))
+    probabilidad = Column(Integer)
+    nivel_riesgo = Column(String(20))
+    frecuencia_cardiaca = Column(Integer)
+    modelo_utilizado = Column(String(60))
+
+
+# Columnas devueltas en el historial (HistoricoECG)
+_COLUMNAS_HISTORICO = (
+    AnalisisECGML.id_analisis,
+    AnalisisECGML.fecha_analisis,
+    AnalisisECGML.diagnostico,
+    AnalisisECGML.descripcion,
+    AnalisisECGML.probabilidad,
+    AnalisisECGML.nivel_riesgo,
+    AnalisisECGML.archivo_imagen,
+)
+
+
+def guardar_analisis_ecg(resultado, huella=None):
+    """
+    Guarda un resultado de analizar_ecg() en el historial.
+
+    Returns:
+        int: id_analisis asignado
+    """
+    db = SessionLocal()
+    try:
+        analisis = AnalisisECGML(
+            id_paciente=resultado["id_paciente"],
+            fecha_analisis=datetime.fromisoformat(resultado["fecha_analisis"]),
+            archivo_imagen=resultado["archivo_imagen"],
+            huella=huella,
+            diagnostico=resultado["diagnostico"],
+            descripcion=resultado["descripcion"],
+            probabilidad=resultado["probabilidad"],
+            nivel_riesgo=resultado["nivel_riesgo"],
+            frecuencia_cardiaca=resultado["frecuencia_cardiaca"],
+            modelo_utilizado=resultado["modelo_utilizado"],
+        )
+        db.add(analisis)
+        db.commit()
+        return analisis.id_analisis
+    finally:
+        db.close()
+
+
+def _a_fecha(valor, fin_de_dia=False):
+    """Acepta fechas ISO ("2025-01-31" o "2025-01-31T10:00:00"). Con solo el día y
+    `fin_de_dia`, devuelve el inicio del día siguiente para incluir el día completo."""
+    if valor is None:
+        return None
+    fecha = datetime.fromisoformat(valor)
+    if fin_de_dia and len(valor) == 10:
+        fecha += timedelta(days=1)
+    return fecha
+
+
+def obtener_historico_ecg(id_paciente, desde=None, hasta=None, first=None, after=None):
+    """
+    Historial de análisis de ECG de un paciente, del más reciente al más antiguo.
+
+    Args:
+        id_paciente: ID del paciente
+        desde: Fecha ISO mínima (incluida)
+        hasta: Fecha ISO máxima (incluida; con solo el día, se incluye el día completo)
+        first: Análisis por página (por defecto ML_TAMANO_PAGINA_HISTORICO_ECG)
+        after: id_analisis del último análisis de la página anterior
+
+    Returns:
+        list: Análisis con los campos de HistoricoECG
+    """
+    if first is not None and first < 1:
+        raise ValueError(f"❌ `first` debe ser mayor que 0 (recibido: {first}).")
+    desde, hasta = _a_fecha(desde), _a_fecha(hasta, fin_de_dia=True)
+
+    consulta = select(*_COLUMNAS_HISTORICO).where(AnalisisECGML.id_paciente == id_paciente)
+    if desde is not None:
+        consulta = consulta.where(AnalisisECGML.fecha_analisis >= desde)
+    if hasta is not None:
+        consulta = consulta.where(AnalisisECGML.fecha_analisis < hasta)
+
+    db = SessionLocal()
+    try:
+        if after is not None:
+            # Cursor (fecha, id) del último análisis recibido: una lectura por clave primaria,
+            # solo entre los análisis del paciente (un id ajeno no sirve de cursor)
+            fecha_cursor = db.execute(
+                select(AnalisisECGML.fecha_analisis).where(
+                    AnalisisECGML.id_analisis == after, AnalisisECGML.id_paciente == id_paciente
+                )
+            ).scalar()
+            if fecha_cursor is None:
+                return []
+            consulta = consulta.where(
+                or_(
+                    AnalisisECGML.fecha_analisis < fecha_cursor,
+                    and_(AnalisisECGML.fecha_analisis == fecha_cursor, AnalisisECGML.id_analisis < after),
+                )
+            )
+
+        consulta = consulta.order_by(AnalisisECGML.fecha_analisis.desc(), AnalisisECGML.id_analisis.desc())
+        filas = db.execute(consulta.limit(TAMANO_PAGINA_HISTORICO_ECG if first is None else first)).all()
+    finally:
+        db.close()
+
+    return [
+        {
+            "id_analisis": str(fila.id_analisis),
+            "fecha_analisis": fila.fecha_analisis.isoformat(),
+            "diagnostico": fila.diagnostico,
+            "descripcion": fila.descripcion,
+            "probabilidad": fila.probabilidad,
+            "nivel_riesgo": fila.nivel_riesgo,
+            "archivo_imagen": fila.archivo_imagen,
+        }
+        for fila in filas
+    ]
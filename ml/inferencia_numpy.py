@@ -0,0 +1,121 @@
+"""
+Inferencia directa en NumPy para los modelos de infarto y de clusters.
+
+Los parámetros ajustados por scikit-learn (coeficientes e intercepto de la
+regresión logística; media, escala y centroides del StandardScaler/KMeans) se
+extraen una sola vez y las predicciones se calculan sobre arrays de floats, sin
+construir DataFrames ni pasar por la validación de entrada de sklearn.
+Los resultados coinciden con los de predict / predict_proba del modelo original.
+"""
+
+import numpy as np
+from scipy.special import expit as _sigmoide  # el mismo sigmoide estable que usa sklearn
+
+
+def a_matriz(lista_datos, columnas):
+    """Convierte una lista de diccionarios de signos vitales en una matriz float (n, columnas)."""
+    return np.array([[datos[c] for c in columnas] for datos in lista_datos], dtype=float)
+
+
+class PredictorInfartoNumpy:
+    """
+    Regresión logística binaria evaluada como un producto punto más un sigmoide,
+    con una estandarización previa opcional (modelo incremental StandardScaler + SGD).
+    """
+
+    def __init__(self, coeficientes, intercepto, clases, media=None, escala=None):
+        self.coeficientes = np.asarray(coeficientes, dtype=float).reshape(1, -1)
+        self.intercepto = float(np.ravel(intercepto)[0])
+        self.clases = np.asarray(clases)
+        self.media = None if media is None else np.asarray(media, dtype=float)
+        self.escala = None if escala is None else np.asarray(escala, dtype=float)
+
+    @classmethod
+    def desde_sklearn(cls, modelo):
+        """
+        Construye el predictor a partir de un LogisticRegression ya entrenado o de un
+        Pipeline StandardScaler + clasificador lineal (SGDClassifier con log-loss).
+        """
+        media = escala = None
+        if hasattr(modelo, "steps"):
+            if len(modelo.steps) != 2 or not hasattr(modelo[0], "mean_"):
+                raise ValueError("❌ La inferencia NumPy solo admite el pipeline StandardScaler + clasificador.")
+            scaler, modelo = modelo[0], modelo[-1]
+            media = scaler.mean_
+            escala = scaler.scale_ if scaler.scale_ is not None else np.ones_like(scaler.mean_)
+
+        if len(modelo.classes_) != 2:
+            raise ValueError("❌ La inferencia NumPy solo admite modelos binarios.")
+        return cls(modelo.coef_, modelo.intercept_, modelo.classes_, media, escala)
+
+    @classmethod
+    def desde_parametros(cls, parametros):
+        """Construye el predictor desde los arrays de un artefacto (ver ml/artefactos.py)."""
+        return cls(
+            parametros["coeficientes"],
+            parametros["intercepto"],
+            parametros["clases"],
+            parametros.get("media"),
+            parametros.get("escala"),
+        )
+
+    def parametros(self):
+        """Arrays que definen el predictor, para guardarlos como artefacto."""
+        parametros = {
+            "coeficientes": self.coeficientes,
+            "intercepto": np.array([self.intercepto]),
+            "clases": self.clases,
+        }
+        if self.media is not None:
+            parametros.update(media=self.media, escala=self.escala)
+        return parametros
+
+    def funcion_decision(self, X):
+        if self.media is not None:
+            X = (X - self.media) / self.escala
+        return (X @ self.coeficientes.T).ravel() + self.intercepto
+
+    def probabilidad(self, X):
+        """Probabilidad de la clase positiva (clases[1]) para cada fila de X."""
+        return _sigmoide(self.funcion_decision(X))
+
+    def predecir(self, X):
+        return self.clases[(self.funcion_decision(X) > 0).astype(int)]
+
+
+class PredictorClustersNumpy:
+    """Estandarización + asignación al centroide más cercano de un modelo K-Means."""
+
+    def __init__(self, media, escala, centroides):
+        self.media = np.asarray(media, dtype=float)
+        self.escala = np.asarray(escala, dtype=float)
+        self.centroides = np.asarray(centroides, dtype=float)
+
+    @classmethod
+    def desde_sklearn(cls, modelo_guardado):
+        """Construye el predictor a partir del diccionario {"model", "scaler"} guardado en disco."""
+        scaler = modelo_guardado["scaler"]
+        escala = scaler.scale_ if scaler.scale_ is not None else np.ones_like(scaler.mean_)
+        return cls(scaler.mean_, escala, modelo_guardado["model"].cluster_centers_)
+
+    @classmethod
+    def desde_parametros(cls, parametros):
+        """Construye el predictor desde los arrays de un artefacto (ver ml/artefactos.py)."""
+        return cls(parametros["media"], parametros["escala"], parametros["centroides"])
+
+    def parametros(self):
+        """Arrays que definen el predictor, para guardarlos como artefacto."""
+        return {"media": self.media, "escala": self.escala, "centroides": self.centroides}
+
+    def escalar(self, X):
+        return (X - self.media) / self.escala
+
+    def asignar(self, X):
+        """Devuelve (clusters, distancias al centroide asignado) para cada fila de X."""
+        X_scaled = self.escalar(X)
+        distancias2 = np.empty((X_scaled.shape[0], self.centroides.shape[0]))
+        for j, centroide in enumerate(self.centroides):
+            distancias2[:, j] = ((X_scaled - centroide) ** 2).sum(axis=1)
+        clusters = distancias2.argmin(axis=1)
+        distancias = np.sqrt(distancias2[np.arange(len(clusters)), clusters])
+        return clusters, distancias
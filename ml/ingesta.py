@@ -0,0 +1,205 @@
+"""
+Cliente de ingesta de triajes desde el backend (REST de Spring Boot o GraphQL).
+
+Reutiliza una única sesión HTTP con pool de conexiones, aplica timeouts y
+descarga las páginas del backend en paralelo con un número acotado de hilos.
+Las páginas se entregan en orden y una a una, para que quien las consume
+(la inserción por lotes) nunca tenga que mantener todo el backend en memoria.
+"""
+
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Triajes por página pedidos al backend
+TAMANO_PAGINA_BACKEND = int(os.getenv("ML_TAMANO_PAGINA_BACKEND", "500"))
+
+# Páginas descargadas en paralelo como máximo
+MAX_DESCARGAS_PARALELAS = int(os.getenv("ML_DESCARGAS_PARALELAS", "4"))
+
+# Segundos de espera para conectar y para leer cada respuesta
+TIMEOUT_BACKEND = (5, float(os.getenv("ML_TIMEOUT_BACKEND", "30")))
+
+# Backend GraphQL del historial clínico
+BACKEND_GRAPHQL_URL = os.getenv(
+    "BACKEND_GRAPHQL_URL", "https://backend-historialclinico-sofware2.onrender.com/graphql"
+)
+
+CAMPOS_TRIAJE = """
+    id
+    temperatura
+    peso
+    estatura
+    frecuenciaCardiaca
+    frecuenciaRespiratoria
+    saturacionOxigeno
+    alergias
+    enfermedadesCronicas
+    motivoConsulta
+"""
+
+
+class PaginacionNoSoportada(Exception):
+    """El backend GraphQL no acepta los argumentos de paginación/filtro."""
+
+
+def _extraer_triajes(data):
+    """Normaliza las formas de respuesta conocidas (lista, Page de Spring o data.triajes)."""
+    if isinstance(data, dict):
+        if "data" in data and isinstance(data["data"], dict) and "triajes" in data["data"]:
+            return data["data"]["triajes"] or []
+        if "content" in data:
+            return data["content"] or []
+    return data or []
+
+
+def _firma(pagina):
+    """(primer id, último id) de una página, para reconocer páginas repetidas."""
+    return pagina[0].get("id"), pagina[-1].get("id")
+
+
+class ClienteTriajes:
+    """
+    Cliente HTTP del backend de triajes con sesión compartida y descarga paginada.
+
+    Args:
+        url_rest: Endpoint REST (por defecto SPRING_API)
+        url_graphql: Endpoint GraphQL (por defecto BACKEND_GRAPHQL_URL)
+        tamano_pagina: Triajes por página
+        max_workers: Páginas descargadas en paralelo como máximo
+        timeout: Timeout de requests (conexión, lectura)
+    """
+
+    def __init__(
+        self,
+        url_rest=None,
+        url_graphql=None,
+        tamano_pagina=TAMANO_PAGINA_BACKEND,
+        max_workers=MAX_DESCARGAS_PARALELAS,
+        timeout=TIMEOUT_BACKEND,
+    ):
+        self.url_rest = url_rest or os.getenv("SPRING_API")
+        self.url_graphql = url_graphql or BACKEND_GRAPHQL_URL
+        self.tamano_pagina = tamano_pagina
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+
+        self.sesion = requests.Session()
+        reintentos = Retry(total=3, backoff_factor=0.5, status_forcelist=(502, 503, 504), allowed_methods=None)
+        adaptador = HTTPAdapter(pool_connections=2, pool_maxsize=self.max_workers, max_retries=reintentos)
+        self.sesion.mount("http://", adaptador)
+        self.sesion.mount("https://", adaptador)
+
+    def cerrar(self):
+        self.sesion.close()
+
+    # --- REST ---
+    def pagina_rest(self, pagina, desde_id=None):
+        params = {"page": pagina, "size": self.tamano_pagina}
+        if desde_id is not None:
+            params["desdeId"] = desde_id
+        respuesta = self.sesion.get(self.url_rest, params=params, timeout=self.timeout)
+        respuesta.raise_for_status()
+        return _extraer_triajes(respuesta.json())
+
+    # --- GRAPHQL ---
+    def _consultar_graphql(self, consulta):
+        respuesta = self.sesion.post(self.url_graphql, json=consulta, timeout=self.timeout)
+        respuesta.raise_for_status()
+        return respuesta.json()
+
+    def pagina_graphql(self, pagina, desde_id=None):
+        consulta = {
+            "query": (
+                "query($pagina: Int, $tamano: Int, $desdeId: Int) {"
+                f" triajes(pagina: $pagina, tamano: $tamano, desdeId: $desdeId) {{ {CAMPOS_TRIAJE} }} }}"
+            ),
+            "variables": {"pagina": pagina, "tamano": self.tamano_pagina, "desdeId": desde_id},
+        }
+        respuesta = self._consultar_graphql(consulta)
+        if respuesta.get("errors"):
+            raise PaginacionNoSoportada(respuesta["errors"])
+        return _extraer_triajes(respuesta)
+
+    def todos_graphql(self, desde_id=None):
+        """
+        Descarga los triajes en una sola consulta. Con `desde_id` se pide
+        triajes(desdeId: ...); si el backend no admite el filtro, se pide la lista completa.
+        """
+        if desde_id is not None:
+            respuesta = self._consultar_graphql({
+                "query": f"query($desdeId: Int) {{ triajes(desdeId: $desdeId) {{ {CAMPOS_TRIAJE} }} }}",
+                "variables": {"desdeId": desde_id},
+            })
+            if not respuesta.get("errors"):
+                return _extraer_triajes(respuesta)
+            print("⚠️ El backend no admite triajes(desdeId); se descarga la lista completa.")
+
+        return _extraer_triajes(self._consultar_graphql({"query": f"{{ triajes {{ {CAMPOS_TRIAJE} }} }}"}))
+
+    # --- DESCARGA PAGINADA ---
+    def _iterar(self, obtener_pagina, desde_id):
+        """
+        Entrega en orden las páginas del backend. La primera se pide sola: si viene
+        incompleta (o el backend ignora la paginación y devuelve más de una página
+        de golpe) no se pide nada más. Si no, las siguientes se descargan con hasta
+        `max_workers` peticiones en vuelo, deteniéndose en la primera página incompleta
+        o en la primera que repite una anterior (un backend que ignora page/size y
+        devuelve justo `tamano_pagina` triajes respondería siempre lo mismo).
+        """
+        primera = obtener_pagina(0, desde_id)
+        if primera:
+            yield primera
+        if len(primera) != self.tamano_pagina:
+            return
+        firmas = {_firma(primera)}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            en_vuelo = deque()
+            siguiente = 1
+            for _ in range(self.max_workers):
+                en_vuelo.append(pool.submit(obtener_pagina, siguiente, desde_id))
+                siguiente += 1
+
+            try:
+                while en_vuelo:
+                    triajes = en_vuelo.popleft().result()
+                    if triajes:
+                        if _firma(triajes) in firmas:
+                            print("⚠️ El backend repite páginas (no admite paginación); se detiene la descarga.")
+                            break
+                        firmas.add(_firma(triajes))
+                        yield triajes
+                    if len(triajes) != self.tamano_pagina:
+                        break
+                    en_vuelo.append(pool.submit(obtener_pagina, siguiente, desde_id))
+                    siguiente += 1
+            finally:
+                for futuro in en_vuelo:
+                    futuro.cancel()
+
+    def iterar_paginas_rest(self, desde_id=None):
+        """Genera las páginas de triajes del endpoint REST."""
+        return self._iterar(self.pagina_rest, desde_id)
+
+    def iterar_paginas_graphql(self, desde_id=None):
+        """
+        Genera las páginas de triajes del backend GraphQL. Si el backend no admite
+        triajes(pagina, tamano), se descarga todo en una única página.
+        """
+        paginas = self._iterar(self.pagina_graphql, desde_id)
+        try:
+            primera = next(paginas, None)
+        except PaginacionNoSoportada:
+            triajes = self.todos_graphql(desde_id)
+            if triajes:
+                yield triajes
+            return
+
+        if primera is not None:
+            yield primera
+            yield from paginas
@@ -0,0 +1,229 @@
+"""
+Instantánea columnar local de triajes_ml para entrenar sin recorrer la BD.
+
+Los ids, los seis signos vitales y la etiqueta se guardan en archivos binarios
+(ids.bin int64, X.bin float64 (n, 6), y.bin int8) que se leen con np.memmap,
+más un meta.json con el número de filas y el último id incluido.
+
+Antes de cada lectura se compara con la BD (conteos sobre la clave primaria y
+sobre el índice de actualizado_en):
+  - si hay triajes con id mayor al último incluido, se añaden al final;
+  - si cambió el número de filas hasta ese id (p. ej. se borraron triajes) o alguna
+    de ellas se modificó después de la marca de agua guardada (actualizado_en), la
+    instantánea se reconstruye completa.
+Se usa para entrenar y para recalcular asignaciones en bloque, no en las lecturas
+de la API. Con ML_INSTANTANEA_TRIAJES=0 se lee siempre de la BD.
+"""
+
+import json
+import os
+import threading
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select, func
+
+try:
+    import fcntl
+except ImportError:  # Windows: solo se sincronizan los hilos del proceso
+    fcntl = None
+
+from db.connection import SessionLocal
+from ml.model import TriajeML, COLUMNAS_SIGNOS
+from ml.cargador_datos import cargar_triajes, iterar_bloques_triajes, empaquetar, TAMANO_LOTE_CARGA
+
+INSTANTANEA_TRIAJES = os.getenv("ML_INSTANTANEA_TRIAJES", "1") == "1"
+DIR_INSTANTANEA = os.getenv("ML_DIR_INSTANTANEA", "ml/cache/instantanea_triajes")
+
+# Archivo de cada columna y su tipo
+_ARCHIVOS = {"ids": np.int64, "X": np.float64, "y": np.int8}
+_VERSION_FORMATO = 2
+
+_lock = threading.Lock()
+
+
+def _ruta(nombre):
+    return os.path.join(DIR_INSTANTANEA, nombre)
+
+
+def _leer_meta():
+    try:
+        with open(_ruta("meta.json"), encoding="utf-8") as archivo:
+            meta = json.load(archivo)
+    except (FileNotFoundError, ValueError):
+        return None
+    if meta.get("version") != _VERSION_FORMATO or meta.get("columnas") != COLUMNAS_SIGNOS:
+        return None
+    return meta
+
+
+def _guardar_meta(filas, ultimo_id, marca):
+    temporal = _ruta("meta.json.tmp")
+    with open(temporal, "w", encoding="utf-8") as archivo:
+        json.dump(
+            {
+                "version": _VERSION_FORMATO, "columnas": COLUMNAS_SIGNOS, "filas": filas, "ultimo_id": ultimo_id,
+                "marca": marca.isoformat() if marca else None,
+            },
+            archivo,
+        )
+    os.replace(temporal, _ruta("meta.json"))
+
+
+class _BloqueoArchivo:
+    """Exclusión entre hilos y procesos (gunicorn, pool de entrenamiento) al sincronizar la instantánea."""
+
+    def __enter__(self):
+        _lock.acquire()
+        os.makedirs(DIR_INSTANTANEA, exist_ok=True)
+        self._archivo = open(_ruta(".lock"), "w")
+        if fcntl is not None:
+            fcntl.flock(self._archivo, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._archivo, fcntl.LOCK_UN)
+        self._archivo.close()
+        _lock.release()
+
+
+def _escribir(meta, bloques, marca):
+    """
+    Añade los bloques al final de los archivos (o, sin `meta`, los escribe desde cero
+    en archivos temporales que luego se renombran) y actualiza meta.json al terminar.
+    Los procesos que ya tienen la instantánea mapeada en memoria siguen leyendo la
+    versión anterior: un append no cambia lo ya mapeado y un rename no toca el archivo abierto.
+    """
+    filas = meta["filas"] if meta else 0
+    ultimo_id = meta["ultimo_id"] if meta else None
+    sufijo = "" if meta else ".tmp"
+
+    archivos = {nombre: open(_ruta(f"{nombre}.bin{sufijo}"), "ab" if meta else "wb") for nombre in _ARCHIVOS}
+    try:
+        # Lo escrito por una sincronización interrumpida (después de meta.json) se descarta
+        for nombre, tipo in _ARCHIVOS.items():
+            columnas = len(COLUMNAS_SIGNOS) if nombre == "X" else 1
+            archivos[nombre].truncate(filas * columnas * np.dtype(tipo).itemsize)
+
+        for bloque in bloques:
+            for nombre, tipo in _ARCHIVOS.items():
+                archivos[nombre].write(np.ascontiguousarray(bloque[nombre], dtype=tipo).tobytes())
+            filas += len(bloque["ids"])
+            ultimo_id = int(bloque["ids"][-1])
+    finally:
+        for archivo in archivos.values():
+            archivo.close()
+
+    if not meta:
+        for nombre in _ARCHIVOS:
+            os.replace(_ruta(f"{nombre}.bin.tmp"), _ruta(f"{nombre}.bin"))
+    _guardar_meta(filas, ultimo_id, marca)
+    return {"filas": filas, "ultimo_id": ultimo_id, "marca": marca.isoformat() if marca else None}
+
+
+def invalidar_instantanea():
+    """Borra la instantánea; la siguiente lectura la reconstruye desde la BD."""
+    with _BloqueoArchivo():
+        for nombre in (*[f"{n}.bin" for n in _ARCHIVOS], "meta.json"):
+            if os.path.exists(_ruta(nombre)):
+                os.remove(_ruta(nombre))
+
+
+def _sincronizar(tamano_lote):
+    """Pone la instantánea al día; se llama con el bloqueo tomado."""
+    meta = _leer_meta()
+
+    db = SessionLocal()
+    try:
+        # La marca se lee antes que las filas: lo escrito después queda por encima de ella
+        marca = db.execute(select(func.max(TriajeML.actualizado_en))).scalar()
+        total = db.execute(select(func.count()).select_from(TriajeML)).scalar()
+        hasta_ultimo = modificadas = None
+        if meta and meta["ultimo_id"] is not None:
+            hasta_ultimo = db.execute(
+                select(func.count()).where(TriajeML.id_triaje <= meta["ultimo_id"])
+            ).scalar()
+            # Solo recorre las filas escritas después de la marca (índice de actualizado_en)
+            escritas_despues = (
+                TriajeML.actualizado_en > datetime.fromisoformat(meta["marca"])
+                if meta["marca"] else TriajeML.actualizado_en.is_not(None)
+            )
+            modificadas = db.execute(
+                select(func.count()).where(escritas_despues, TriajeML.id_triaje <= meta["ultimo_id"])
+            ).scalar()
+    finally:
+        db.close()
+
+    reconstruida = meta is None or (meta["filas"] > 0 and (hasta_ultimo != meta["filas"] or modificadas))
+    if reconstruida:
+        if meta is not None:
+            print("⚠️ La instantánea de triajes no coincide con la BD; se reconstruye.")
+        meta = None
+    elif total == meta["filas"]:
+        return {**meta, "anadidas": 0, "reconstruida": False}
+
+    filas_antes = meta["filas"] if meta else 0
+    desde_id = meta["ultimo_id"] if meta else None
+    meta = _escribir(meta, iterar_bloques_triajes(tamano_lote, desde_id, con_id=True, con_etiqueta=True), marca)
+
+    anadidas = meta["filas"] - filas_antes
+    if anadidas:
+        print(f"🗂️ Instantánea de triajes: {anadidas} filas añadidas ({meta['filas']} en total)")
+    return {**meta, "anadidas": anadidas, "reconstruida": reconstruida}
+
+
+def sincronizar_instantanea(tamano_lote=TAMANO_LOTE_CARGA):
+    """
+    Pone la instantánea al día con la BD: añade los triajes nuevos o la reconstruye si
+    el conteo no coincide.
+
+    Returns:
+        dict: {"filas", "ultimo_id", "anadidas", "reconstruida"}
+    """
+    with _BloqueoArchivo():
+        return _sincronizar(tamano_lote)
+
+
+def _abrir():
+    """Sincroniza y mapea la instantánea en memoria: (ids, X, y)."""
+    with _BloqueoArchivo():
+        filas = _sincronizar(TAMANO_LOTE_CARGA)["filas"]
+        if filas == 0:
+            return np.empty(0, np.int64), np.empty((0, len(COLUMNAS_SIGNOS))), np.empty(0, np.int8)
+        return (
+            np.memmap(_ruta("ids.bin"), dtype=np.int64, mode="r", shape=(filas,)),
+            np.memmap(_ruta("X.bin"), dtype=np.float64, mode="r", shape=(filas, len(COLUMNAS_SIGNOS))),
+            np.memmap(_ruta("y.bin"), dtype=np.int8, mode="r", shape=(filas,)),
+        )
+
+
+def leer_triajes(desde_id=None, con_id=False, con_etiqueta=False, como_dataframe=False):
+    """
+    Mismo contrato que cargador_datos.cargar_triajes(), leyendo de la instantánea local
+    (mapeada en memoria) tras ponerla al día con la BD.
+    """
+    if not INSTANTANEA_TRIAJES:
+        return cargar_triajes(desde_id, con_id, con_etiqueta, como_dataframe)
+
+    ids, X, y = _abrir()
+    if desde_id is not None:
+        inicio = int(np.searchsorted(ids, desde_id, side="right"))
+        ids, X, y = ids[inicio:], X[inicio:], y[inicio:]
+    return empaquetar(ids, X, y, con_id, con_etiqueta, como_dataframe)
+
+
+def iterar_bloques(tamano_lote=TAMANO_LOTE_CARGA, con_id=False, con_etiqueta=False, como_dataframe=False):
+    """Mismo contrato que cargador_datos.iterar_bloques_triajes(), leyendo de la instantánea."""
+    if not INSTANTANEA_TRIAJES:
+        yield from iterar_bloques_triajes(
+            tamano_lote, con_id=con_id, con_etiqueta=con_etiqueta, como_dataframe=como_dataframe
+        )
+        return
+
+    ids, X, y = _abrir()
+    for inicio in range(0, len(ids), tamano_lote):
+        fin = inicio + tamano_lote
+        yield empaquetar(
+            ids[inicio:fin], np.asarray(X[inicio:fin]), y[inicio:fin], con_id, con_etiqueta, como_dataframe
+        )
@@ -1,16 +1,39 @@
-from sqlalchemy import Column, Integer, Float, String, Boolean
+from datetime import datetime
+from sqlalchemy import Column, Integer, Float, String, Boolean, DateTime, Index, select, text
 from db.connection import Base, SessionLocal
 from ml.datos_entrenamiento import datos_hardcodeados
 import pandas as pd
 from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
+from sklearn.linear_model import LogisticRegression, SGDClassifier
+from sklearn.metrics import accuracy_score, log_loss
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
 import joblib
 import os
+from ml.registro import registro, guardar_modelo
+from ml.inferencia_numpy import PredictorInfartoNumpy, a_matriz
+from ml.progreso import reportar_progreso
+from ml.artefactos import (
+    publicar_artefacto, importar_pickle, cargar_parametros, cargar_modelo_sklearn, ruta_puntero,
+    cargar_adjunto, revertir_artefacto,
+)
 
 
 # --- MODELO SQLALCHEMY ---
 class TriajeML(Base):
     __tablename__ = "triajes_ml"
+    # Índices parciales sobre los pacientes con riesgo (sufre_infarto): solo ocupan esas filas
+    # y sirven para recorrerlas por id o por probabilidad (query triajesRiesgo)
+    __table_args__ = (
+        Index(
+            "ix_triajes_ml_riesgo_id", "id_triaje",
+            postgresql_where=text("sufre_infarto"), sqlite_where=text("sufre_infarto = 1"),
+        ),
+        Index(
+            "ix_triajes_ml_riesgo_probabilidad", "probabilidad_infarto", "id_triaje",
+            postgresql_where=text("sufre_infarto"), sqlite_where=text("sufre_infarto = 1"),
+        ),
+    )
     
     id_triaje = Column(Integer, primary_key=True, index=True)  # No autoincrementa, será el mismo ID
     nombre_paciente = Column(String(100))
@@ -24,57 +47,155 @@ class TriajeML(Base):
     enfermedades_cronicas = Column(String(255))
     motivo_consulta = Column(String(255))
     sufre_infarto = Column(Boolean, default=False)
+    # Probabilidad (%) con la que el modelo predijo sufre_infarto al guardar el triaje
+    probabilidad_infarto = Column(Float)
+    # Última escritura de la fila; la instantánea local (ml/instantanea.py) detecta así las filas modificadas
+    actualizado_en = Column(DateTime, default=datetime.now, onupdate=datetime.now, index=True)
 
 
-# --- RUTA DEL MODELO ---
+# --- MODELO EN EL ALMACÉN DE ARTEFACTOS (ml/artefactos.py) ---
+ARTEFACTO_INFARTO = "infarto"
+
+# Modelo sklearn inicial: se importa al almacén si todavía no hay ninguna versión
 MODEL_PATH = "ml/model_infarto.pkl"
 
+# --- INFERENCIA DIRECTA EN NUMPY (desactivar con ML_INFERENCIA_NUMPY=0) ---
+INFERENCIA_NUMPY = os.getenv("ML_INFERENCIA_NUMPY", "1") == "1"
 
-# --- ENTRENAR MODELO GENERAL ---
-def entrenar_modelo(df=None):
-    df = datos_hardcodeados()
+# --- VARIABLES DE ENTRADA DEL MODELO (en el orden usado al entrenar) ---
+COLUMNAS_SIGNOS = [
+    "temperatura", "frecuencia_cardiaca", "frecuencia_respiratoria", "saturacion_oxigeno", "peso", "estatura"
+]
+
+
+# --- ENTRENAMIENTO INCREMENTAL ---
+# Estado del modelo incremental (scaler, SGD, último triaje visto y métricas)
+MODEL_INCREMENTAL_PATH = "ml/estado_infarto_incremental.pkl"
+# El estado incremental también se guarda con cada versión publicada, para restaurarlo al revertir
+ADJUNTO_ESTADO_INCREMENTAL = "estado_incremental"
+
+# Cada cuántas ejecuciones incrementales se fuerza un reentrenamiento completo
+REENTRENO_COMPLETO_CADA = int(os.getenv("ML_REENTRENO_COMPLETO_CADA", "7"))
+
+
+def _dividir(df):
+    return train_test_split(df[COLUMNAS_SIGNOS], df["sufre_infarto"], test_size=0.2, random_state=42)
+
+
+def _metricas(modelo, X, y):
+    """Exactitud y log-loss del modelo sobre (X, y)."""
+    probabilidades = modelo.predict_proba(X)[:, list(modelo.classes_).index(1)]
+    return {
+        "exactitud": round(float(accuracy_score(y, modelo.predict(X))), 4),
+        "log_loss": round(float(log_loss(y, probabilidades, labels=[0, 1])), 4),
+        "muestras": int(len(y)),
+    }
 
+
+def _leer_triajes(desde_id=None):
+    """
+    Lee solo las columnas de entrenamiento (y el id), opcionalmente a partir de un id,
+    desde la instantánea local de triajes_ml (o desde la BD con ML_INSTANTANEA_TRIAJES=0).
     """
-    Entrena el modelo con los datos dados y guarda el modelo en ml/model_infarto.pkl
+    # Import diferido: ml.instantanea depende de este módulo (TriajeML, COLUMNAS_SIGNOS)
+    from ml.instantanea import leer_triajes
+    return leer_triajes(desde_id, con_id=True, con_etiqueta=True, como_dataframe=True)
+
+
+def _cargar_estado_incremental():
+    if not os.path.exists(MODEL_INCREMENTAL_PATH):
+        return None
+    return joblib.load(MODEL_INCREMENTAL_PATH)
+
+
+def _clasificador_incremental(estado):
+    """Pipeline publicable (scaler + SGD) a partir del estado incremental."""
+    return Pipeline([("scaler", estado["scaler"]), ("sgd", estado["sgd"])])
+
+
+# --- ENTRENAR MODELO GENERAL ---
+def entrenar_modelo(df=None, ultimo_id=None):
     """
-    X = df[["temperatura", "frecuencia_cardiaca", "frecuencia_respiratoria", "saturacion_oxigeno", "peso", "estatura"]]
+    Entrena el modelo con los datos dados (o con los hardcodeados si no se pasan)
+    y guarda el modelo en ml/model_infarto.pkl.
+
+    Con los mismos datos de entrenamiento se inicializa el modelo incremental
+    (StandardScaler + SGDClassifier con log-loss), que luego se actualiza con
+    partial_fit usando solo los triajes con id mayor a `ultimo_id`.
+
+    Returns:
+        dict: Métricas del modelo completo y del incremental sobre el conjunto de evaluación
+    """
+    if df is None:
+        df = datos_hardcodeados()
+
+    X = df[COLUMNAS_SIGNOS]
     y = df["sufre_infarto"]
 
     # Verificación de clases
     if len(set(y)) < 2:
         raise ValueError("Los datos deben contener al menos dos clases distintas (0 y 1).")
 
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_train, X_test, y_train, y_test = _dividir(df)
 
     model = LogisticRegression()
     model.fit(X_train, y_train)
+    reportar_progreso(0.7, "modelo completo entrenado")
+
+    scaler = StandardScaler().fit(X_train)
+    sgd = SGDClassifier(loss="log_loss", random_state=42)
+    sgd.fit(scaler.transform(X_train), y_train)
+
+    estado = {
+        "scaler": scaler,
+        "sgd": sgd,
+        "ultimo_id": ultimo_id,
+        "ejecuciones_incrementales": 0,
+        "filas_incrementales": 0,
+        "X_eval": X_test.astype(float),
+        "y_eval": y_test.to_numpy(dtype=int),
+    }
+    metricas = {
+        "completo": _metricas(model, X_test, y_test),
+        "incremental": _metricas(_clasificador_incremental(estado), estado["X_eval"], estado["y_eval"]),
+    }
+    estado["metricas"] = metricas
 
-    os.makedirs("ml", exist_ok=True)
-    joblib.dump(model, MODEL_PATH)
-    print("✅ Modelo entrenado y guardado en:", MODEL_PATH)
+    version = _publicar_modelo(
+        model,
+        {"tipo": "LogisticRegression", "filas_entrenamiento": len(X_train), "metricas": metricas["completo"]},
+        estado,
+    )
+    guardar_modelo(estado, MODEL_INCREMENTAL_PATH)
+    print("✅ Modelo entrenado y publicado como versión:", version)
+    return metricas
 
 
 # --- ENTRENAR MODELO CON DATOS DE BD Y HARDOCODEADOS ---
-def entrenar_modelo_con_datos():
+def entrenar_modelo_con_datos(incremental=False):
     """
     Entrena el modelo combinando datos de la base de datos con datos base hardcodeados.
+
+    Con `incremental=True` solo se leen los triajes añadidos desde la última
+    ejecución y se actualiza el modelo con partial_fit. Si todavía no hay estado
+    incremental, o ya se hicieron ML_REENTRENO_COMPLETO_CADA actualizaciones
+    desde el último reentrenamiento completo, se reentrena desde cero.
     """
-    db = SessionLocal()
-    registros = db.query(TriajeML).all()
-
-    # Convertir datos de la BD
-    data_bd = {
-        "temperatura": [r.temperatura for r in registros],
-        "frecuencia_cardiaca": [r.frecuencia_cardiaca for r in registros],
-        "frecuencia_respiratoria": [r.frecuencia_respiratoria for r in registros],
-        "saturacion_oxigeno": [r.saturacion_oxigeno for r in registros],
-        "peso": [r.peso for r in registros],
-        "estatura": [r.estatura for r in registros],
-        "sufre_infarto": [int(r.sufre_infarto) for r in registros]
-    }
+    if incremental:
+        estado = _cargar_estado_incremental()
+        if estado is None:
+            print("⚠️ No hay estado incremental guardado. Se hace un reentrenamiento completo.")
+        elif estado["ejecuciones_incrementales"] >= REENTRENO_COMPLETO_CADA:
+            print(f"🔁 {REENTRENO_COMPLETO_CADA} actualizaciones incrementales: toca reentrenamiento completo.")
+        else:
+            return _actualizar_modelo_incremental(estado)
+
+    df_bd = _leer_triajes()
 
-    df_bd = pd.DataFrame(data_bd)
     df_hard = datos_hardcodeados()
+    reportar_progreso(0.4, "datos cargados")
+    ultimo_id = int(df_bd["id_triaje"].max()) if len(df_bd) > 0 else None
+    df_bd = df_bd.drop(columns="id_triaje")
 
     # Combinar ambos datasets
     if len(df_bd) > 0:
@@ -90,38 +211,205 @@ def entrenar_modelo_con_datos():
         df_final = pd.concat([df_final, datos_hardcodeados()], ignore_index=True)
 
     try:
-        entrenar_modelo(df_final)
-        resultado = f"✅ Modelo entrenado con {len(df_final)} registros totales."
+        metricas = entrenar_modelo(df_final, ultimo_id)
+        resultado = (
+            f"✅ Modelo entrenado con {len(df_final)} registros totales "
+            f"(exactitud completo {metricas['completo']['exactitud']}, "
+            f"incremental {metricas['incremental']['exactitud']})."
+        )
     except Exception as e:
         resultado = f"❌ Error al entrenar modelo: {e}"
 
-    db.close()
     return resultado
 
 
+def _actualizar_modelo_incremental(estado):
+    """
+    Actualiza el SGD con los triajes nuevos y publica el resultado como nueva versión del modelo.
+
+    El scaler se mantiene fijo entre reentrenamientos completos para que los
+    coeficientes aprendidos sigan en el mismo espacio. Antes de actualizar se
+    evalúa el modelo sobre los triajes nuevos (evaluación prequential) y después
+    sobre el conjunto de evaluación del último reentrenamiento completo, para
+    comparar con las métricas del modelo completo.
+    """
+    df_nuevos = _leer_triajes(estado["ultimo_id"])
+    reportar_progreso(0.4, "datos cargados")
+
+    if df_nuevos.empty:
+        return "✅ Sin triajes nuevos desde la última actualización; el modelo no cambia."
+
+    clasificador = _clasificador_incremental(estado)
+    X_nuevos = df_nuevos[COLUMNAS_SIGNOS]
+    y_nuevos = df_nuevos["sufre_infarto"].to_numpy(dtype=int)
+    metricas_nuevos = _metricas(clasificador, X_nuevos, y_nuevos)
+
+    estado["sgd"].partial_fit(estado["scaler"].transform(X_nuevos), y_nuevos, classes=[0, 1])
+    estado["ultimo_id"] = int(df_nuevos["id_triaje"].max())
+    estado["ejecuciones_incrementales"] += 1
+    estado["filas_incrementales"] += len(df_nuevos)
+    estado["metricas"] = {
+        "completo": estado["metricas"]["completo"],
+        "incremental": _metricas(clasificador, estado["X_eval"], estado["y_eval"]),
+        "prequential": metricas_nuevos,
+    }
+    reportar_progreso(0.7, "modelo incremental actualizado")
+
+    _publicar_modelo(clasificador, {
+        "tipo": "StandardScaler + SGDClassifier (incremental)",
+        "filas_incrementales": estado["filas_incrementales"],
+        "ultimo_id": estado["ultimo_id"],
+        "metricas": estado["metricas"]["incremental"],
+    }, estado)
+    guardar_modelo(estado, MODEL_INCREMENTAL_PATH)
+
+    metricas = estado["metricas"]
+    return (
+        f"✅ Modelo actualizado de forma incremental con {len(df_nuevos)} triajes nuevos "
+        f"(exactitud incremental {metricas['incremental']['exactitud']} vs completo "
+        f"{metricas['completo']['exactitud']}; log-loss {metricas['incremental']['log_loss']} vs "
+        f"{metricas['completo']['log_loss']})."
+    )
+
+
+def metricas_entrenamiento():
+    """
+    Métricas del último entrenamiento: modelo completo vs incremental sobre el mismo
+    conjunto de evaluación, más la evaluación prequential de la última actualización.
+    """
+    estado = _cargar_estado_incremental()
+    if estado is None:
+        return None
+    return {
+        **estado["metricas"],
+        "ultimo_id": estado["ultimo_id"],
+        "ejecuciones_incrementales": estado["ejecuciones_incrementales"],
+        "filas_incrementales": estado["filas_incrementales"],
+        "reentreno_completo_cada": REENTRENO_COMPLETO_CADA,
+    }
+
+
+def _publicar_modelo(modelo, metadatos, estado):
+    """
+    Publica el modelo sklearn como nueva versión del artefacto (parámetros .npy + manifiesto),
+    con el estado incremental del que sale adjunto para poder restaurarlo al revertir.
+    """
+    return publicar_artefacto(
+        ARTEFACTO_INFARTO,
+        PredictorInfartoNumpy.desde_sklearn(modelo).parametros(),
+        modelo=modelo,
+        metadatos=metadatos,
+        adjuntos={ADJUNTO_ESTADO_INCREMENTAL: estado},
+    )
+
+
+def revertir_modelo(version=None):
+    """
+    Revierte el modelo de infarto y restaura el estado incremental de esa versión, para
+    que la siguiente actualización nocturna parta del modelo revertido y no lo deshaga.
+    Si la versión no tiene estado adjunto (p. ej. importada de model_infarto.pkl), se
+    borra el estado y la siguiente ejecución hace un reentrenamiento completo.
+
+    Returns:
+        str: Versión publicada tras revertir
+    """
+    version = revertir_artefacto(ARTEFACTO_INFARTO, version)
+    estado = cargar_adjunto(ARTEFACTO_INFARTO, ADJUNTO_ESTADO_INCREMENTAL, version)
+    if estado is not None:
+        guardar_modelo(estado, MODEL_INCREMENTAL_PATH)
+    elif os.path.exists(MODEL_INCREMENTAL_PATH):
+        os.remove(MODEL_INCREMENTAL_PATH)
+        print("🔁 La versión revertida no tiene estado incremental: el próximo entrenamiento será completo.")
+    return version
+
+
 # --- PREDICCIÓN ---
+def _verificar_modelo():
+    if not importar_pickle(
+        ARTEFACTO_INFARTO, MODEL_PATH, lambda m: PredictorInfartoNumpy.desde_sklearn(m).parametros()
+    ):
+        raise FileNotFoundError("❌ No se encontró el modelo entrenado. Ejecuta entrenar_modelo_con_datos() primero.")
+
+
+def _cargar_modelo():
+    _verificar_modelo()
+    return registro.obtener(
+        ruta_puntero(ARTEFACTO_INFARTO), lambda _: cargar_modelo_sklearn(ARTEFACTO_INFARTO), clave="infarto_sklearn"
+    )
+
+
+def _cargar_predictor_numpy():
+    # El registro recarga el predictor cuando cambia el puntero ACTUAL (entrenamiento o reversión)
+    _verificar_modelo()
+    return registro.obtener(
+        ruta_puntero(ARTEFACTO_INFARTO),
+        lambda _: PredictorInfartoNumpy.desde_parametros(cargar_parametros(ARTEFACTO_INFARTO)[0]),
+        clave="infarto_numpy",
+    )
+
+
+def precargar_modelo():
+    """Carga en el registro el modelo que usa la predicción (p. ej. antes del fork de los workers)."""
+    return _cargar_predictor_numpy() if INFERENCIA_NUMPY else _cargar_modelo()
+
+
 def predecir_paciente(datos):
     """
     Recibe un diccionario con los datos del paciente y predice si puede sufrir un infarto.
     """
-    if not os.path.exists(MODEL_PATH):
-        raise FileNotFoundError("❌ No se encontró el modelo entrenado. Ejecuta entrenar_modelo_con_datos() primero.")
+    return predecir_pacientes_lote([datos])[0]
+
+
+def predecir_pacientes_lote(lista_datos):
+    """
+    Predice el riesgo de infarto de varios pacientes con una sola evaluación vectorizada
+    (NumPy directo o predict_proba de sklearn si ML_INFERENCIA_NUMPY=0).
+    Los resultados se devuelven en el mismo orden que la entrada.
+    """
+    if not lista_datos:
+        return []
 
-    model = joblib.load(MODEL_PATH)
+    if INFERENCIA_NUMPY:
+        predictor = _cargar_predictor_numpy()
+        X = a_matriz(lista_datos, COLUMNAS_SIGNOS)
+        predicciones = predictor.predecir(X)
+        prob_infarto = predictor.probabilidad(X)
+    else:
+        model = _cargar_modelo()
+        df = pd.DataFrame(
+            [[datos[columna] for columna in COLUMNAS_SIGNOS] for datos in lista_datos],
+            columns=COLUMNAS_SIGNOS,
+            dtype=float,
+        )
+        probabilidades = model.predict_proba(df)
+        predicciones = model.classes_[probabilidades.argmax(axis=1)]
+        prob_infarto = probabilidades[:, list(model.classes_).index(1)]
 
-    df = pd.DataFrame([{
-        "temperatura": datos["temperatura"],
-        "frecuencia_cardiaca": datos["frecuencia_cardiaca"],
-        "frecuencia_respiratoria": datos["frecuencia_respiratoria"],
-        "saturacion_oxigeno": datos["saturacion_oxigeno"],
-        "peso": datos["peso"],
-        "estatura": datos["estatura"]
-    }])
+    return [
+        {"sufre_infarto": bool(prediccion), "probabilidad": round(float(prob) * 100, 2)}
+        for prediccion, prob in zip(predicciones, prob_infarto)
+    ]
 
-    prediction = model.predict(df)[0]
-    prob = model.predict_proba(df)[0][1]
 
-    return {
-        "sufre_infarto": bool(prediction),
-        "probabilidad": round(prob * 100, 2)
-    }
+def predecir_riesgo_triajes(ids_triaje):
+    """
+    Riesgo de infarto de triajes guardados en la BD: lee sus signos vitales con una
+    sola consulta por clave primaria y los evalúa en un único lote.
+    Devuelve los resultados en el orden de `ids_triaje` (None si el triaje no existe).
+    """
+    if not ids_triaje:
+        return []
+
+    db = SessionLocal()
+    try:
+        filas = db.execute(
+            select(TriajeML.id_triaje, *(getattr(TriajeML, c) for c in COLUMNAS_SIGNOS))
+            .where(TriajeML.id_triaje.in_(ids_triaje))
+        ).all()
+    finally:
+        db.close()
+
+    signos = {fila[0]: dict(zip(COLUMNAS_SIGNOS, fila[1:])) for fila in filas}
+    encontrados = [i for i in ids_triaje if i in signos]
+    resultados = dict(zip(encontrados, predecir_pacientes_lote([signos[i] for i in encontrados])))
+    return [resultados.get(i) for i in ids_triaje]
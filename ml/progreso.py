@@ -0,0 +1,41 @@
+"""
+Reporte de progreso de los trabajos de entrenamiento.
+
+Los procesos del pool de entrenamiento reciben una cola al iniciarse; las
+funciones de entrenamiento llaman a reportar_progreso() en cada etapa y el
+proceso principal lee esos eventos al consultar el estado del trabajo.
+Fuera de un trabajo (p. ej. llamadas directas o scripts) no hace nada.
+"""
+
+import time
+
+_cola = None
+_id_trabajo = None
+
+
+def configurar(cola):
+    """Asocia la cola de eventos al proceso actual (initializer del pool)."""
+    global _cola
+    _cola = cola
+
+
+def iniciar_trabajo(id_trabajo):
+    global _id_trabajo
+    _id_trabajo = id_trabajo
+    _emitir("inicio", 0.0)
+
+
+def finalizar_trabajo():
+    global _id_trabajo
+    _id_trabajo = None
+
+
+def reportar_progreso(fraccion, etapa=None):
+    """Informa el avance (0.0 - 1.0) del trabajo en curso, con una descripción opcional de la etapa."""
+    _emitir("progreso", fraccion, etapa)
+
+
+def _emitir(evento, fraccion, etapa=None):
+    if _cola is None or _id_trabajo is None:
+        return
+    _cola.put((_id_trabajo, evento, float(fraccion), etapa, time.time()))
@@ -0,0 +1,162 @@
+"""
+Registro de modelos en memoria compartido por todo el proceso.
+
+Cada artefacto (model_infarto.pkl, model_clusters.pkl, ...) se carga una sola vez
+y se mantiene en memoria. En cada acceso se compara la firma del archivo
+(mtime, tamaño e inodo); si cambió porque un entrenamiento escribió una versión
+nueva, un único hilo la recarga mientras el resto de peticiones sigue usando la
+versión anterior, y el reemplazo se hace de forma atómica.
+"""
+
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+
+import joblib
+
+
+def _firma_archivo(ruta):
+    """Devuelve la firma (mtime en ns, tamaño, inodo) que identifica la versión en disco."""
+    st = os.stat(ruta)
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+def guardar_modelo(objeto, ruta):
+    """
+    Guarda un modelo con joblib de forma atómica: se escribe en un archivo temporal
+    y luego se reemplaza el destino con os.replace, de modo que ningún lector
+    llega a ver un archivo a medio escribir.
+    """
+    directorio = os.path.dirname(ruta)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+    try:
+        joblib.dump(objeto, temporal)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+
+class _Entrada:
+    """Versión cargada de un artefacto. Es inmutable: una recarga crea una nueva."""
+
+    __slots__ = ("firma", "valor", "segundos_carga", "cargado_en")
+
+    def __init__(self, firma, valor, segundos_carga):
+        self.firma = firma
+        self.valor = valor
+        self.segundos_carga = segundos_carga
+        self.cargado_en = datetime.now().isoformat()
+
+
+class RegistroModelos:
+    """
+    Caché de modelos por proceso con recarga en caliente.
+
+    Las lecturas no bloquean: solo la primera carga de un artefacto espera a que
+    termine el unpickle. Durante una recarga, los demás hilos reciben la versión
+    anterior, que sigue siendo completamente válida.
+    """
+
+    def __init__(self):
+        self._entradas = {}
+        self._locks = {}
+        self._estadisticas = {}
+        self._lock = threading.Lock()
+
+    def _lock_para(self, clave):
+        with self._lock:
+            if clave not in self._locks:
+                self._locks[clave] = threading.Lock()
+                self._estadisticas[clave] = {
+                    "cargas": 0,
+                    "aciertos": 0,
+                    "aciertos_durante_recarga": 0,
+                    "segundos_carga_total": 0.0,
+                }
+            return self._locks[clave]
+
+    def _contar(self, clave, campo, valor=1):
+        with self._lock:
+            self._estadisticas[clave][campo] += valor
+
+    def obtener(self, ruta, cargador=joblib.load, clave=None):
+        """
+        Devuelve el objeto cargado desde `ruta`, leyéndolo de disco solo si no está
+        en memoria o si el archivo cambió desde la última carga.
+
+        Args:
+            ruta: Ruta del artefacto en disco
+            cargador: Función que recibe la ruta y devuelve el objeto (joblib.load por defecto)
+            clave: Nombre de la entrada; por defecto la propia ruta. Permite mantener
+                varias representaciones del mismo archivo.
+
+        Raises:
+            FileNotFoundError: Si el artefacto no existe en disco
+        """
+        clave = clave or ruta
+        lock = self._lock_para(clave)
+        firma = _firma_archivo(ruta)
+
+        entrada = self._entradas.get(clave)
+        if entrada is not None and entrada.firma == firma:
+            self._contar(clave, "aciertos")
+            return entrada.valor
+
+        if entrada is not None:
+            # Ya hay una versión válida en memoria: si otro hilo la está recargando
+            # no esperamos, devolvemos la anterior.
+            if not lock.acquire(blocking=False):
+                self._contar(clave, "aciertos_durante_recarga")
+                return entrada.valor
+        else:
+            lock.acquire()
+
+        try:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada.firma == firma:
+                self._contar(clave, "aciertos")
+                return entrada.valor
+
+            inicio = time.perf_counter()
+            valor = cargador(ruta)
+            segundos = time.perf_counter() - inicio
+
+            # La asignación de la entrada completa es atómica para los lectores
+            self._entradas[clave] = _Entrada(firma, valor, segundos)
+            self._contar(clave, "cargas")
+            self._contar(clave, "segundos_carga_total", segundos)
+            print(f"📦 Modelo '{clave}' cargado en {segundos * 1000:.1f} ms")
+            return valor
+        finally:
+            lock.release()
+
+    def descartar(self, clave=None):
+        """Elimina de memoria una entrada (o todas) para forzar su recarga."""
+        if clave is None:
+            self._entradas.clear()
+        else:
+            self._entradas.pop(clave, None)
+
+    def estadisticas(self):
+        """Devuelve, por entrada, el número de cargas, aciertos y tiempos de carga."""
+        with self._lock:
+            estadisticas = {clave: dict(valores) for clave, valores in self._estadisticas.items()}
+
+        resultado = []
+        for clave, valores in estadisticas.items():
+            entrada = self._entradas.get(clave)
+            valores["clave"] = clave
+            valores["version"] = "-".join(str(v) for v in entrada.firma) if entrada else None
+            valores["segundos_ultima_carga"] = entrada.segundos_carga if entrada else None
+            valores["cargado_en"] = entrada.cargado_en if entrada else None
+            resultado.append(valores)
+        return resultado
+
+
+# --- REGISTRO GLOBAL DEL PROCESO ---
+registro = RegistroModelos()
@@ -0,0 +1,329 @@
+"""
+Ejecución asíncrona de los entrenamientos en un pool de procesos.
+
+Las mutations de entrenamiento encolan un trabajo y devuelven su ID al instante;
+el entrenamiento corre en otro proceso (sin ocupar el hilo de Flask) y su estado,
+progreso, duración y resultado se consultan con trabajoEntrenamiento(id).
+
+El proceso que encola el trabajo guarda cada cambio de estado (y cada evento de
+progreso del pool) en la tabla trabajos_entrenamiento, así que cualquier worker
+de gunicorn puede consultarlo, no solo el que lo encoló.
+"""
+
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, wait
+from datetime import datetime
+
+from sqlalchemy import Column, String, Float, DateTime, Text, JSON, select, delete
+
+from db.connection import Base, SessionLocal
+from ml import progreso
+
+# Procesos dedicados a entrenar modelos
+WORKERS_ENTRENAMIENTO = int(os.getenv("ML_WORKERS_ENTRENAMIENTO", "2"))
+
+# Trabajos terminados que se conservan para consultar su estado
+MAX_TRABAJOS_GUARDADOS = 200
+
+ESTADO_PENDIENTE = "pendiente"
+ESTADO_EN_EJECUCION = "en_ejecucion"
+ESTADO_COMPLETADO = "completado"
+ESTADO_ERROR = "error"
+ESTADOS_TERMINADOS = (ESTADO_COMPLETADO, ESTADO_ERROR)
+
+_FECHAS_TRABAJO = ("creado_en", "iniciado_en", "finalizado_en")
+
+
+class TrabajoEntrenamientoML(Base):
+    """Estado de un trabajo de entrenamiento, compartido entre los workers del servidor."""
+
+    __tablename__ = "trabajos_entrenamiento"
+
+    id = Column(String(32), primary_key=True)
+    tipo = Column(String(30), nullable=False)
+    estado = Column(String(20), nullable=False)
+    progreso = Column(Float, nullable=False, default=0.0)
+    etapa = Column(String(255))
+    creado_en = Column(DateTime, nullable=False, index=True)
+    iniciado_en = Column(DateTime)
+    finalizado_en = Column(DateTime)
+    duracion_segundos = Column(Float)
+    resultado = Column(JSON)
+    error = Column(Text)
+
+
+def _a_fila(trabajo):
+    return {
+        **trabajo,
+        **{c: datetime.fromisoformat(trabajo[c]) if trabajo[c] else None for c in _FECHAS_TRABAJO},
+    }
+
+
+def _a_trabajo(fila):
+    trabajo = {c.name: getattr(fila, c.name) for c in TrabajoEntrenamientoML.__table__.columns}
+    trabajo.update({c: trabajo[c].isoformat() if trabajo[c] else None for c in _FECHAS_TRABAJO})
+    return trabajo
+
+
+def _entrenar_infarto(**kwargs):
+    from ml.model import entrenar_modelo_con_datos
+    return entrenar_modelo_con_datos(**kwargs)
+
+
+def _entrenar_clusters(**kwargs):
+    from ml.clustering import entrenar_clusters
+    return entrenar_clusters(**kwargs)
+
+
+def _entrenar_clusters_auto(**kwargs):
+    from ml.clustering import entrenar_clusters_auto
+    return entrenar_clusters_auto(**kwargs)
+
+
+def _entrenar_ecg(**kwargs):
+    from ml.ecg_model import entrenar_modelo_ecg_mock
+    return entrenar_modelo_ecg_mock(**kwargs)
+
+
+TIPOS_ENTRENAMIENTO = {
+    "infarto": _entrenar_infarto,
+    "clusters": _entrenar_clusters,
+    "clusters_auto": _entrenar_clusters_auto,
+    "ecg": _entrenar_ecg,
+}
+
+
+def _inicializar_worker(cola):
+    progreso.configurar(cola)
+
+
+def _ejecutar(id_trabajo, tipo, kwargs):
+    """Punto de entrada dentro del proceso del pool. Devuelve el resultado y los instantes de inicio y fin."""
+    progreso.iniciar_trabajo(id_trabajo)
+    inicio = time.time()
+    try:
+        resultado = TIPOS_ENTRENAMIENTO[tipo](**kwargs)
+    finally:
+        progreso.finalizar_trabajo()
+    return {"resultado": resultado, "inicio": inicio, "fin": time.time()}
+
+
+class GestorTrabajos:
+    """
+    Pool de procesos de entrenamiento. Los trabajos encolados en este proceso se siguen
+    en memoria y se guardan en trabajos_entrenamiento; los demás se leen de la BD.
+    """
+
+    def __init__(self, max_workers=WORKERS_ENTRENAMIENTO):
+        self.max_workers = max_workers
+        self._trabajos = {}
+        self._futuros = {}
+        self._lock = threading.Lock()
+        # Serializa las escrituras en la BD para que la última siempre sea el estado más reciente
+        self._lock_bd = threading.Lock()
+        self._pool = None
+        self._cola = None
+
+    def _obtener_pool(self):
+        with self._lock:
+            if self._pool is None:
+                # "spawn": los procesos no heredan hilos, locks ni conexiones a la BD del servidor
+                contexto = multiprocessing.get_context("spawn")
+                self._cola = contexto.Queue()
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=contexto,
+                    initializer=_inicializar_worker,
+                    initargs=(self._cola,),
+                )
+                # El progreso se guarda al llegar, aunque las consultas lleguen a otro worker
+                threading.Thread(target=self._escuchar_eventos, daemon=True).start()
+            return self._pool
+
+    def encolar(self, tipo, **kwargs):
+        """Encola un entrenamiento y devuelve el ID del trabajo."""
+        if tipo not in TIPOS_ENTRENAMIENTO:
+            raise ValueError(f"❌ Tipo de entrenamiento desconocido: {tipo}")
+
+        id_trabajo = uuid.uuid4().hex
+        trabajo = {
+            "id": id_trabajo,
+            "tipo": tipo,
+            "estado": ESTADO_PENDIENTE,
+            "progreso": 0.0,
+            "etapa": None,
+            "creado_en": datetime.now().isoformat(),
+            "iniciado_en": None,
+            "finalizado_en": None,
+            "duracion_segundos": None,
+            "resultado": None,
+            "error": None,
+        }
+        with self._lock:
+            self._descartar_antiguos()
+            self._trabajos[id_trabajo] = trabajo
+        self._guardar(id_trabajo, nuevo=True)
+
+        futuro = self._obtener_pool().submit(_ejecutar, id_trabajo, tipo, kwargs)
+        with self._lock:
+            self._futuros[id_trabajo] = futuro
+        futuro.add_done_callback(lambda f: self._al_terminar(id_trabajo, f))
+        print(f"🧵 Trabajo de entrenamiento '{tipo}' encolado: {id_trabajo}")
+        return id_trabajo
+
+    def _descartar_antiguos(self):
+        terminados = [
+            id_trabajo for id_trabajo, t in self._trabajos.items()
+            if t["estado"] in ESTADOS_TERMINADOS
+        ]
+        for id_trabajo in terminados[:max(0, len(terminados) - MAX_TRABAJOS_GUARDADOS + 1)]:
+            del self._trabajos[id_trabajo]
+            self._futuros.pop(id_trabajo, None)
+
+    def _guardar(self, id_trabajo, nuevo=False):
+        """Guarda el estado actual del trabajo en la BD. Un fallo de la BD no detiene el entrenamiento."""
+        with self._lock_bd:
+            with self._lock:
+                trabajo = self._trabajos.get(id_trabajo)
+                trabajo = dict(trabajo) if trabajo else None
+            if trabajo is not None:
+                self._escribir(trabajo, nuevo)
+
+    @staticmethod
+    def _escribir(trabajo, nuevo):
+        db = SessionLocal()
+        try:
+            db.merge(TrabajoEntrenamientoML(**_a_fila(trabajo)))
+            if nuevo:
+                # Se conservan los MAX_TRABAJOS_GUARDADOS trabajos terminados más recientes
+                antiguos = select(TrabajoEntrenamientoML.id).where(
+                    TrabajoEntrenamientoML.estado.in_(ESTADOS_TERMINADOS)
+                ).order_by(TrabajoEntrenamientoML.creado_en.desc()).offset(MAX_TRABAJOS_GUARDADOS)
+                db.execute(delete(TrabajoEntrenamientoML).where(TrabajoEntrenamientoML.id.in_(antiguos)))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ No se pudo guardar el estado del trabajo {trabajo['id']}: {str(e)}")
+        finally:
+            db.close()
+
+    def _al_terminar(self, id_trabajo, futuro):
+        self._procesar_eventos()
+        with self._lock:
+            trabajo = self._trabajos[id_trabajo]
+            if trabajo["estado"] not in ESTADOS_TERMINADOS:
+                self._cerrar(trabajo, futuro)
+        # También si ya lo cerró el callback de fin: al volver, la BD tiene el estado final
+        self._guardar(id_trabajo)
+
+    @staticmethod
+    def _cerrar(trabajo, futuro):
+        if futuro.exception() is not None:
+            trabajo["estado"] = ESTADO_ERROR
+            trabajo["error"] = str(futuro.exception())
+            trabajo["finalizado_en"] = datetime.now().isoformat()
+            return
+
+        salida = futuro.result()
+        trabajo["estado"] = ESTADO_COMPLETADO
+        trabajo["progreso"] = 1.0
+        trabajo["resultado"] = salida["resultado"]
+        trabajo["iniciado_en"] = datetime.fromtimestamp(salida["inicio"]).isoformat()
+        trabajo["finalizado_en"] = datetime.fromtimestamp(salida["fin"]).isoformat()
+        trabajo["duracion_segundos"] = round(salida["fin"] - salida["inicio"], 3)
+
+    def _aplicar_evento(self, id_trabajo, evento, fraccion, etapa, instante):
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo is None or trabajo["estado"] in ESTADOS_TERMINADOS:
+                return
+            if evento == "inicio":
+                trabajo["estado"] = ESTADO_EN_EJECUCION
+                trabajo["iniciado_en"] = datetime.fromtimestamp(instante).isoformat()
+            elif evento == "progreso":
+                trabajo["progreso"] = max(trabajo["progreso"], fraccion)
+            if etapa:
+                trabajo["etapa"] = etapa
+        self._guardar(id_trabajo)
+
+    def _escuchar_eventos(self):
+        """Hilo que guarda los eventos de progreso enviados por los procesos del pool."""
+        while True:
+            try:
+                self._aplicar_evento(*self._cola.get())
+            except (EOFError, OSError, ValueError):
+                return  # cola cerrada
+
+    def _procesar_eventos(self):
+        """Aplica los eventos de progreso pendientes sin esperar al hilo que escucha la cola."""
+        if self._cola is None:
+            return
+        while True:
+            try:
+                evento = self._cola.get_nowait()
+            except queue.Empty:
+                return
+            self._aplicar_evento(*evento)
+
+    def _leer(self, id_trabajo=None):
+        db = SessionLocal()
+        try:
+            if id_trabajo is not None:
+                fila = db.get(TrabajoEntrenamientoML, id_trabajo)
+                return _a_trabajo(fila) if fila else None
+            filas = db.execute(
+                select(TrabajoEntrenamientoML)
+                .order_by(TrabajoEntrenamientoML.creado_en.desc())
+                .limit(MAX_TRABAJOS_GUARDADOS)
+            ).scalars()
+            return [_a_trabajo(f) for f in filas]
+        finally:
+            db.close()
+
+    def obtener(self, id_trabajo):
+        """Devuelve una copia del estado del trabajo, o None si no existe."""
+        self._procesar_eventos()
+        with self._lock:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo:
+                return dict(trabajo)
+        # Encolado en otro worker (o antes de reiniciar el servidor)
+        return self._leer(id_trabajo)
+
+    def listar(self):
+        """Trabajos de todos los workers, del más reciente al más antiguo."""
+        self._procesar_eventos()
+        trabajos = {t["id"]: t for t in self._leer()}
+        with self._lock:
+            trabajos.update({id_trabajo: dict(t) for id_trabajo, t in self._trabajos.items() if id_trabajo in trabajos})
+        return list(trabajos.values())
+
+    def esperar(self, id_trabajo, timeout=None):
+        """Bloquea hasta que el trabajo termine (o venza el timeout) y devuelve su estado."""
+        with self._lock:
+            futuro = self._futuros.get(id_trabajo)
+        if futuro is None:
+            # Trabajo de otro proceso: no se puede esperar desde aquí
+            return self.obtener(id_trabajo)
+        wait([futuro], timeout=timeout)
+        if futuro.done():
+            # El callback de fin puede no haberse ejecutado todavía en su hilo
+            self._al_terminar(id_trabajo, futuro)
+        return self.obtener(id_trabajo)
+
+
+# --- GESTOR GLOBAL DEL PROCESO ---
+gestor_trabajos = GestorTrabajos()
+
+
+def encolar_entrenamiento(tipo, **kwargs):
+    return gestor_trabajos.encolar(tipo, **kwargs)
+
+
+def obtener_trabajo(id_trabajo):
+    return gestor_trabajos.obtener(id_trabajo)
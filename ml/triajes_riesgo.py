@@ -0,0 +1,119 @@
+"""
+Lectura paginada de los pacientes con riesgo de infarto (sufre_infarto).
+
+Las consultas recorren los índices parciales de triajes_ml (ver TriajeML):
+por id_triaje ascendente o por probabilidad_infarto descendente, con paginación
+por cursor (el id_triaje del último paciente recibido) y leyendo solo las
+columnas pedidas. El coste de una página depende de su tamaño, no del número
+de pacientes con riesgo.
+"""
+
+import os
+
+from sqlalchemy import select, update, or_, and_
+
+from db.connection import SessionLocal
+from ml.model import TriajeML, COLUMNAS_SIGNOS, predecir_pacientes_lote
+
+# Pacientes devueltos por página cuando no se indica `first`
+TAMANO_PAGINA_TRIAJES_RIESGO = int(os.getenv("ML_TAMANO_PAGINA_TRIAJES_RIESGO", "50"))
+
+# Triajes por lote al completar probabilidades que falten
+TAMANO_LOTE_PROBABILIDADES = int(os.getenv("ML_TAMANO_LOTE_PROBABILIDADES", "1000"))
+
+ORDEN_ID = "id"
+ORDEN_PROBABILIDAD = "probabilidad"
+ORDENES_TRIAJES_RIESGO = (ORDEN_ID, ORDEN_PROBABILIDAD)
+
+
+def completar_probabilidades_riesgo(tamano_lote=TAMANO_LOTE_PROBABILIDADES):
+    """
+    Calcula probabilidad_infarto de los pacientes con riesgo que no la tienen
+    (triajes guardados antes de existir la columna). Se ejecuta una vez al arrancar
+    (init_db); los triajes sincronizados ya la traen, así que normalmente es una
+    sola lectura indexada sin resultados.
+
+    Returns:
+        int: Número de probabilidades calculadas
+    """
+    total = 0
+    db = SessionLocal()
+    try:
+        while True:
+            filas = db.execute(
+                select(TriajeML.id_triaje, *(getattr(TriajeML, c) for c in COLUMNAS_SIGNOS))
+                .where(TriajeML.sufre_infarto, TriajeML.probabilidad_infarto.is_(None))
+                .order_by(TriajeML.id_triaje)
+                .limit(tamano_lote)
+            ).all()
+            if not filas:
+                break
+            try:
+                predicciones = predecir_pacientes_lote([dict(zip(COLUMNAS_SIGNOS, f[1:])) for f in filas])
+            except Exception as e:
+                print("⚠️ No se pudo calcular la probabilidad de infarto de los triajes guardados:", e)
+                break
+            db.execute(
+                update(TriajeML),
+                [{"id_triaje": f[0], "probabilidad_infarto": p["probabilidad"]} for f, p in zip(filas, predicciones)],
+            )
+            db.commit()
+            total += len(filas)
+    finally:
+        db.close()
+
+    if total:
+        print(f"🩺 {total} probabilidades de infarto completadas")
+    return total
+
+
+def obtener_triajes_riesgo(campos=None, first=None, after=None, orden=ORDEN_ID):
+    """
+    Una página de pacientes con riesgo de infarto. Solo lee: las probabilidades que
+    falten se completan al arrancar (completar_probabilidades_riesgo).
+
+    Args:
+        campos: Columnas de triajes_ml a leer (por defecto todas); id_triaje se lee siempre
+        first: Pacientes por página (por defecto ML_TAMANO_PAGINA_TRIAJES_RIESGO)
+        after: id_triaje del último paciente de la página anterior
+        orden: "id" (ascendente) o "probabilidad" (de mayor a menor; solo pacientes
+            con probabilidad calculada)
+
+    Returns:
+        list: Filas con los atributos pedidos
+    """
+    if orden not in ORDENES_TRIAJES_RIESGO:
+        raise ValueError(f"❌ Orden no válido: '{orden}'. Usa uno de {', '.join(ORDENES_TRIAJES_RIESGO)}.")
+    if first is not None and first < 1:
+        raise ValueError(f"❌ `first` debe ser mayor que 0 (recibido: {first}).")
+
+    campos = set(campos or (c.name for c in TriajeML.__table__.columns)) | {"id_triaje"}
+    columnas = [c for c in TriajeML.__table__.columns if c.name in campos]
+    consulta = select(*columnas).where(TriajeML.sufre_infarto)
+
+    db = SessionLocal()
+    try:
+        if orden == ORDEN_PROBABILIDAD:
+            consulta = consulta.where(TriajeML.probabilidad_infarto.is_not(None))
+            if after is not None:
+                # Cursor (probabilidad, id) del último paciente recibido: una lectura por clave primaria
+                probabilidad_cursor = db.execute(
+                    select(TriajeML.probabilidad_infarto).where(TriajeML.id_triaje == after)
+                ).scalar()
+                if probabilidad_cursor is None:
+                    return []
+                consulta = consulta.where(
+                    or_(
+                        TriajeML.probabilidad_infarto < probabilidad_cursor,
+                        and_(TriajeML.probabilidad_infarto == probabilidad_cursor, TriajeML.id_triaje < after),
+                    )
+                )
+            consulta = consulta.order_by(TriajeML.probabilidad_infarto.desc(), TriajeML.id_triaje.desc())
+        else:
+            if after is not None:
+                consulta = consulta.where(TriajeML.id_triaje > after)
+            consulta = consulta.order_by(TriajeML.id_triaje)
+
+        return db.execute(consulta.limit(TAMANO_PAGINA_TRIAJES_RIESGO if first is None else first)).all()
+    finally:
+        db.close()
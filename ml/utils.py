@@ -1,91 +1,238 @@
-import requests
 import os
+import time
+from datetime import datetime
 from dotenv import load_dotenv
-from db.connection import SessionLocal, init_db
-from ml.model import TriajeML, predecir_paciente  # Importa el modelo actualizado
+from sqlalchemy import Column, Integer, String, DateTime, select
+from db.connection import Base, SessionLocal, init_db
+from db.bulk import insertar_ignorando_duplicados, insertar_o_actualizar
+from ml.model import TriajeML, predecir_pacientes_lote  # Importa el modelo actualizado
+from ml.instantanea import sincronizar_instantanea, INSTANTANEA_TRIAJES
+from ml.ingesta import ClienteTriajes
 
 load_dotenv()
 
-def get_triajes_from_spring():
-    """Obtiene los triajes desde la API de Spring Boot (GraphQL o REST)"""
-    url = os.getenv("SPRING_API")
+# Triajes procesados por lote al sincronizar (una consulta de existencia y un insert por lote)
+TAMANO_LOTE_SYNC = int(os.getenv("ML_TAMANO_LOTE_SYNC", "1000"))
+
+# --- FUENTES DE SINCRONIZACIÓN ---
+FUENTE_GRAPHQL = "graphql"
+FUENTE_REST = "rest"
+
+
+# --- MARCA DE AGUA DE SINCRONIZACIÓN ---
+class EstadoSincronizacion(Base):
+    """Último triaje sincronizado desde cada fuente (marca de agua)."""
+
+    __tablename__ = "estado_sincronizacion"
+
+    fuente = Column(String(50), primary_key=True)
+    ultimo_id = Column(Integer, nullable=False, default=0)
+    actualizado_en = Column(DateTime)
+
+
+def leer_marca_agua(fuente):
+    """Devuelve el último id_triaje sincronizado desde la fuente, o None si nunca se sincronizó."""
+    db = SessionLocal()
     try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            print("✅ Datos obtenidos desde el backend correctamente")
-            return response.json()
-        else:
-            print("❌ Error al obtener triajes:", response.status_code)
-            return []
+        estado = db.get(EstadoSincronizacion, fuente)
+        return estado.ultimo_id if estado else None
+    finally:
+        db.close()
+
+
+def guardar_marca_agua(fuente, ultimo_id):
+    """Avanza la marca de agua de la fuente (nunca la retrocede)."""
+    db = SessionLocal()
+    try:
+        actual = db.get(EstadoSincronizacion, fuente)
+        if actual is not None and actual.ultimo_id >= ultimo_id:
+            return
+        insertar_o_actualizar(
+            db,
+            EstadoSincronizacion.__table__,
+            [{"fuente": fuente, "ultimo_id": ultimo_id, "actualizado_en": datetime.now()}],
+            claves=["fuente"],
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def get_triajes_from_spring(desde_id=None):
+    """
+    Obtiene los triajes desde la API REST de Spring Boot (SPRING_API), página a página.
+    Si se indica `desde_id`, se piden solo los triajes con un ID mayor (parámetro desdeId).
+    """
+    cliente = ClienteTriajes()
+    try:
+        triajes = [t for pagina in cliente.iterar_paginas_rest(desde_id) for t in pagina]
+        print("✅ Datos obtenidos desde el backend correctamente")
+        return triajes
     except Exception as e:
-        print("⚠️ Error al conectar con el backend:", e)
+        print("⚠️ Error al obtener triajes del backend:", e)
         return []
+    finally:
+        cliente.cerrar()
 
 
-def insert_triajes_into_db():
-    """Inserta los triajes obtenidos en la tabla triajes_ml"""
-    init_db()
-    session = SessionLocal()
-    data = get_triajes_from_spring()
+def _fila_triaje(t):
+    """Convierte un triaje del backend (camelCase) en una fila de triajes_ml."""
+    return {
+        "id_triaje": t.get("id"),  # 👈 ID del backend de Spring Boot
+        "nombre_paciente": t.get("nombrePaciente") or f"Paciente_{t.get('id')}",
+        "temperatura": t.get("temperatura"),
+        "frecuencia_cardiaca": t.get("frecuenciaCardiaca"),
+        "frecuencia_respiratoria": t.get("frecuenciaRespiratoria"),
+        "saturacion_oxigeno": t.get("saturacionOxigeno"),
+        "peso": t.get("peso"),
+        "estatura": t.get("estatura"),
+        "alergias": t.get("alergias"),
+        "enfermedades_cronicas": t.get("enfermedadesCronicas"),
+        "motivo_consulta": t.get("motivoConsulta"),
+    }
+
+
+def _asignar_clusters(filas):
+    """Cluster de los triajes recién insertados; sin modelo K-Means se asignan al entrenarlo."""
+    # Import diferido: ml.clustering importa la instantánea y el almacén de artefactos
+    from ml.clustering import asignar_triajes_nuevos
+    try:
+        asignar_triajes_nuevos(filas)
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        print("⚠️ No se pudo asignar cluster a los triajes nuevos:", e)
+
+
+def insertar_triajes_lote(triajes, tamano_lote=TAMANO_LOTE_SYNC):
+    """
+    Inserta en triajes_ml los triajes que aún no existen, por lotes.
+
+    Por cada lote se hace una sola consulta para saber qué IDs ya están guardados,
+    una sola predicción vectorizada para los nuevos y un único INSERT ... ON CONFLICT
+    DO NOTHING con executemany, en lugar de una consulta y un add() por triaje.
+
+    Args:
+        triajes: Lista de triajes tal como los devuelve el backend (camelCase)
+        tamano_lote: Triajes procesados por lote
 
-    if not data:
-        print("⚠️ No se encontraron datos para insertar.")
-        return
+    Returns:
+        dict: {"insertados", "omitidos", "segundos"}
+    """
+    inicio = time.perf_counter()
+    insertados = 0
+    omitidos = 0
 
+    db = SessionLocal()
     try:
-        # Si la respuesta viene dentro de "data" → "triajes", la extraemos
-        if isinstance(data, dict) and "data" in data and "triajes" in data["data"]:
-            data = data["data"]["triajes"]
-
-        for t in data:
-            id_triaje = t.get("id")  # 👈 ID del backend de Spring Boot
-
-            # Verifica si ya existe ese triaje (por id_triaje)
-            exists = session.query(TriajeML).filter_by(id_triaje=id_triaje).first()
-            if exists:
-                continue  # Evita duplicados
-
-            # --- Preparar datos para la predicción ---
-            datos_paciente = {
-                "temperatura": t.get("temperatura"),
-                "frecuencia_cardiaca": t.get("frecuenciaCardiaca"),
-                "frecuencia_respiratoria": t.get("frecuenciaRespiratoria"),
-                "saturacion_oxigeno": t.get("saturacionOxigeno"),
-                "peso": t.get("peso"),
-                "estatura": t.get("estatura")
-            }
+        for i in range(0, len(triajes), tamano_lote):
+            filas = {}
+            for t in triajes[i:i + tamano_lote]:
+                filas.setdefault(t.get("id"), _fila_triaje(t))  # descarta repetidos dentro del lote
 
+            existentes = set(
+                db.execute(select(TriajeML.id_triaje).where(TriajeML.id_triaje.in_(list(filas)))).scalars()
+            )
+            nuevas = [fila for id_triaje, fila in filas.items() if id_triaje not in existentes]
+            omitidos += min(tamano_lote, len(triajes) - i) - len(nuevas)
+            if not nuevas:
+                continue
+
+            # --- Predicción ML de todo el lote ---
             try:
-                resultado_prediccion = predecir_paciente(datos_paciente)
-                sufre = resultado_prediccion["sufre_infarto"]
-                prob = resultado_prediccion["probabilidad"]
-                print(f"🧠 Paciente '{t.get('nombrePaciente', 'Desconocido')}' → Predicción: {sufre} ({prob}%)")
+                predicciones = predecir_pacientes_lote(nuevas)
             except Exception as e:
-                print(f"⚠️ Error en predicción para triaje {id_triaje}:", e)
-                sufre = False
-
-            # --- Insertar en la BD local ---
-            nuevo_triaje = TriajeML(
-                id_triaje=id_triaje,  # 👈 ID sincronizado
-                nombre_paciente=t.get("nombrePaciente"),
-                temperatura=t.get("temperatura"),
-                frecuencia_cardiaca=t.get("frecuenciaCardiaca"),
-                frecuencia_respiratoria=t.get("frecuenciaRespiratoria"),
-                saturacion_oxigeno=t.get("saturacionOxigeno"),
-                peso=t.get("peso"),
-                estatura=t.get("estatura"),
-                alergias=t.get("alergias"),
-                enfermedades_cronicas=t.get("enfermedadesCronicas"),
-                motivo_consulta=t.get("motivoConsulta"),
-                sufre_infarto=sufre
-            )
+                print("⚠️ Error en predicción del lote, se guarda sin riesgo:", e)
+                predicciones = [{"sufre_infarto": False}] * len(nuevas)
+
+            for fila, prediccion in zip(nuevas, predicciones):
+                fila["sufre_infarto"] = prediccion["sufre_infarto"]
+                fila["probabilidad_infarto"] = prediccion.get("probabilidad")
+
+            # Otra sincronización concurrente puede haber insertado alguno entre la consulta y el INSERT
+            insertadas = set(insertar_ignorando_duplicados(db, TriajeML.__table__, nuevas, claves=["id_triaje"]))
+            db.commit()
+            insertados += len(insertadas)
+            omitidos += len(nuevas) - len(insertadas)
+            _asignar_clusters([fila for fila in nuevas if fila["id_triaje"] in insertadas])
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+    return {"insertados": insertados, "omitidos": omitidos, "segundos": round(time.perf_counter() - inicio, 3)}
+
+
+def sincronizar_triajes(fuente=FUENTE_GRAPHQL, completa=False, tamano_lote=TAMANO_LOTE_SYNC, cliente=None):
+    """
+    Sincroniza de forma incremental los triajes de una fuente usando su marca de agua:
+    solo se piden (y procesan) los triajes con ID mayor al último sincronizado.
+
+    Las páginas del backend se descargan en paralelo y se insertan a medida que
+    llegan, así que nunca se tiene el backend completo en memoria.
+
+    Args:
+        fuente: FUENTE_GRAPHQL (backend GraphQL) o FUENTE_REST (SPRING_API)
+        completa: Si es True se ignora la marca de agua y se descarga todo
+        tamano_lote: Triajes procesados por lote al insertar
+        cliente: ClienteTriajes a usar; por defecto uno nuevo con la configuración del entorno
+
+    Returns:
+        dict: {"recibidos", "insertados", "omitidos", "segundos", "desde_id", "ultimo_id"}
+    """
+    inicio = time.perf_counter()
+    desde_id = None if completa else leer_marca_agua(fuente)
+    propio = cliente is None
+    cliente = cliente or ClienteTriajes()
 
-            session.add(nuevo_triaje)
+    resultado = {"recibidos": 0, "insertados": 0, "omitidos": 0, "desde_id": desde_id, "ultimo_id": None}
+    try:
+        paginas = cliente.iterar_paginas_graphql if fuente == FUENTE_GRAPHQL else cliente.iterar_paginas_rest
+        for triajes in paginas(desde_id):
+            if desde_id is not None:
+                # Por si el backend ignoró el filtro
+                triajes = [t for t in triajes if t.get("id") is not None and t["id"] > desde_id]
+
+            parcial = insertar_triajes_lote(triajes, tamano_lote=tamano_lote)
+            resultado["recibidos"] += len(triajes)
+            resultado["insertados"] += parcial["insertados"]
+            resultado["omitidos"] += parcial["omitidos"]
+            ids = [t["id"] for t in triajes if t.get("id") is not None]
+            if ids:
+                resultado["ultimo_id"] = max(max(ids), resultado["ultimo_id"] or 0)
+    finally:
+        if propio:
+            cliente.cerrar()
+
+    # La marca de agua solo avanza cuando todas las páginas se insertaron
+    if resultado["ultimo_id"] is not None:
+        guardar_marca_agua(fuente, resultado["ultimo_id"])
+
+    # Los triajes nuevos se añaden ya a la instantánea local, no en el próximo entrenamiento
+    if resultado["insertados"] and INSTANTANEA_TRIAJES:
+        try:
+            sincronizar_instantanea()
+        except Exception as e:
+            print("⚠️ No se pudo actualizar la instantánea de triajes:", e)
+
+    resultado["segundos"] = round(time.perf_counter() - inicio, 3)
+    return resultado
 
-        session.commit()
-        print("✅ Todos los triajes fueron insertados correctamente.")
+
+def insert_triajes_into_db(completa=False):
+    """Inserta en la tabla triajes_ml los triajes nuevos obtenidos desde SPRING_API"""
+    init_db()
+
+    try:
+        resultado = sincronizar_triajes(FUENTE_REST, completa=completa)
+        if not resultado["recibidos"]:
+            print("⚠️ No se encontraron datos para insertar.")
+            return
+
+        print(
+            f"✅ {resultado['insertados']} triajes insertados, {resultado['omitidos']} omitidos "
+            f"en {resultado['segundos']} s."
+        )
     except Exception as e:
         print("❌ Error al insertar en la base de datos:", e)
-        session.rollback()
-    finally:
-        session.close()
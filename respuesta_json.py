@@ -0,0 +1,87 @@
+"""
+Serialización de las respuestas de /graphql.
+
+El cuerpo se codifica con orjson (si está instalado; si no, con json de la
+biblioteca estándar) directamente a bytes, sin pasar por jsonify. Las listas de
+más de ML_TAMANO_BLOQUE_JSON elementos se codifican por bloques, y si el cuerpo
+supera ML_UMBRAL_STREAMING_JSON bytes se envía por partes (transfer-encoding
+chunked) a medida que se codifica, sin tener el JSON completo en memoria.
+"""
+
+import json
+import os
+
+from flask import Response
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa json (más lento)
+    orjson = None
+
+# Elementos de una lista que se codifican de una vez
+TAMANO_BLOQUE_JSON = int(os.getenv("ML_TAMANO_BLOQUE_JSON", "500"))
+
+# Bytes a partir de los cuales la respuesta se envía por partes
+UMBRAL_STREAMING_JSON = int(os.getenv("ML_UMBRAL_STREAMING_JSON", str(1024 * 1024)))
+
+TAMANO_PARTE_STREAMING = 64 * 1024
+
+
+def _codificar(valor):
+    if orjson is not None:
+        return orjson.dumps(valor)
+    return json.dumps(valor, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def fragmentos_json(valor, tamano_bloque=TAMANO_BLOQUE_JSON):
+    """
+    Codifica `valor` como JSON en varios fragmentos de bytes: los diccionarios se
+    recorren clave a clave y las listas grandes se codifican de `tamano_bloque` en
+    `tamano_bloque` elementos.
+    """
+    if isinstance(valor, dict):
+        yield b"{"
+        for i, (clave, contenido) in enumerate(valor.items()):
+            yield (b"," if i else b"") + _codificar(str(clave)) + b":"
+            yield from fragmentos_json(contenido, tamano_bloque)
+        yield b"}"
+    elif isinstance(valor, (list, tuple)) and len(valor) > tamano_bloque:
+        yield b"["
+        for inicio in range(0, len(valor), tamano_bloque):
+            # "[a,b,c]" sin los corchetes
+            yield (b"," if inicio else b"") + _codificar(valor[inicio:inicio + tamano_bloque])[1:-1]
+        yield b"]"
+    else:
+        yield _codificar(valor)
+
+
+def respuesta_json(valor, status=200, umbral_streaming=UMBRAL_STREAMING_JSON):
+    """
+    Respuesta de Flask con `valor` en JSON. Hasta `umbral_streaming` bytes se
+    devuelve de una vez (con Content-Length); por encima, el resto del cuerpo se
+    sigue codificando mientras se envía.
+    """
+    fragmentos = fragmentos_json(valor)
+    inicio, tamano = [], 0
+    for fragmento in fragmentos:
+        inicio.append(fragmento)
+        tamano += len(fragmento)
+        if tamano > umbral_streaming:
+            break
+    else:
+        return Response(b"".join(inicio), status=status, mimetype="application/json")
+
+    def cuerpo():
+        # Los fragmentos pequeños (claves, valores sueltos) se agrupan en partes de ~64 KiB
+        yield b"".join(inicio)
+        parte, tamano_parte = [], 0
+        for fragmento in fragmentos:
+            parte.append(fragmento)
+            tamano_parte += len(fragmento)
+            if tamano_parte >= TAMANO_PARTE_STREAMING:
+                yield b"".join(parte)
+                parte, tamano_parte = [], 0
+        if parte:
+            yield b"".join(parte)
+
+    return Response(cuerpo(), status=status, mimetype="application/json")
@@ -1,9 +1,26 @@
+import base64
+
 import graphene
-import requests
-from ml.model import predecir_paciente, entrenar_modelo_con_datos, TriajeML
+from graphene.utils.str_converters import to_camel_case
+from graphql import FieldNode, FragmentSpreadNode
+from sqlalchemy import select
+from ml.model import (
+    predecir_pacientes_lote, predecir_riesgo_triajes, metricas_entrenamiento, revertir_modelo, TriajeML,
+    ARTEFACTO_INFARTO,
+)
+from ml.utils import sincronizar_triajes, FUENTE_GRAPHQL, TAMANO_LOTE_SYNC
 from db.connection import SessionLocal
-from ml.clustering import entrenar_clusters, predecir_cluster, agrupar_pacientes
-from ml.ecg_model import analizar_ecg_mock, obtener_historico_ecg_mock, entrenar_modelo_ecg_mock
+from ml.clustering import (
+    ARTEFACTO_CLUSTERS, actualizar_asignaciones, predecir_cluster, predecir_clusters_lote, iterar_clusters_pacientes
+)
+from ml.ecg_model import analizar_ecg, huella_ecg
+from ml.historico_ecg import guardar_analisis_ecg, obtener_historico_ecg
+from ml.triajes_riesgo import obtener_triajes_riesgo, ORDEN_ID
+from ml.cache_ecg import cache_ecg
+from ml.trabajos import gestor_trabajos, encolar_entrenamiento, obtener_trabajo, ESTADO_ERROR
+from ml.registro import registro
+from ml.artefactos import listar_versiones, revertir_artefacto
+from cargadores import cargadores
 
 
 # --- QUERIES ---
@@ -15,146 +32,225 @@ class BaseQuery(graphene.ObjectType):
 class SincronizarTriajes(graphene.Mutation):
     ok = graphene.Boolean()
     message = graphene.String()
+    insertados = graphene.Int()
+    omitidos = graphene.Int()
+    tiempo_segundos = graphene.Float()
+    ultimo_id = graphene.Int()
 
-    def mutate(self, info):
-        try:
-            graphql_query = {
-                "query": """
-                {
-                    triajes {
-                        id
-                        temperatura
-                        peso
-                        estatura
-                        frecuenciaCardiaca
-                        frecuenciaRespiratoria
-                        saturacionOxigeno
-                        alergias
-                        enfermedadesCronicas
-                        motivoConsulta
-                    }
-                }
-                """
-            }
-
-            response = requests.post("https://backend-historialclinico-sofware2.onrender.com/graphql", json=graphql_query)
-            data = response.json()["data"]["triajes"]
+    class Arguments:
+        tamano_lote = graphene.Int(required=False, default_value=TAMANO_LOTE_SYNC)
+        # Ignora la marca de agua y vuelve a descargar todos los triajes
+        completa = graphene.Boolean(required=False, default_value=False)
 
-            if not data:
+    def mutate(self, info, tamano_lote, completa):
+        try:
+            resultado = sincronizar_triajes(FUENTE_GRAPHQL, completa=completa, tamano_lote=tamano_lote)
+
+            if not resultado["recibidos"]:
+                if resultado["desde_id"] is not None:
+                    return SincronizarTriajes(
+                        ok=True,
+                        message=f"[OK] No hay triajes nuevos desde el ID {resultado['desde_id']}.",
+                        insertados=0,
+                        omitidos=0,
+                        tiempo_segundos=resultado["segundos"],
+                        ultimo_id=resultado["desde_id"],
+                    )
                 return SincronizarTriajes(ok=False, message="⚠️ No se encontraron triajes en el backend")
 
-            db = SessionLocal()
-
-            for triaje in data:
-                # --- Evitar duplicados ---
-                exists = db.query(TriajeML).filter_by(id_triaje=triaje["id"]).first()
-                if exists:
-                    continue
-
-                # --- Predicción ML ---
-                datos_paciente = {
-                    "temperatura": triaje["temperatura"],
-                    "frecuencia_cardiaca": triaje["frecuenciaCardiaca"],
-                    "frecuencia_respiratoria": triaje["frecuenciaRespiratoria"],
-                    "saturacion_oxigeno": triaje["saturacionOxigeno"],
-                    "peso": triaje["peso"],
-                    "estatura": triaje["estatura"],
-                }
-
-                resultado = predecir_paciente(datos_paciente)
-
-                # --- Insertar nuevo registro ---
-                nuevo_triaje = TriajeML(
-                    id_triaje=triaje["id"],  # 👈 guardamos el ID del backend original
-                    nombre_paciente=f"Paciente_{triaje['id']}",
-                    temperatura=triaje["temperatura"],
-                    frecuencia_cardiaca=triaje["frecuenciaCardiaca"],
-                    frecuencia_respiratoria=triaje["frecuenciaRespiratoria"],
-                    saturacion_oxigeno=triaje["saturacionOxigeno"],
-                    peso=triaje["peso"],
-                    estatura=triaje["estatura"],
-                    alergias=triaje["alergias"],
-                    enfermedades_cronicas=triaje["enfermedadesCronicas"],
-                    motivo_consulta=triaje["motivoConsulta"],
-                    sufre_infarto=resultado["sufre_infarto"],
-                )
-
-                db.add(nuevo_triaje)
-
-            db.commit()
-            db.close()
-
             return SincronizarTriajes(
-                ok=True, message=f"[OK] {len(data)} triajes sincronizados e insertados correctamente."
+                ok=True,
+                message=(
+                    f"[OK] {resultado['recibidos']} triajes sincronizados: {resultado['insertados']} insertados, "
+                    f"{resultado['omitidos']} ya existentes."
+                ),
+                insertados=resultado["insertados"],
+                omitidos=resultado["omitidos"],
+                tiempo_segundos=resultado["segundos"],
+                ultimo_id=resultado["ultimo_id"],
             )
 
         except Exception as e:
             return SincronizarTriajes(ok=False, message=f"[ERROR] Error al sincronizar: {str(e)}")
 
 
+class Triaje(graphene.ObjectType):
+    id_triaje = graphene.Int()
+    nombre_paciente = graphene.String()
+    temperatura = graphene.Float()
+    frecuencia_cardiaca = graphene.Float()
+    frecuencia_respiratoria = graphene.Float()
+    saturacion_oxigeno = graphene.Float()
+    peso = graphene.Float()
+    estatura = graphene.Float()
+    alergias = graphene.String()
+    enfermedades_cronicas = graphene.String()
+    motivo_consulta = graphene.String()
+    sufre_infarto = graphene.Boolean()
+    probabilidad_infarto = graphene.Float()
+
+
+# Columnas de TriajeML que se leen para el tipo Triaje
+_COLUMNAS_TRIAJE = [getattr(TriajeML, campo) for campo in Triaje._meta.fields]
+
+# Nombre en GraphQL (camelCase) -> columna de TriajeML
+_CAMPOS_TRIAJE = {to_camel_case(campo): campo for campo in Triaje._meta.fields}
+
+
+def _campos_triaje_pedidos(info):
+    """Columnas de TriajeML que corresponden a los campos pedidos en la consulta (incluye fragmentos)."""
+    campos = set()
+    pendientes = [nodo.selection_set for nodo in info.field_nodes]
+    while pendientes:
+        seleccion = pendientes.pop()
+        for nodo in seleccion.selections if seleccion else ():
+            if isinstance(nodo, FieldNode):
+                if nodo.name.value in _CAMPOS_TRIAJE:
+                    campos.add(_CAMPOS_TRIAJE[nodo.name.value])
+            elif isinstance(nodo, FragmentSpreadNode):
+                pendientes.append(info.fragments[nodo.name.value].selection_set)
+            else:
+                pendientes.append(nodo.selection_set)
+    return campos
+
+
 class ObtenerTriajesRiesgo(graphene.Mutation):
     ok = graphene.Boolean()
     message = graphene.String()
-    triajes = graphene.List(graphene.JSONString)
+    triajes = graphene.List(Triaje)
 
     def mutate(self, info):
+        db = SessionLocal()
         try:
-            db = SessionLocal()
-            triajes_riesgo = db.query(TriajeML).filter(TriajeML.sufre_infarto).all()
+            # Solo las columnas del tipo Triaje, como filas (sin instanciar objetos del ORM)
+            triajes_riesgo = db.execute(
+                select(*_COLUMNAS_TRIAJE).where(TriajeML.sufre_infarto).order_by(TriajeML.id_triaje)
+            ).all()
 
             if not triajes_riesgo:
                 return ObtenerTriajesRiesgo(ok=True, message="⚠️ No hay pacientes con riesgo de infarto.", triajes=[])
 
-            lista_triajes = [
-                {
-                    "id_triaje": t.id_triaje,
-                    "nombre_paciente": t.nombre_paciente,
-                    "temperatura": t.temperatura,
-                    "frecuencia_cardiaca": t.frecuencia_cardiaca,
-                    "frecuencia_respiratoria": t.frecuencia_respiratoria,
-                    "saturacion_oxigeno": t.saturacion_oxigeno,
-                    "peso": t.peso,
-                    "estatura": t.estatura,
-                    "alergias": t.alergias,
-                    "enfermedades_cronicas": t.enfermedades_cronicas,
-                    "motivo_consulta": t.motivo_consulta,
-                    "sufre_infarto": t.sufre_infarto,
-                }
-                for t in triajes_riesgo
-            ]
-
-            db.close()
             return ObtenerTriajesRiesgo(
-                ok=True, message="[OK] Pacientes con riesgo de infarto encontrados.", triajes=lista_triajes
+                ok=True, message="[OK] Pacientes con riesgo de infarto encontrados.", triajes=triajes_riesgo
             )
 
         except Exception as e:
             return ObtenerTriajesRiesgo(ok=False, message=f"[ERROR] Error al consultar triajes: {str(e)}", triajes=[])
+        finally:
+            db.close()
+
+
+# --- ENTRENAMIENTOS ASÍNCRONOS ---
+class TrabajoEntrenamiento(graphene.ObjectType):
+    id = graphene.String()
+    tipo = graphene.String()
+    estado = graphene.String()
+    progreso = graphene.Float()
+    etapa = graphene.String()
+    creado_en = graphene.String()
+    iniciado_en = graphene.String()
+    finalizado_en = graphene.String()
+    duracion_segundos = graphene.Float()
+    resultado = graphene.JSONString()
+    error = graphene.String()
+
+
+def _lanzar_entrenamiento(tipo, esperar, **kwargs):
+    """Encola el entrenamiento; con `esperar` bloquea hasta que termine en el pool de procesos."""
+    id_trabajo = encolar_entrenamiento(tipo, **kwargs)
+    if esperar:
+        return gestor_trabajos.esperar(id_trabajo)
+    return obtener_trabajo(id_trabajo)
 
 
 class EntrenarModelo(graphene.Mutation):
     ok = graphene.Boolean()
     message = graphene.String()
+    id_trabajo = graphene.String()
+    trabajo = graphene.Field(TrabajoEntrenamiento)
 
-    def mutate(self, info):
+    class Arguments:
+        esperar = graphene.Boolean(required=False, default_value=False)
+        incremental = graphene.Boolean(required=False, default_value=False)
+
+    def mutate(self, info, esperar, incremental):
         try:
-            resultado = entrenar_modelo_con_datos()
-            return EntrenarModelo(ok=True, message=f"[OK] {resultado}")
+            trabajo = _lanzar_entrenamiento("infarto", esperar, incremental=incremental)
+            if trabajo["estado"] == ESTADO_ERROR:
+                return EntrenarModelo(
+                    ok=False, message=f"[ERROR] Error al entrenar: {trabajo['error']}", id_trabajo=trabajo["id"]
+                )
+            message = f"[OK] {trabajo['resultado']}" if esperar else f"[OK] Entrenamiento encolado: {trabajo['id']}"
+            return EntrenarModelo(
+                ok=True, message=message, id_trabajo=trabajo["id"], trabajo=TrabajoEntrenamiento(**trabajo)
+            )
         except Exception as e:
             return EntrenarModelo(ok=False, message=f"[ERROR] Error al entrenar: {str(e)}")
 
 
+class PuntajeNumClusters(graphene.ObjectType):
+    k = graphene.Int()
+    inercia = graphene.Float()
+    silueta = graphene.Float()
+    segundos = graphene.Float()
+
+
 class EntrenarClusters(graphene.Mutation):
     ok = graphene.Boolean()
     message = graphene.String()
+    id_trabajo = graphene.String()
+    trabajo = graphene.Field(TrabajoEntrenamiento)
+    num_clusters = graphene.Int()
+    puntajes = graphene.List(PuntajeNumClusters)
 
     class Arguments:
         num_clusters = graphene.Int(required=False, default_value=3)
+        esperar = graphene.Boolean(required=False, default_value=False)
+        auto = graphene.Boolean(required=False, default_value=False)
+        k_min = graphene.Int(required=False, default_value=2)
+        k_max = graphene.Int(required=False, default_value=8)
+        criterio = graphene.String(required=False, default_value="silueta")
 
-    def mutate(self, info, num_clusters):
+    def mutate(self, info, num_clusters, esperar, auto, k_min, k_max, criterio):
         try:
-            resultado = entrenar_clusters(num_clusters)
-            return EntrenarClusters(ok=True, message=resultado)
+            if auto:
+                trabajo = _lanzar_entrenamiento("clusters_auto", esperar, k_min=k_min, k_max=k_max, criterio=criterio)
+            else:
+                trabajo = _lanzar_entrenamiento("clusters", esperar, num_clusters=num_clusters)
+            if trabajo["estado"] == ESTADO_ERROR:
+                return EntrenarClusters(
+                    ok=False,
+                    message=f"[ERROR] Error al entrenar clusters: {trabajo['error']}",
+                    id_trabajo=trabajo["id"],
+                )
+            if not esperar:
+                return EntrenarClusters(
+                    ok=True,
+                    message=f"[OK] Entrenamiento encolado: {trabajo['id']}",
+                    id_trabajo=trabajo["id"],
+                    trabajo=TrabajoEntrenamiento(**trabajo),
+                )
+
+            resultado = trabajo["resultado"]
+            if auto:
+                return EntrenarClusters(
+                    ok=resultado["num_clusters"] is not None,
+                    message=resultado["mensaje"],
+                    id_trabajo=trabajo["id"],
+                    trabajo=TrabajoEntrenamiento(**trabajo),
+                    num_clusters=resultado["num_clusters"],
+                    puntajes=[
+                        PuntajeNumClusters(k=p["k"], inercia=p["inercia"], silueta=p["silueta"], segundos=p["segundos"])
+                        for p in resultado["puntajes"]
+                    ],
+                )
+            return EntrenarClusters(
+                ok=True,
+                message=resultado,
+                id_trabajo=trabajo["id"],
+                trabajo=TrabajoEntrenamiento(**trabajo),
+                num_clusters=num_clusters,
+            )
         except Exception as e:
             return EntrenarClusters(ok=False, message=f"[ERROR] Error al entrenar clusters: {str(e)}")
 
@@ -184,10 +280,88 @@ class PredecirCluster(graphene.Mutation):
                 "peso": peso,
                 "estatura": estatura,
             }
+            cargadores_peticion = cargadores(info)
+            if cargadores_peticion is not None:
+                # Con alias, todos los predecirCluster del documento se evalúan en un solo lote
+                return PredecirCluster._completar(cargadores_peticion.clusters.cargar(datos))
             resultado = predecir_cluster(datos)
             return PredecirCluster(ok=True, message=resultado["mensaje"], cluster=resultado["cluster"])
         except Exception as e:
-            return PredecirCluster(ok=False, message=f"[ERROR] Error al predecir cluster: {str(e)}", cluster=-1)
+            return PredecirCluster._error(e)
+
+    @staticmethod
+    async def _completar(pendiente):
+        try:
+            cluster = (await pendiente)["cluster"]
+        except Exception as e:
+            return PredecirCluster._error(e)
+        return PredecirCluster(ok=True, message=f"El paciente pertenece al grupo {cluster}.", cluster=cluster)
+
+    @staticmethod
+    def _error(e):
+        return PredecirCluster(ok=False, message=f"[ERROR] Error al predecir cluster: {str(e)}", cluster=-1)
+
+
+# --- PREDICCIÓN POR LOTES ---
+class SignosVitalesInput(graphene.InputObjectType):
+    temperatura = graphene.Float(required=True)
+    frecuencia_cardiaca = graphene.Float(required=True)
+    frecuencia_respiratoria = graphene.Float(required=True)
+    saturacion_oxigeno = graphene.Float(required=True)
+    peso = graphene.Float(required=True)
+    estatura = graphene.Float(required=True)
+
+
+class PrediccionInfarto(graphene.ObjectType):
+    indice = graphene.Int()
+    sufre_infarto = graphene.Boolean()
+    probabilidad = graphene.Float()
+
+
+class PredecirPacientesLote(graphene.Mutation):
+    ok = graphene.Boolean()
+    message = graphene.String()
+    predicciones = graphene.List(PrediccionInfarto)
+
+    class Arguments:
+        pacientes = graphene.List(graphene.NonNull(SignosVitalesInput), required=True)
+
+    def mutate(self, info, pacientes):
+        try:
+            resultados = predecir_pacientes_lote([dict(p) for p in pacientes])
+            predicciones = [PrediccionInfarto(indice=i, **r) for i, r in enumerate(resultados)]
+            return PredecirPacientesLote(
+                ok=True, message=f"[OK] {len(predicciones)} pacientes evaluados.", predicciones=predicciones
+            )
+        except Exception as e:
+            return PredecirPacientesLote(ok=False, message=f"[ERROR] Error al predecir lote: {str(e)}", predicciones=[])
+
+
+class AsignacionCluster(graphene.ObjectType):
+    indice = graphene.Int()
+    cluster = graphene.Int()
+    distancia = graphene.Float()
+
+
+class PredecirClustersLote(graphene.Mutation):
+    ok = graphene.Boolean()
+    message = graphene.String()
+    asignaciones = graphene.List(AsignacionCluster)
+
+    class Arguments:
+        pacientes = graphene.List(graphene.NonNull(SignosVitalesInput), required=True)
+
+    def mutate(self, info, pacientes):
+        try:
+            resultados = predecir_clusters_lote([dict(p) for p in pacientes])
+            asignaciones = [AsignacionCluster(indice=i, **r) for i, r in enumerate(resultados)]
+            return PredecirClustersLote(
+                ok=True, message=f"[OK] {len(asignaciones)} pacientes agrupados.", asignaciones=asignaciones
+            )
+        except Exception as e:
+            return PredecirClustersLote(
+                ok=False, message=f"[ERROR] Error al predecir clusters: {str(e)}", asignaciones=[]
+            )
 
 
 # --- OBJETOS PARA ECG ---
@@ -203,6 +377,14 @@ class AnalisisECG(graphene.ObjectType):
     estado = graphene.String()
     tiempo_procesamiento = graphene.String()
     modelo_utilizado = graphene.String()
+    desde_cache = graphene.Boolean()
+    id_analisis = graphene.Int()
+    # Características de la señal (solo si se envía la imagen o la señal)
+    latidos = graphene.Int()
+    rr_medio_ms = graphene.Float()
+    sdnn_ms = graphene.Float()
+    rmssd_ms = graphene.Float()
+    desnivel_st = graphene.Float()
 
 
 class HistoricoECG(graphene.ObjectType):
@@ -215,6 +397,16 @@ class HistoricoECG(graphene.ObjectType):
     archivo_imagen = graphene.String()
 
 
+class EstadisticasCacheECG(graphene.ObjectType):
+    version_modelo = graphene.String()
+    entradas_memoria = graphene.Int()
+    tamano_maximo = graphene.Int()
+    aciertos_memoria = graphene.Int()
+    aciertos_disco = graphene.Int()
+    fallos = graphene.Int()
+    tasa_aciertos = graphene.Float()
+
+
 class EntrenarModeloECG(graphene.ObjectType):
     ok = graphene.Boolean()
     message = graphene.String()
@@ -230,6 +422,69 @@ class EntrenarModeloECG(graphene.ObjectType):
 class PacienteCluster(graphene.ObjectType):
     id_triaje = graphene.Int()
     cluster = graphene.Int()
+    distancia = graphene.Float()
+    riesgo_infarto = graphene.Field(PrediccionInfarto)
+
+    def resolve_riesgo_infarto(self, info):
+        cargadores_peticion = cargadores(info)
+        if cargadores_peticion is None:
+            resultado = predecir_riesgo_triajes([self.id_triaje])[0]
+            return PrediccionInfarto(**resultado) if resultado else None
+        # Los pacientes de la página se evalúan juntos: una lectura y una predicción por petición
+        return PacienteCluster._a_prediccion(cargadores_peticion.infarto_triaje.cargar(self.id_triaje))
+
+    @staticmethod
+    async def _a_prediccion(pendiente):
+        resultado = await pendiente
+        return PrediccionInfarto(**resultado) if resultado else None
+
+
+# --- ESTADO DEL REGISTRO DE MODELOS ---
+class EstadisticaModelo(graphene.ObjectType):
+    clave = graphene.String()
+    version = graphene.String()
+    cargas = graphene.Int()
+    aciertos = graphene.Int()
+    aciertos_durante_recarga = graphene.Int()
+    segundos_ultima_carga = graphene.Float()
+    segundos_carga_total = graphene.Float()
+    cargado_en = graphene.String()
+
+
+# --- VERSIONES DE MODELOS ---
+MODELOS_VERSIONADOS = (ARTEFACTO_INFARTO, ARTEFACTO_CLUSTERS)
+
+
+class VersionModelo(graphene.ObjectType):
+    version = graphene.String()
+    creado_en = graphene.String()
+    actual = graphene.Boolean()
+    metadatos = graphene.JSONString()
+
+
+class RevertirModelo(graphene.Mutation):
+    ok = graphene.Boolean()
+    message = graphene.String()
+    version = graphene.String()
+
+    class Arguments:
+        nombre = graphene.String(required=True)
+        version = graphene.String(required=False)
+
+    def mutate(self, info, nombre, version=None):
+        if nombre not in MODELOS_VERSIONADOS:
+            return RevertirModelo(ok=False, message=f"[ERROR] Modelo desconocido: {nombre}")
+        try:
+            if nombre == ARTEFACTO_INFARTO:
+                # También restaura el estado incremental de esa versión
+                version = revertir_modelo(version)
+            else:
+                version = revertir_artefacto(nombre, version)
+                # Las asignaciones guardadas pasan a ser las del modelo revertido
+                actualizar_asignaciones()
+            return RevertirModelo(ok=True, message=f"[OK] Modelo '{nombre}' revertido a {version}", version=version)
+        except Exception as e:
+            return RevertirModelo(ok=False, message=f"[ERROR] No se pudo revertir el modelo: {str(e)}")
 
 
 # --- MUTATIONS ECG ---
@@ -241,10 +496,21 @@ class AnalizarECGMutation(graphene.Mutation):
     class Arguments:
         archivo_imagen = graphene.String(required=True)
         id_paciente = graphene.Int(required=True)
+        # Contenido de la imagen o, en su lugar, la señal; sin ninguno el resultado es simulado
+        imagen_base64 = graphene.String(required=False)
+        senal = graphene.List(graphene.Float, required=False)
+        frecuencia_muestreo = graphene.Float(required=False)
 
-    def mutate(self, info, archivo_imagen, id_paciente):
+    def mutate(self, info, archivo_imagen, id_paciente, imagen_base64=None, senal=None, frecuencia_muestreo=None):
         try:
-            resultado = analizar_ecg_mock(archivo_imagen, id_paciente)
+            imagen = base64.b64decode(imagen_base64, validate=True) if imagen_base64 else None
+            resultado = analizar_ecg(archivo_imagen, id_paciente, imagen, senal, frecuencia_muestreo)
+            try:
+                huella = huella_ecg(archivo_imagen, imagen, senal, frecuencia_muestreo)
+                resultado["id_analisis"] = guardar_analisis_ecg(resultado, huella)
+            except Exception as e:
+                # El análisis se devuelve aunque no se pueda guardar en el historial
+                print(f"⚠️ No se pudo guardar el análisis ECG en el historial: {str(e)}")
             return AnalizarECGMutation(
                 ok=True,
                 message=f"[OK] Análisis ECG completado para paciente {id_paciente}",
@@ -261,10 +527,14 @@ class ObtenerHistoricoECGMutation(graphene.Mutation):
 
     class Arguments:
         id_paciente = graphene.Int(required=True)
+        desde = graphene.String(required=False)
+        hasta = graphene.String(required=False)
+        first = graphene.Int(required=False)
+        after = graphene.Int(required=False)
 
-    def mutate(self, info, id_paciente):
+    def mutate(self, info, id_paciente, desde=None, hasta=None, first=None, after=None):
         try:
-            historico_data = obtener_historico_ecg_mock(id_paciente)
+            historico_data = obtener_historico_ecg(id_paciente, desde, hasta, first, after)
             historico = [HistoricoECG(**h) for h in historico_data]
             return ObtenerHistoricoECGMutation(
                 ok=True, message=f"[OK] Historial ECG obtenido para paciente {id_paciente}", historico=historico
@@ -277,12 +547,27 @@ class EntrenarModeloECGMutation(graphene.Mutation):
     ok = graphene.Boolean()
     message = graphene.String()
     resultado = graphene.Field(EntrenarModeloECG)
+    id_trabajo = graphene.String()
 
-    def mutate(self, info):
+    class Arguments:
+        esperar = graphene.Boolean(required=False, default_value=False)
+
+    def mutate(self, info, esperar):
         try:
-            resultado_data = entrenar_modelo_ecg_mock()
+            trabajo = _lanzar_entrenamiento("ecg", esperar)
+            if trabajo["estado"] == ESTADO_ERROR:
+                return EntrenarModeloECGMutation(
+                    ok=False, message=f"[ERROR] Error al entrenar modelo: {trabajo['error']}", id_trabajo=trabajo["id"]
+                )
+            if not esperar:
+                return EntrenarModeloECGMutation(
+                    ok=True, message=f"[OK] Entrenamiento ECG encolado: {trabajo['id']}", id_trabajo=trabajo["id"]
+                )
             return EntrenarModeloECGMutation(
-                ok=True, message="[OK] Modelo ECG entrenado exitosamente", resultado=EntrenarModeloECG(**resultado_data)
+                ok=True,
+                message="[OK] Modelo ECG entrenado exitosamente",
+                resultado=EntrenarModeloECG(**trabajo["resultado"]),
+                id_trabajo=trabajo["id"],
             )
         except Exception as e:
             return EntrenarModeloECGMutation(ok=False, message=f"[ERROR] Error al entrenar modelo: {str(e)}")
@@ -290,31 +575,82 @@ class EntrenarModeloECGMutation(graphene.Mutation):
 
 # --- QUERY CONSOLIDADA ---
 class Query(BaseQuery):
-    obtener_clusters = graphene.List(PacienteCluster)
-    obtener_historico_ecg = graphene.List(HistoricoECG, id_paciente=graphene.Int(required=True))
-
-    def resolve_obtener_clusters(self, info):
+    # Paginación por cursor: `after` es el idTriaje del último paciente recibido
+    obtener_clusters = graphene.List(PacienteCluster, first=graphene.Int(), after=graphene.Int())
+    # Del más reciente al más antiguo; `after` es el idAnalisis del último análisis recibido
+    obtener_historico_ecg = graphene.List(
+        HistoricoECG,
+        id_paciente=graphene.Int(required=True),
+        desde=graphene.String(),
+        hasta=graphene.String(),
+        first=graphene.Int(),
+        after=graphene.Int(),
+    )
+    # Pacientes con riesgo de infarto. Paginación por cursor: `after` es el idTriaje del último
+    # paciente recibido; `orden`: "id" (ascendente) o "probabilidad" (de mayor a menor)
+    triajes_riesgo = graphene.List(
+        Triaje, first=graphene.Int(), after=graphene.Int(), orden=graphene.String(default_value=ORDEN_ID)
+    )
+    estadisticas_modelos = graphene.List(EstadisticaModelo)
+    estadisticas_cache_ecg = graphene.Field(EstadisticasCacheECG)
+    versiones_modelo = graphene.List(VersionModelo, nombre=graphene.String(required=True))
+    trabajo_entrenamiento = graphene.Field(TrabajoEntrenamiento, id=graphene.String(required=True))
+    trabajos_entrenamiento = graphene.List(TrabajoEntrenamiento)
+    metricas_entrenamiento_infarto = graphene.JSONString()
+
+    def resolve_obtener_clusters(self, info, first=None, after=None):
         print("🔍 Ejecutando obtener_clusters...")
-        resultado = agrupar_pacientes()
-        print("Resultado:", resultado)
-        if not resultado:
-            print("⚠️ agrupar_pacientes devolvió vacío o None")
-            return []
-        return [PacienteCluster(id_triaje=r["id_triaje"], cluster=r["cluster"]) for r in resultado]
-
-    def resolve_obtener_historico_ecg(self, info, id_paciente):
+        # Se devuelve un generador: las asignaciones se leen por bloques mientras se serializan
+        return (PacienteCluster(**r) for r in iterar_clusters_pacientes(despues_de=after, limite=first))
+
+    def resolve_obtener_historico_ecg(self, info, id_paciente, desde=None, hasta=None, first=None, after=None):
         print(f"📊 Obteniendo historial ECG para paciente {id_paciente}")
-        historico_data = obtener_historico_ecg_mock(id_paciente)
+        historico_data = obtener_historico_ecg(id_paciente, desde, hasta, first, after)
         return [HistoricoECG(**h) for h in historico_data]
 
+    def resolve_triajes_riesgo(self, info, orden, first=None, after=None):
+        # Solo se leen de la BD las columnas de los campos pedidos
+        return obtener_triajes_riesgo(_campos_triaje_pedidos(info), first, after, orden)
+
+    def resolve_versiones_modelo(self, info, nombre):
+        if nombre not in MODELOS_VERSIONADOS:
+            raise ValueError(f"[ERROR] Modelo desconocido: {nombre}")
+        return [
+            VersionModelo(
+                version=v["version"], creado_en=v["creado_en"], actual=v["actual"], metadatos=v["metadatos"]
+            )
+            for v in listar_versiones(nombre)
+        ]
+
+    def resolve_estadisticas_modelos(self, info):
+        return [EstadisticaModelo(**e) for e in registro.estadisticas()]
+
+    def resolve_estadisticas_cache_ecg(self, info):
+        return EstadisticasCacheECG(**cache_ecg.estadisticas())
+
+    def resolve_trabajo_entrenamiento(self, info, id):
+        trabajo = obtener_trabajo(id)
+        return TrabajoEntrenamiento(**trabajo) if trabajo else None
+
+    def resolve_trabajos_entrenamiento(self, info):
+        return [TrabajoEntrenamiento(**t) for t in gestor_trabajos.listar()]
+
+    def resolve_metricas_entrenamiento_infarto(self, info):
+        return metricas_entrenamiento()
+
 
 # --- SCHEMA GLOBAL ---
 class Mutation(graphene.ObjectType):
     sincronizar_triajes = SincronizarTriajes.Field()
-    obtener_triajes_riesgo = ObtenerTriajesRiesgo.Field()
+    obtener_triajes_riesgo = ObtenerTriajesRiesgo.Field(
+        deprecation_reason="Usar la query triajesRiesgo (paginada y con solo los campos pedidos)"
+    )
     entrenar_modelo = EntrenarModelo.Field()
     entrenar_clusters = EntrenarClusters.Field()
     predecir_cluster = PredecirCluster.Field()
+    predecir_pacientes_lote = PredecirPacientesLote.Field()
+    predecir_clusters_lote = PredecirClustersLote.Field()
+    revertir_modelo = RevertirModelo.Field()
     # Nuevas mutations ECG
     analizar_ecg = AnalizarECGMutation.Field()
     obtener_historico_ecg = ObtenerHistoricoECGMutation.Field()
@@ -0,0 +1,109 @@
+"""
+Arranque del servicio en producción (gunicorn con varios workers, ver gunicorn.conf.py).
+
+- precargar_modelos(): carga los modelos en el registro antes del fork, para que
+  los workers compartan esas páginas de memoria (copy-on-write) y la primera
+  petición no pague la carga.
+- estado_preparacion(): lo que responde /listo; el servicio está listo cuando los
+  modelos están cargados y la BD responde. Los modelos que fallaron al arrancar
+  (p. ej. BD o disco aún no disponibles) se reintentan, como mucho una vez cada
+  ML_REINTENTO_PRECARGA_SEGUNDOS, en vez de dejar el worker en 503 para siempre.
+- es_lider(): elige un único proceso para los entrenamientos programados con un
+  bloqueo exclusivo (flock) sobre ML_LOCK_PLANIFICADOR. El proceso que lo obtiene
+  lo conserva hasta terminar; si muere, el sistema libera el bloqueo y el
+  siguiente proceso que lo intente pasa a ser el líder.
+"""
+
+import os
+import time
+
+from sqlalchemy import text
+
+try:
+    import fcntl
+except ImportError:  # Windows: un solo proceso, siempre es el líder
+    fcntl = None
+
+LOCK_PLANIFICADOR = os.getenv("ML_LOCK_PLANIFICADOR", "ml/cache/planificador.lock")
+
+# Segundos mínimos entre reintentos de precarga desde /listo
+REINTENTO_PRECARGA_SEGUNDOS = float(os.getenv("ML_REINTENTO_PRECARGA_SEGUNDOS", "10"))
+
+_modelos = {}
+_ultimo_reintento = 0.0
+_archivo_lider = None
+
+
+def precargar_modelos(nombres=None):
+    """
+    Carga los modelos de infarto y de clusters en el registro.
+
+    Args:
+        nombres: Modelos a cargar (por defecto todos)
+
+    Returns:
+        dict: nombre -> {"ok", "segundos", "error"}
+    """
+    from ml.model import precargar_modelo
+    from ml.clustering import precargar_modelo_clusters
+
+    for nombre, cargar in (("infarto", precargar_modelo), ("clusters", precargar_modelo_clusters)):
+        if nombres is not None and nombre not in nombres:
+            continue
+        inicio = time.perf_counter()
+        try:
+            cargar()
+            _modelos[nombre] = {"ok": True, "segundos": round(time.perf_counter() - inicio, 4), "error": None}
+        except Exception as e:
+            print(f"⚠️ No se pudo precargar el modelo '{nombre}': {str(e)}")
+            _modelos[nombre] = {"ok": False, "segundos": None, "error": str(e)}
+    return dict(_modelos)
+
+
+def estado_preparacion():
+    """
+    Returns:
+        dict: {"listo", "modelos", "base_datos", "pid"}
+    """
+    from db.connection import engine
+
+    global _ultimo_reintento
+    fallidos = [nombre for nombre, m in _modelos.items() if not m["ok"]]
+    if fallidos and time.monotonic() - _ultimo_reintento >= REINTENTO_PRECARGA_SEGUNDOS:
+        _ultimo_reintento = time.monotonic()
+        precargar_modelos(fallidos)
+
+    try:
+        with engine.connect() as conexion:
+            conexion.execute(text("SELECT 1"))
+        base_datos = {"ok": True, "error": None}
+    except Exception as e:
+        base_datos = {"ok": False, "error": str(e)}
+
+    listo = bool(_modelos) and all(m["ok"] for m in _modelos.values()) and base_datos["ok"]
+    return {"listo": listo, "modelos": dict(_modelos), "base_datos": base_datos, "pid": os.getpid()}
+
+
+def es_lider():
+    """True si este proceso tiene (o acaba de obtener) el bloqueo del planificador."""
+    global _archivo_lider
+    if _archivo_lider is not None or fcntl is None:
+        return True
+
+    directorio = os.path.dirname(LOCK_PLANIFICADOR)
+    if directorio:
+        os.makedirs(directorio, exist_ok=True)
+    archivo = open(LOCK_PLANIFICADOR, "a+")
+    try:
+        fcntl.flock(archivo, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        archivo.close()
+        return False
+
+    # PID del líder, solo informativo
+    archivo.seek(0)
+    archivo.truncate()
+    archivo.write(str(os.getpid()))
+    archivo.flush()
+    _archivo_lider = archivo
+    return True
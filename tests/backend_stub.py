@@ -0,0 +1,108 @@
+"""
+Backend de triajes simulado para los tests de ingesta y sincronización.
+
+Levanta un servidor HTTP local que imita el backend: REST en /api/triajes
+(page, size, desdeId) y GraphQL en /graphql (triajes con pagina, tamano, desdeId).
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+def triaje_backend(id_triaje):
+    """Triaje con el formato (camelCase) que devuelve el backend."""
+    return {
+        "id": id_triaje,
+        "temperatura": 36.0 + (id_triaje % 50) / 10,
+        "peso": 60 + id_triaje % 50,
+        "estatura": 1.60 + (id_triaje % 30) / 100,
+        "frecuenciaCardiaca": 60 + id_triaje % 80,
+        "frecuenciaRespiratoria": 12 + id_triaje % 18,
+        "saturacionOxigeno": 85 + id_triaje % 15,
+        "alergias": "Ninguna",
+        "enfermedadesCronicas": "Ninguna",
+        "motivoConsulta": "Control",
+    }
+
+
+class BackendTriajes:
+    """Estado del backend simulado: triajes disponibles, capacidades y peticiones recibidas."""
+
+    def __init__(self):
+        self.ids = []
+        self.admite_paginacion = True
+        self.admite_filtro = True
+        self.retardo = 0.0
+        self.peticiones = []
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+        self.conexiones = set()
+        self._lock = threading.Lock()
+
+    def triajes(self, pagina=None, tamano=None, desde_id=None):
+        ids = [i for i in self.ids if desde_id is None or not self.admite_filtro or i > desde_id]
+        if pagina is not None and tamano is not None and self.admite_paginacion:
+            ids = ids[pagina * tamano:(pagina + 1) * tamano]
+        return [triaje_backend(i) for i in ids]
+
+    def atender(self, handler, metodo):
+        with self._lock:
+            self.en_vuelo += 1
+            self.max_en_vuelo = max(self.max_en_vuelo, self.en_vuelo)
+            self.conexiones.add(handler.client_address)
+        try:
+            time.sleep(self.retardo)
+            url = urlparse(handler.path)
+            if metodo == "GET":
+                params = {k: int(v[0]) for k, v in parse_qs(url.query).items()}
+                self.peticiones.append(("rest", params))
+                cuerpo = self.triajes(params.get("page"), params.get("size"), params.get("desdeId"))
+            else:
+                consulta = json.loads(handler.rfile.read(int(handler.headers["Content-Length"])))
+                variables = consulta.get("variables") or {}
+                self.peticiones.append(("graphql", variables))
+                if ("pagina" in variables and not self.admite_paginacion) or (
+                    "desdeId" in variables and not self.admite_filtro
+                ):
+                    cuerpo = {"errors": [{"message": "Unknown argument"}]}
+                else:
+                    cuerpo = {"data": {"triajes": self.triajes(
+                        variables.get("pagina"), variables.get("tamano"), variables.get("desdeId")
+                    )}}
+        finally:
+            with self._lock:
+                self.en_vuelo -= 1
+
+        datos = json.dumps(cuerpo).encode()
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/json")
+        handler.send_header("Content-Length", str(len(datos)))
+        handler.end_headers()
+        handler.wfile.write(datos)
+
+
+def iniciar_backend():
+    """Arranca el servidor en un hilo y devuelve (backend, servidor)."""
+    backend = BackendTriajes()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            backend.atender(self, "GET")
+
+        def do_POST(self):
+            backend.atender(self, "POST")
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{servidor.server_address[1]}"
+    backend.url_rest = f"{url}/api/triajes"
+    backend.url_graphql = f"{url}/graphql"
+    return backend, servidor
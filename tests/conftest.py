@@ -0,0 +1,84 @@
+"""
+Configuración común de pytest.
+
+Los tests usan una base de datos SQLite temporal (o la indicada en TEST_DATABASE_URL)
+para no depender de un PostgreSQL local. Debe definirse antes de importar db.connection.
+La instantánea local de triajes (ml/instantanea.py) y el almacén de artefactos
+(ml/artefactos.py, importado de los .pkl versionados) y la caché de análisis de ECG
+se guardan en el mismo directorio temporal.
+La fixture backend_triajes levanta un backend de triajes simulado (ver backend_stub.py)
+y triajes_en_bd inserta triajes con signos vitales aleatorios en rangos realistas.
+"""
+
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+_directorio_bd = tempfile.mkdtemp(prefix="ml_tests_")
+os.environ["DATABASE_URL"] = os.getenv(
+    "TEST_DATABASE_URL", f"sqlite:///{os.path.join(_directorio_bd, 'tests.db')}"
+)
+os.environ["ML_DIR_INSTANTANEA"] = os.path.join(_directorio_bd, "instantanea_triajes")
+os.environ["ML_DIR_ARTEFACTOS"] = os.path.join(_directorio_bd, "artefactos")
+os.environ["ML_DIR_CACHE_ECG"] = os.path.join(_directorio_bd, "cache_ecg")
+
+from db.connection import init_db  # noqa: E402
+
+init_db()
+
+
+@pytest.fixture
+def backend_triajes():
+    """Backend de triajes simulado servido por HTTP en un puerto local."""
+    from backend_stub import iniciar_backend
+
+    backend, servidor = iniciar_backend()
+    yield backend
+    servidor.shutdown()
+    servidor.server_close()
+
+
+# Rangos (mínimo, máximo) de cada signo vital, en el orden de COLUMNAS_SIGNOS
+RANGOS_SIGNOS = ((35.5, 41.0), (50, 150), (12, 32), (80, 100), (45, 130), (1.45, 1.95))
+
+
+@pytest.fixture
+def triajes_en_bd():
+    """
+    Inserta triajes en triajes_ml: triajes_en_bd(n, semilla) crea los ids 1..n, o
+    triajes_en_bd(ids=...) los indicados. `sufre_infarto` es un valor o una función
+    del triaje (por defecto, riesgo en los ids no múltiplos de 3). Devuelve los triajes
+    como diccionarios; al terminar el test vacía triajes_ml y las asignaciones de clusters.
+    """
+    from db.connection import SessionLocal
+    from ml.model import TriajeML, COLUMNAS_SIGNOS
+    from ml.clustering import AsignacionClusterML
+
+    def insertar(n=None, semilla=0, ids=None, sufre_infarto=lambda t: t["id_triaje"] % 3 != 0):
+        ids = list(ids if ids is not None else range(1, n + 1))
+        minimos, maximos = zip(*RANGOS_SIGNOS)
+        signos = np.random.default_rng(semilla).uniform(minimos, maximos, (len(ids), len(COLUMNAS_SIGNOS)))
+        triajes = [
+            {"id_triaje": i, "nombre_paciente": f"Paciente_{i}", **dict(zip(COLUMNAS_SIGNOS, fila))}
+            for i, fila in zip(ids, signos.tolist())
+        ]
+        for t in triajes:
+            t["sufre_infarto"] = sufre_infarto(t) if callable(sufre_infarto) else sufre_infarto
+
+        db = SessionLocal()
+        db.add_all([TriajeML(**t) for t in triajes])
+        db.commit()
+        db.close()
+        return triajes
+
+    yield insertar
+    db = SessionLocal()
+    db.query(AsignacionClusterML).delete()
+    db.query(TriajeML).delete()
+    db.commit()
+    db.close()
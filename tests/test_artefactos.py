@@ -0,0 +1,105 @@
+"""
+Tests del almacén versionado de artefactos de modelos.
+Ejecuta: python -m pytest tests/test_artefactos.py
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pytest
+
+from schema import schema
+from ml import artefactos, model
+from ml.artefactos import (
+    publicar_artefacto,
+    cargar_parametros,
+    listar_versiones,
+    revertir_artefacto,
+    version_actual,
+)
+
+PACIENTE = {"temperatura": 38.0, "frecuencia_cardiaca": 110, "frecuencia_respiratoria": 22,
+            "saturacion_oxigeno": 90, "peso": 90, "estatura": 1.70}
+
+
+@pytest.fixture
+def almacen(tmp_path, monkeypatch):
+    monkeypatch.setattr(artefactos, "DIR_ARTEFACTOS", str(tmp_path / "artefactos"))
+    return tmp_path / "artefactos"
+
+
+def test_publicar_y_cargar(almacen):
+    """Los parámetros se recuperan tal cual, como arrays de solo lectura, junto al manifiesto"""
+    parametros = {"centroides": np.arange(12, dtype=float).reshape(4, 3), "clases": np.array([0, 1])}
+    version = publicar_artefacto("prueba", parametros, metadatos={"filas": 10})
+
+    cargados, manifiesto = cargar_parametros("prueba")
+    assert version_actual("prueba") == version == manifiesto["version"]
+    assert manifiesto["metadatos"] == {"filas": 10}
+    for clave, valor in parametros.items():
+        assert np.array_equal(cargados[clave], valor) and cargados[clave].dtype == valor.dtype
+        assert not cargados[clave].flags.writeable
+    # Ningún directorio temporal queda a la vista
+    assert sorted(os.listdir(almacen / "prueba")) == sorted(["ACTUAL", version])
+
+
+def test_revertir_y_limite_de_versiones(almacen, monkeypatch):
+    """Se puede volver a la versión anterior y solo se conservan las más recientes"""
+    monkeypatch.setattr(artefactos, "MAX_VERSIONES_ARTEFACTO", 3)
+    versiones = [publicar_artefacto("prueba", {"w": np.array([float(i)])}) for i in range(5)]
+
+    assert [v["version"] for v in listar_versiones("prueba")] == versiones[:1:-1]
+    assert revertir_artefacto("prueba") == versiones[3]
+    assert cargar_parametros("prueba")[0]["w"][0] == 3.0
+    assert revertir_artefacto("prueba", versiones[2]) == versiones[2]
+    with pytest.raises(ValueError):
+        revertir_artefacto("prueba")
+    with pytest.raises(ValueError):
+        revertir_artefacto("prueba", versiones[0])
+
+
+def test_revertir_modelo_infarto(almacen, monkeypatch):
+    """Tras revertir por GraphQL, las predicciones usan de nuevo la versión anterior"""
+    monkeypatch.setattr(model, "MODEL_INCREMENTAL_PATH", str(almacen / "estado.pkl"))
+    original = model.predecir_paciente(PACIENTE)  # importa ml/model_infarto.pkl como primera versión
+    anterior = version_actual(model.ARTEFACTO_INFARTO)
+
+    model.entrenar_modelo()
+    assert version_actual(model.ARTEFACTO_INFARTO) != anterior
+
+    result = schema.execute('mutation { revertirModelo(nombre: "infarto") { ok version } }')
+    assert result.data["revertirModelo"] == {"ok": True, "version": anterior}
+    assert model.predecir_paciente(PACIENTE) == original
+
+    versiones = schema.execute('{ versionesModelo(nombre: "infarto") { version actual } }').data["versionesModelo"]
+    assert [v["actual"] for v in versiones] == [False, True]
+
+    # La versión importada no tiene estado incremental: se borra y el siguiente entrenamiento es completo
+    assert not os.path.exists(model.MODEL_INCREMENTAL_PATH)
+
+
+def test_revertir_restaura_estado_incremental(almacen, monkeypatch):
+    """Revertir a una versión entrenada restaura su estado incremental, para que la siguiente
+    actualización parta de ella y no deshaga la reversión"""
+    monkeypatch.setattr(model, "MODEL_INCREMENTAL_PATH", str(almacen / "estado.pkl"))
+    model.entrenar_modelo()
+    entrenada = version_actual(model.ARTEFACTO_INFARTO)
+    filas = model._cargar_estado_incremental()["filas_incrementales"]
+
+    estado = model._cargar_estado_incremental()
+    estado["filas_incrementales"] += 1000
+    model.guardar_modelo(estado, model.MODEL_INCREMENTAL_PATH)
+    model._publicar_modelo(model._clasificador_incremental(estado), {"tipo": "SGDClassifier"}, estado)
+
+    assert model.revertir_modelo(entrenada) == entrenada
+    assert model._cargar_estado_incremental()["filas_incrementales"] == filas
+
+
+def test_versiones_modelo_rechaza_nombres_desconocidos(almacen):
+    """versionesModelo solo acepta los modelos versionados (sin rutas fuera del almacén)"""
+    for nombre in ("../..", "desconocido"):
+        result = schema.execute(f'{{ versionesModelo(nombre: "{nombre}") {{ version }} }}')
+        assert "Modelo desconocido" in result.errors[0].message
@@ -0,0 +1,73 @@
+"""
+Tests de la caché de documentos GraphQL y de las consultas persistidas.
+Ejecuta: python -m pytest tests/test_cache_graphql.py
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from schema import schema
+from cache_graphql import CacheDocumentos, huella_consulta, PERSISTED_QUERY_NOT_FOUND
+
+CONSULTA = "query($id: String!) { versionesModelo(nombre: $id) { version actual } }"
+
+
+def test_documento_reutilizado():
+    """La misma consulta se analiza una vez y da el mismo resultado que schema.execute"""
+    cache = CacheDocumentos(schema, tamano=2)
+    variables = {"id": "infarto"}
+
+    esperado = schema.execute(CONSULTA, variable_values=variables)
+    for _ in range(3):
+        resultado = cache.ejecutar({"query": CONSULTA, "variables": variables})
+        assert not resultado.errors and resultado.data == esperado.data
+
+    estadisticas = cache.estadisticas()
+    assert (estadisticas["aciertos"], estadisticas["fallos"], estadisticas["entradas"]) == (2, 1, 1)
+    assert estadisticas["segundos_ahorrados"] > 0
+
+    # Los errores de validación también se guardan, y el LRU no pasa de su tamaño
+    for _ in range(2):
+        assert cache.ejecutar({"query": "{ campoInexistente }"}).errors
+    cache.ejecutar({"query": "{ trabajosEntrenamiento { id } }"})
+    estadisticas = cache.estadisticas()
+    assert estadisticas["entradas"] == 2 and estadisticas["aciertos"] == 3
+
+
+def test_consulta_persistida():
+    """Con solo el hash se responde PersistedQueryNotFound hasta que el cliente envía el texto"""
+    cache = CacheDocumentos(schema)
+    extensiones = {"persistedQuery": {"version": 1, "sha256Hash": huella_consulta(CONSULTA)}}
+    peticion = {"variables": {"id": "clusters"}, "extensions": extensiones}
+
+    no_encontrada = cache.ejecutar(peticion)
+    assert no_encontrada.errors[0].message == PERSISTED_QUERY_NOT_FOUND
+    assert no_encontrada.errors[0].extensions == {"code": "PERSISTED_QUERY_NOT_FOUND"}
+
+    registrada = cache.ejecutar({**peticion, "query": CONSULTA})
+    solo_hash = cache.ejecutar(peticion)
+    assert not solo_hash.errors and solo_hash.data == registrada.data
+
+    otra = {"persistedQuery": {"version": 1, "sha256Hash": "0" * 64}}
+    assert cache.ejecutar({"query": CONSULTA, "extensions": otra}).errors
+    assert cache.estadisticas()["persistidas_no_encontradas"] == 1
+
+
+def test_peticion_mal_formada():
+    """Un cuerpo con tipos incorrectos da un error GraphQL normal, no una excepción (HTTP 500)"""
+    from app import app
+
+    cliente = app.test_client()
+    for cuerpo in (
+        {"query": 1},
+        {"query": {"a": 1}},
+        [{"query": "{ hello }"}],
+        {"query": "{ hello }", "variables": [1]},
+        {"query": "{ hello }", "operationName": 3},
+        {"query": "{ hello }", "extensions": {"persistedQuery": "x"}},
+    ):
+        respuesta = cliente.post("/graphql", json=cuerpo)
+        assert respuesta.status_code == 200
+        assert respuesta.get_json()["errors"] and respuesta.get_json()["data"] is None
@@ -0,0 +1,51 @@
+"""
+Tests del cargador de datos de entrenamiento a NumPy.
+Ejecuta: python -m pytest tests/test_cargador_datos.py
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pytest
+
+from db.connection import SessionLocal
+from ml.model import TriajeML, COLUMNAS_SIGNOS
+from ml.cargador_datos import cargar_triajes, iterar_bloques_triajes
+
+
+@pytest.fixture
+def triajes(triajes_en_bd):
+    # ids no consecutivos (10, 20, ..., 230) y un triaje sin etiqueta
+    return triajes_en_bd(
+        ids=range(10, 240, 10), sufre_infarto=lambda t: None if t["id_triaje"] == 50 else bool(t["id_triaje"] // 10 % 2)
+    )
+
+
+def test_carga_completa_coincide_con_orm(triajes):
+    """Los arrays contienen lo mismo que los objetos TriajeML, en orden de id"""
+    datos = cargar_triajes(con_id=True, con_etiqueta=True, tamano_lote=4)
+
+    db = SessionLocal()
+    registros = db.query(TriajeML).order_by(TriajeML.id_triaje).all()
+    db.close()
+
+    assert datos["X"].shape == (23, 6)
+    assert datos["ids"].tolist() == [r.id_triaje for r in registros]
+    assert np.array_equal(datos["X"], [[getattr(r, c) for c in COLUMNAS_SIGNOS] for r in registros])
+    assert datos["y"].tolist() == [int(bool(r.sufre_infarto)) for r in registros]
+
+    assert set(cargar_triajes()) == {"X"}
+    assert cargar_triajes(desde_id=200, con_id=True)["ids"].tolist() == [210, 220, 230]
+
+
+def test_bloques_equivalen_a_carga_completa(triajes):
+    """Concatenar los bloques da el mismo DataFrame que la carga completa"""
+    completo = cargar_triajes(con_id=True, con_etiqueta=True, como_dataframe=True)
+    bloques = list(iterar_bloques_triajes(5, con_id=True, con_etiqueta=True, como_dataframe=True))
+
+    assert [len(b) for b in bloques] == [5, 5, 5, 5, 3]
+    assert list(completo.columns) == ["id_triaje", *COLUMNAS_SIGNOS, "sufre_infarto"]
+    assert np.array_equal(np.vstack([b.to_numpy() for b in bloques]), completo.to_numpy())
@@ -0,0 +1,92 @@
+"""
+Tests de la agrupación de predicciones por petición GraphQL (cargadores.py).
+Ejecuta: python -m pytest tests/test_cargadores.py
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+from schema import schema
+from cache_graphql import CacheDocumentos
+from cargadores import CargadorLotes, contexto_peticion
+from ml.model import predecir_pacientes_lote
+from ml.clustering import actualizar_asignaciones, predecir_cluster
+
+PACIENTES = [
+    {"temperatura": 36.5 + i * 0.4, "frecuencia_cardiaca": 60 + i * 9, "frecuencia_respiratoria": 14 + i,
+     "saturacion_oxigeno": 99 - i, "peso": 60 + i * 4, "estatura": 1.60 + i * 0.02}
+    for i in range(8)
+]
+
+
+def _argumentos(p):
+    return ", ".join(
+        f"{nombre}: {p[campo]}"
+        for nombre, campo in (
+            ("temperatura", "temperatura"), ("frecuenciaCardiaca", "frecuencia_cardiaca"),
+            ("frecuenciaRespiratoria", "frecuencia_respiratoria"), ("saturacionOxigeno", "saturacion_oxigeno"),
+            ("peso", "peso"), ("estatura", "estatura"),
+        )
+    )
+
+
+def test_cargador_agrupa_y_no_repite_claves():
+    """Las claves registradas antes de esperar se resuelven en una llamada; las repetidas, una vez"""
+    llamadas = []
+
+    def doble(claves):
+        llamadas.append(list(claves))
+        return [c * 2 for c in claves]
+
+    cargador = CargadorLotes(doble, tamano_maximo=2)
+    pendientes = [cargador.cargar(c) for c in (1, 2, 3, 1)]
+
+    async def esperar_todos():
+        return [await p for p in pendientes]
+
+    corrutina = esperar_todos()
+    with pytest.raises(StopIteration) as fin:
+        corrutina.send(None)  # nunca suspende
+    assert fin.value.value == [2, 4, 6, 2]
+    assert llamadas == [[1, 2], [3]]
+    assert (cargador.lotes, cargador.claves) == (2, 3)
+
+
+def test_predecir_cluster_con_alias_en_un_lote():
+    """Varios predecirCluster con alias en un documento hacen una sola asignación vectorizada"""
+    campos = "\n".join(
+        f"p{i}: predecirCluster({_argumentos(p)}) {{ ok cluster }}" for i, p in enumerate(PACIENTES)
+    )
+    contexto = contexto_peticion()
+
+    resultado = CacheDocumentos(schema).ejecutar({"query": f"mutation {{ {campos} }}"}, context_value=contexto)
+
+    assert not resultado.errors
+    clusters = [resultado.data[f"p{i}"]["cluster"] for i in range(len(PACIENTES))]
+    assert clusters == [predecir_cluster(p)["cluster"] for p in PACIENTES]
+    assert contexto["cargadores"].estadisticas()["clusters"] == {"lotes": 1, "claves": len(PACIENTES)}
+
+
+def test_riesgo_infarto_anidado_en_un_lote(triajes_en_bd):
+    """El riesgoInfarto de cada paciente de obtenerClusters sale de una sola predicción por página"""
+    triajes = triajes_en_bd(8)
+    actualizar_asignaciones()
+    consulta = {"query": "{ obtenerClusters { idTriaje riesgoInfarto { sufreInfarto probabilidad } } }"}
+    contexto = contexto_peticion()
+
+    resultado = CacheDocumentos(schema).ejecutar(consulta, context_value=contexto)
+
+    assert not resultado.errors
+    esperado = predecir_pacientes_lote(triajes)
+    assert [p["riesgoInfarto"]["probabilidad"] for p in resultado.data["obtenerClusters"]] == [
+        e["probabilidad"] for e in esperado
+    ]
+    assert contexto["cargadores"].estadisticas()["infarto_triaje"] == {"lotes": 1, "claves": len(triajes)}
+
+    # Sin contexto (schema.execute) cada campo se resuelve por separado, con el mismo resultado
+    sin_lotes = schema.execute(consulta["query"])
+    assert sin_lotes.data == resultado.data
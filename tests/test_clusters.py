@@ -0,0 +1,152 @@
+"""
+Tests de asignación de clusters sobre los pacientes guardados en la BD.
+Ejecuta: python -m pytest tests/test_clusters.py
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pytest
+
+from schema import schema
+from db.connection import SessionLocal
+from ml.model import TriajeML, COLUMNAS_SIGNOS
+from ml.clustering import (
+    AsignacionClusterML,
+    actualizar_asignaciones,
+    agrupar_pacientes,
+    iterar_clusters_pacientes,
+    predecir_clusters_lote,
+    version_modelo_clusters,
+)
+
+
+def test_recorrido_por_bloques(triajes_en_bd):
+    """El recorrido por bloques asigna lo mismo que el lote completo, en orden de id"""
+    triajes = triajes_en_bd(25)
+    esperado = [r["cluster"] for r in predecir_clusters_lote(triajes)]
+    actualizar_asignaciones()
+
+    resultado = list(iterar_clusters_pacientes(tamano_lote=4))
+
+    assert [r["id_triaje"] for r in resultado] == [t["id_triaje"] for t in triajes]
+    assert [r["cluster"] for r in resultado] == esperado
+    assert agrupar_pacientes() == resultado
+
+
+def test_obtener_clusters_paginado(triajes_en_bd):
+    """first/after recorren la tabla completa sin repetir ni saltar pacientes"""
+    triajes = triajes_en_bd(25)
+    query = """
+    query($first: Int, $after: Int) {
+        obtenerClusters(first: $first, after: $after) { idTriaje cluster }
+    }
+    """
+    actualizar_asignaciones()
+    vistos = []
+    after = None
+    while True:
+        result = schema.execute(query, variables={"first": 10, "after": after})
+        assert not result.errors
+        pagina = result.data["obtenerClusters"]
+        if not pagina:
+            break
+        vistos.extend(p["idTriaje"] for p in pagina)
+        after = pagina[-1]["idTriaje"]
+
+    assert vistos == [t["id_triaje"] for t in triajes]
+
+
+@pytest.mark.usefixtures("triajes_en_bd")  # vacía la tabla al terminar
+def test_sincronizacion_asigna_y_la_lectura_no_escribe():
+    """Los triajes sincronizados se guardan con su cluster; obtenerClusters solo hace un SELECT"""
+    from sqlalchemy import event
+    from db.connection import engine
+    from backend_stub import triaje_backend
+    from ml.utils import insertar_triajes_lote
+
+    insertar_triajes_lote([triaje_backend(i) for i in range(1, 13)])
+    sentencias = []
+
+    def capturar(conn, cursor, sentencia, *args):
+        sentencias.append(sentencia)
+
+    event.listen(engine, "before_cursor_execute", capturar)
+    try:
+        pagina = list(iterar_clusters_pacientes(despues_de=4, limite=5))
+    finally:
+        event.remove(engine, "before_cursor_execute", capturar)
+
+    assert [p["id_triaje"] for p in pagina] == [5, 6, 7, 8, 9]
+    assert len(sentencias) == 1 and sentencias[0].lstrip().startswith("SELECT")
+
+
+def test_asignaciones_incrementales(triajes_en_bd):
+    """Solo se recalculan los triajes nuevos o los asignados con otra versión del modelo"""
+    triajes = triajes_en_bd(25)
+    assert actualizar_asignaciones() == len(triajes)
+    assert actualizar_asignaciones() == 0
+
+    triajes_en_bd(ids=[26], semilla=3)
+    db = SessionLocal()
+    db.query(AsignacionClusterML).filter_by(id_triaje=1).update({"version_modelo": "obsoleta"})
+    db.commit()
+    db.close()
+
+    assert actualizar_asignaciones() == 2
+
+    db = SessionLocal()
+    versiones = {a.version_modelo for a in db.query(AsignacionClusterML).all()}
+    db.close()
+    assert versiones == {version_modelo_clusters()}
+
+
+def test_entrenamiento_streaming(triajes_en_bd, tmp_path, monkeypatch):
+    """El modo out-of-core guarda el mismo formato de modelo y predecir_cluster sigue funcionando"""
+    from ml import clustering, artefactos
+
+    triajes = triajes_en_bd(25)
+    monkeypatch.setattr(artefactos, "DIR_ARTEFACTOS", str(tmp_path / "artefactos"))
+    resultado = clustering.entrenar_clusters(num_clusters=3, streaming=True, tamano_lote=7)
+    assert "25 pacientes" in resultado
+
+    modelo = artefactos.cargar_modelo_sklearn(clustering.ARTEFACTO_CLUSTERS)
+    assert set(modelo) == {"model", "scaler"}
+    X = np.array([[t[c] for c in COLUMNAS_SIGNOS] for t in triajes])
+    # La media y la varianza acumuladas por bloques son las de la tabla completa
+    assert np.allclose(modelo["scaler"].mean_, X.mean(axis=0))
+    assert np.allclose(modelo["scaler"].var_, X.var(axis=0))
+
+    assert clustering.predecir_cluster(triajes[0])["cluster"] in range(3)
+    assert len(agrupar_pacientes()) == 25
+
+
+@pytest.mark.usefixtures("triajes_en_bd")
+def test_entrenamiento_auto_k(tmp_path, monkeypatch):
+    """El modo automático elige k=3 con tres grupos bien separados y puntúa todos los candidatos"""
+    from ml import clustering, artefactos
+
+    monkeypatch.setattr(artefactos, "DIR_ARTEFACTOS", str(tmp_path / "artefactos"))
+    rng = np.random.default_rng(1)
+    centros = [(36.5, 70, 16, 98, 70, 1.70), (39.5, 130, 28, 85, 110, 1.60), (35.8, 55, 12, 95, 50, 1.85)]
+    triajes = [
+        TriajeML(nombre_paciente=f"Paciente_{i}", sufre_infarto=False,
+                 **dict(zip(COLUMNAS_SIGNOS, np.asarray(centros[i % 3]) * rng.normal(1, 0.01, 6))))
+        for i in range(60)
+    ]
+    db = SessionLocal()
+    db.add_all(triajes)
+    db.commit()
+    db.close()
+
+    resultado = clustering.entrenar_clusters_auto(k_min=2, k_max=6, n_jobs=2)
+
+    assert resultado["num_clusters"] == 3
+    assert [p["k"] for p in resultado["puntajes"]] == [2, 3, 4, 5, 6]
+    assert all(p["silueta"] is not None and p["segundos"] >= 0 for p in resultado["puntajes"])
+    manifiesto = artefactos.leer_manifiesto(clustering.ARTEFACTO_CLUSTERS)
+    assert manifiesto["metadatos"]["num_clusters"] == 3
+    assert len(manifiesto["metadatos"]["puntajes"]) == 5
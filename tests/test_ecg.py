@@ -0,0 +1,249 @@
+"""
+Tests del análisis de ECG: resultados estables, análisis concurrentes, caché,
+historial y procesamiento de la señal.
+Ejecuta: python -m pytest tests/test_ecg.py
+"""
+
+import sys
+import os
+import base64
+import subprocess
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from schema import schema
+from ml import ecg_senal
+from ml.ecg_model import MotorECG, analizar_ecg_mock
+from ml.ecg_senal import MODELO_SENAL_ECG, codificar_pgm, ecg_sintetico, trazar_imagen
+
+RAIZ = os.path.join(os.path.dirname(__file__), "..")
+
+CAMPOS = ("diagnostico", "probabilidad", "frecuencia_cardiaca")
+
+
+def _campos(resultado):
+    return tuple(resultado[c] for c in CAMPOS)
+
+
+def test_resultado_estable_entre_procesos():
+    """El mismo archivo da el mismo resultado en procesos con distinta semilla de hash()"""
+    codigo = (
+        "from ml.ecg_model import MotorECG;"
+        "r = MotorECG(retardo=0).analizar('ecg_paciente_123.jpg', 1);"
+        "print(r['diagnostico'], r['probabilidad'], r['frecuencia_cardiaca'])"
+    )
+    salidas = {
+        subprocess.run(
+            [sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True,
+            env={**os.environ, "PYTHONHASHSEED": semilla},
+        ).stdout.strip().splitlines()[-1]
+        for semilla in ("1", "2", "3")
+    }
+    assert len(salidas) == 1
+
+
+def test_no_modifica_el_generador_global():
+    """Analizar un ECG no reinicia la secuencia de random"""
+    import random
+
+    random.seed(7)
+    esperado = [random.random() for _ in range(3)]
+    random.seed(7)
+    obtenido = [random.random()]
+    MotorECG(retardo=0).analizar("ecg_x.jpg", 1)
+    obtenido += [random.random() for _ in range(2)]
+    assert obtenido == esperado
+
+
+def test_lote_concurrente():
+    """Un lote de análisis tarda lo que uno, y cada resultado es el de su imagen"""
+    motor = MotorECG(retardo=0.3)
+    solicitudes = [(f"ecg_{i}.jpg", i) for i in range(20)]
+
+    inicio = time.perf_counter()
+    resultados = motor.analizar_lote(solicitudes)
+    segundos = time.perf_counter() - inicio
+
+    assert segundos < 2
+    assert [r["id_paciente"] for r in resultados] == list(range(20))
+    individuales = [MotorECG(retardo=0).analizar(*s) for s in solicitudes]
+    assert [_campos(r) for r in resultados] == [_campos(r) for r in individuales]
+
+
+def test_contenido_de_la_imagen(monkeypatch):
+    """Con el contenido, el ECG se procesa: el resultado depende de la imagen y no del nombre del archivo"""
+    from ml import ecg_model
+
+    monkeypatch.setattr(ecg_model, "motor_ecg", MotorECG(retardo=0))
+    imagen = base64.b64encode(codificar_pgm(trazar_imagen(ecg_sintetico(70, desnivel_st=0.35)))).decode()
+    mutation = """
+    mutation($archivo: String!, $imagen: String) {
+        analizarEcg(archivoImagen: $archivo, idPaciente: 1, imagenBase64: $imagen) {
+            ok analisis { diagnostico probabilidad frecuenciaCardiaca latidos desnivelSt modeloUtilizado }
+        }
+    }
+    """
+    a = schema.execute(mutation, variables={"archivo": "a.jpg", "imagen": imagen})
+    b = schema.execute(mutation, variables={"archivo": "b.jpg", "imagen": imagen})
+    assert not a.errors and a.data["analizarEcg"]["ok"]
+    assert a.data["analizarEcg"]["analisis"] == b.data["analizarEcg"]["analisis"]
+    analisis = a.data["analizarEcg"]["analisis"]
+    assert analisis["diagnostico"] == "Infarto Agudo"
+    assert (analisis["frecuenciaCardiaca"], analisis["latidos"]) == (70, 12)
+    assert analisis["modeloUtilizado"] == MODELO_SENAL_ECG
+
+    invalida = schema.execute(mutation, variables={"archivo": "a.jpg", "imagen": "no es base64!"})
+    assert invalida.data["analizarEcg"]["ok"] is False
+
+    assert _campos(analizar_ecg_mock("a.jpg", 1)) == _campos(analizar_ecg_mock("a.jpg", 2))
+
+
+def test_senal_y_lote_en_procesos():
+    """La señal se analiza igual enviada directamente que repartida en el pool de procesos"""
+    casos = {
+        "Normal": {},
+        "Arritmia Supraventricular": {"frecuencia_cardiaca": 130},
+        "Fibrilación Auricular": {"frecuencia_cardiaca": 95, "irregularidad": 0.35},
+        "Isquemia Subendocárdica": {"desnivel_st": -0.2},
+    }
+    entradas = [{"senal": ecg_sintetico(semilla=1, **parametros), "frecuencia": 500} for parametros in casos.values()]
+
+    en_lote = ecg_senal.analizar_lote(entradas)
+    assert [r["tipo"] for r in en_lote] == list(casos)
+    assert en_lote == [ecg_senal.analizar_entrada(e) for e in entradas]
+    assert abs(en_lote[1]["frecuencia_cardiaca"] - 130) < 2
+
+    resultado = schema.execute(
+        "mutation($senal: [Float]) { analizarEcg(archivoImagen: \"senal\", idPaciente: 1, senal: $senal,"
+        " frecuenciaMuestreo: 500) { ok analisis { diagnostico rrMedioMs sdnnMs } } }",
+        variables={"senal": entradas[2]["senal"].tolist()},
+    )
+    analisis = resultado.data["analizarEcg"]["analisis"]
+    assert analisis["diagnostico"] == "Fibrilación Auricular" and analisis["sdnnMs"] > 50
+
+
+def test_senales_demasiado_cortas():
+    """Las señales vacías o de menos de unos periodos refractarios no son interpretables"""
+    for senal in ([], [0.5], [0.1, 0.2], ecg_sintetico(segundos=0.5)):
+        resultado = ecg_senal.analizar_entrada({"senal": senal, "frecuencia": 500})
+        assert resultado["tipo"] == ecg_senal.NO_INTERPRETABLE and resultado["latidos"] == 0
+    # Una imagen de tres columnas da tres muestras (y una frecuencia ínfima)
+    estrecha = np.full((20, 3), 255, dtype=np.uint8)
+    estrecha[10] = 0
+    imagen = ecg_senal.analizar_entrada({"imagen": codificar_pgm(estrecha)})
+    assert imagen["tipo"] == ecg_senal.NO_INTERPRETABLE
+
+
+def test_workers_ecg_repartidos_entre_workers_web():
+    """Cada worker de gunicorn crea su pool: por defecto se reparten los núcleos entre ellos"""
+    codigo = "from ml import ecg_senal; print(ecg_senal.WORKERS_ECG)"
+    entorno = {k: v for k, v in os.environ.items() if k != "ML_WORKERS_ECG"}
+    workers = lambda web: int(subprocess.run(  # noqa: E731
+        [sys.executable, "-c", codigo], env={**entorno, "ML_WORKERS_WEB": str(web)},
+        cwd=os.path.join(os.path.dirname(__file__), ".."), capture_output=True, text=True, check=True,
+    ).stdout)
+    assert workers(1) == (os.cpu_count() or 1)
+    assert workers(os.cpu_count() or 1) == 1 and workers(1000) == 1
+
+
+def test_cache_por_contenido_y_version(tmp_path, monkeypatch):
+    """Repetir un análisis sale de la caché; una versión nueva del modelo ECG la invalida"""
+    from ml import artefactos, ecg_model
+    from ml.cache_ecg import CacheECG
+
+    monkeypatch.setattr(artefactos, "DIR_ARTEFACTOS", str(tmp_path / "artefactos"))
+    cache = CacheECG(directorio=str(tmp_path / "cache"), tamano=2)
+    motor = MotorECG(retardo=0.2, cache=cache)
+    trazado = codificar_pgm(trazar_imagen(ecg_sintetico(80)))
+
+    primero = motor.analizar("a.jpg", 1, trazado)
+    inicio = time.perf_counter()
+    repetido = motor.analizar("otro_nombre.jpg", 2, trazado)
+    assert time.perf_counter() - inicio < 0.05
+    assert not primero["desde_cache"] and repetido["desde_cache"]
+    assert _campos(primero) == _campos(repetido) and repetido["id_paciente"] == 2
+
+    # Otro proceso (caché en memoria vacía) lo encuentra en disco
+    en_disco = MotorECG(retardo=0.2, cache=CacheECG(directorio=str(tmp_path / "cache"), tamano=2))
+    assert en_disco.analizar("a.jpg", 1, trazado)["desde_cache"]
+    assert en_disco.cache.estadisticas()["aciertos_disco"] == 1
+
+    # El LRU no pasa de su tamaño
+    for i in range(3):
+        motor.analizar(f"ecg_{i}.jpg", 1)
+    assert cache.estadisticas()["entradas_memoria"] == 2
+
+    version_anterior = ecg_model.version_modelo_ecg()
+    artefactos.publicar_artefacto(ecg_model.ARTEFACTO_ECG, {}, metadatos={"modelo": ecg_model.MODELO_ECG})
+    assert not motor.analizar("a.jpg", 1, trazado)["desde_cache"]
+    assert not os.path.exists(tmp_path / "cache" / version_anterior)
+
+    estadisticas = cache.estadisticas()
+    assert estadisticas["version_modelo"] == ecg_model.version_modelo_ecg()
+    assert (estadisticas["aciertos_memoria"], estadisticas["fallos"]) == (1, 5)
+
+
+def test_historico_persistido(monkeypatch):
+    """analizarEcg guarda el análisis y el historial se lee paginado y filtrado por fechas"""
+    from datetime import datetime, timedelta
+    from db.connection import SessionLocal
+    from ml import ecg_model
+    from ml.historico_ecg import AnalisisECGML, obtener_historico_ecg
+
+    monkeypatch.setattr(ecg_model, "motor_ecg", MotorECG(retardo=0))
+    base = datetime(2025, 1, 1, 8, 0)
+    db = SessionLocal()
+    db.add_all([
+        AnalisisECGML(id_paciente=7, fecha_analisis=base + timedelta(days=i), diagnostico="Normal",
+                      archivo_imagen=f"ecg_{i}.jpg")
+        for i in range(30)
+    ] + [AnalisisECGML(id_paciente=8, fecha_analisis=base, diagnostico="Normal")])
+    db.commit()
+    db.close()
+    try:
+        resultado = schema.execute('mutation { analizarEcg(archivoImagen: "nuevo.jpg", idPaciente: 7) { ok analisis { idAnalisis } } }')
+        assert resultado.data["analizarEcg"]["ok"]
+        nuevo = resultado.data["analizarEcg"]["analisis"]["idAnalisis"]
+
+        query = """
+        query($after: Int) {
+            obtenerHistoricoEcg(idPaciente: 7, first: 12, after: $after) { idAnalisis fechaAnalisis archivoImagen }
+        }
+        """
+        vistos, after = [], None
+        while True:
+            pagina = schema.execute(query, variables={"after": after}).data["obtenerHistoricoEcg"]
+            if not pagina:
+                break
+            vistos += pagina
+            after = int(pagina[-1]["idAnalisis"])
+
+        assert len(vistos) == 31 and vistos[0]["idAnalisis"] == str(nuevo)
+        fechas = [v["fechaAnalisis"] for v in vistos]
+        assert fechas == sorted(fechas, reverse=True)
+
+        # El cursor solo vale entre los análisis del paciente: un id de otro paciente no devuelve nada
+        db = SessionLocal()
+        ajeno = db.query(AnalisisECGML.id_analisis).filter(AnalisisECGML.id_paciente == 8).scalar()
+        db.close()
+        assert obtener_historico_ecg(7, after=ajeno) == []
+        no_numerico = schema.execute('{ obtenerHistoricoEcg(idPaciente: 7, after: "abc") { idAnalisis } }')
+        assert no_numerico.errors and no_numerico.data is None
+
+        # first: 0 o negativo es un error, no una página por defecto
+        for first in (0, -3):
+            invalido = schema.execute(f"{{ obtenerHistoricoEcg(idPaciente: 7, first: {first}) {{ idAnalisis }} }}")
+            assert "first" in invalido.errors[0].message
+        assert len(obtener_historico_ecg(7, first=1)) == 1
+
+        # `hasta` con solo el día incluye el día completo
+        filtrado = obtener_historico_ecg(7, desde="2025-01-10", hasta="2025-01-12")
+        assert [h["archivo_imagen"] for h in filtrado] == ["ecg_11.jpg", "ecg_10.jpg", "ecg_9.jpg"]
+    finally:
+        db = SessionLocal()
+        db.query(AnalisisECGML).delete()
+        db.commit()
+        db.close()
@@ -0,0 +1,76 @@
+"""
+Tests del entrenamiento incremental del modelo de infarto.
+Ejecuta: python -m pytest tests/test_entrenamiento_incremental.py
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ml import model, artefactos
+from ml.model import COLUMNAS_SIGNOS
+
+
+def _taquicardia(triaje):
+    """Etiqueta aprendible a partir de los signos: riesgo con más de 110 lpm."""
+    return triaje["frecuencia_cardiaca"] > 110
+
+
+@pytest.fixture
+def rutas_temporales(tmp_path, monkeypatch):
+    """Entrena sobre copias temporales para no tocar los modelos versionados."""
+    monkeypatch.setattr(artefactos, "DIR_ARTEFACTOS", str(tmp_path / "artefactos"))
+    monkeypatch.setattr(model, "MODEL_INCREMENTAL_PATH", str(tmp_path / "estado.pkl"))
+    return tmp_path
+
+
+def test_entrenar_modelo_usa_los_datos_recibidos(rutas_temporales):
+    """entrenar_modelo ya no descarta el DataFrame que recibe"""
+    df = pd.concat([model.datos_hardcodeados()] * 3, ignore_index=True)
+    metricas = model.entrenar_modelo(df)
+    assert metricas["completo"]["muestras"] == 60
+
+
+def test_actualizacion_incremental(rutas_temporales, triajes_en_bd):
+    """Solo se procesan los triajes nuevos y el modelo publicado es el pipeline SGD"""
+    triajes_en_bd(40, sufre_infarto=_taquicardia)
+    assert "Modelo entrenado" in model.entrenar_modelo_con_datos(incremental=True)
+    assert model.metricas_entrenamiento()["ultimo_id"] == 40
+
+    assert "Sin triajes nuevos" in model.entrenar_modelo_con_datos(incremental=True)
+
+    triajes_en_bd(ids=range(41, 71), semilla=1, sufre_infarto=_taquicardia)
+    resultado = model.entrenar_modelo_con_datos(incremental=True)
+    assert "30 triajes nuevos" in resultado
+
+    metricas = model.metricas_entrenamiento()
+    assert metricas["ultimo_id"] == 70
+    assert metricas["ejecuciones_incrementales"] == 1
+    assert metricas["prequential"]["muestras"] == 30
+    assert set(metricas["incremental"]) == set(metricas["completo"])
+
+    # La inferencia NumPy (parámetros del artefacto) reproduce el pipeline StandardScaler + SGD publicado
+    publicado = artefactos.cargar_modelo_sklearn(model.ARTEFACTO_INFARTO)
+    X = np.random.default_rng(2).uniform([35.5, 50, 12, 80, 45, 1.45], [41, 150, 32, 100, 130, 1.95], (20, 6))
+    probabilidades = publicado.predict_proba(pd.DataFrame(X, columns=COLUMNAS_SIGNOS))[:, 1]
+    assert np.allclose(model._cargar_predictor_numpy().probabilidad(X), probabilidades)
+
+
+def test_reentreno_completo_periodico(rutas_temporales, triajes_en_bd, monkeypatch):
+    """Tras ML_REENTRENO_COMPLETO_CADA actualizaciones se reentrena desde cero"""
+    monkeypatch.setattr(model, "REENTRENO_COMPLETO_CADA", 1)
+    triajes_en_bd(40, sufre_infarto=_taquicardia)
+    model.entrenar_modelo_con_datos(incremental=True)
+    triajes_en_bd(ids=range(41, 51), semilla=1, sufre_infarto=_taquicardia)
+    model.entrenar_modelo_con_datos(incremental=True)
+    assert model.metricas_entrenamiento()["ejecuciones_incrementales"] == 1
+
+    triajes_en_bd(ids=range(51, 61), semilla=2, sufre_infarto=_taquicardia)
+    assert "Modelo entrenado" in model.entrenar_modelo_con_datos(incremental=True)
+    assert model.metricas_entrenamiento()["ejecuciones_incrementales"] == 0
+    assert model.metricas_entrenamiento()["ultimo_id"] == 60
@@ -0,0 +1,69 @@
+"""
+Tests del cliente de ingesta contra un backend de triajes simulado por HTTP.
+Ejecuta: python -m pytest tests/test_ingesta.py
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from ml.ingesta import ClienteTriajes
+
+
+def test_paginas_en_orden_con_concurrencia_acotada(backend_triajes):
+    """Las páginas se descargan en paralelo, sin superar max_workers, y se entregan en orden"""
+    backend_triajes.ids = list(range(1, 1001))
+    backend_triajes.retardo = 0.02
+    cliente = ClienteTriajes(url_rest=backend_triajes.url_rest, tamano_pagina=50, max_workers=3)
+
+    paginas = list(cliente.iterar_paginas_rest())
+    cliente.cerrar()
+
+    assert [t["id"] for pagina in paginas for t in pagina] == backend_triajes.ids
+    assert all(len(p) == 50 for p in paginas)
+    assert 1 < backend_triajes.max_en_vuelo <= 3
+    # La sesión reutiliza sus conexiones: como mucho una por hilo
+    assert len(backend_triajes.conexiones) <= 3
+    # Se piden como mucho max_workers páginas de más tras la última
+    assert len(backend_triajes.peticiones) <= 20 + 1 + 3
+
+
+def test_backend_sin_paginacion(backend_triajes):
+    """Si el backend ignora page/size, su respuesta completa se entrega una sola vez"""
+    backend_triajes.ids = list(range(1, 121))
+    backend_triajes.admite_paginacion = False
+    cliente = ClienteTriajes(
+        url_rest=backend_triajes.url_rest, url_graphql=backend_triajes.url_graphql, tamano_pagina=50
+    )
+
+    rest = list(cliente.iterar_paginas_rest())
+    graphql = list(cliente.iterar_paginas_graphql(desde_id=100))
+    cliente.cerrar()
+
+    assert [len(p) for p in rest] == [120]
+    assert [[t["id"] for t in p] for p in graphql] == [list(range(101, 121))]
+
+
+def test_backend_sin_paginacion_pagina_exacta(backend_triajes):
+    """Si el backend ignora page/size y devuelve justo tamano_pagina triajes, no se piden páginas sin fin"""
+    backend_triajes.ids = list(range(1, 11))
+    backend_triajes.admite_paginacion = False
+    cliente = ClienteTriajes(url_rest=backend_triajes.url_rest, tamano_pagina=10, max_workers=2)
+
+    paginas = list(cliente.iterar_paginas_rest())
+    cliente.cerrar()
+
+    assert [[t["id"] for t in p] for p in paginas] == [backend_triajes.ids]
+    assert len(backend_triajes.peticiones) <= 1 + 2 + 1
+
+
+def test_paginas_graphql(backend_triajes):
+    """El backend GraphQL paginado se recorre página a página hasta la última incompleta"""
+    backend_triajes.ids = list(range(1, 24))
+    cliente = ClienteTriajes(url_graphql=backend_triajes.url_graphql, tamano_pagina=5, max_workers=2)
+
+    paginas = list(cliente.iterar_paginas_graphql())
+    cliente.cerrar()
+
+    assert [len(p) for p in paginas] == [5, 5, 5, 5, 3]
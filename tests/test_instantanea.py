@@ -0,0 +1,79 @@
+"""
+Tests de la instantánea columnar local de triajes_ml.
+Ejecuta: python -m pytest tests/test_instantanea.py
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import numpy as np
+
+from db.connection import SessionLocal
+from ml.model import TriajeML, COLUMNAS_SIGNOS
+from ml.cargador_datos import cargar_triajes
+from ml.instantanea import leer_triajes, iterar_bloques, sincronizar_instantanea
+
+
+def _igual_a_bd(datos):
+    bd = cargar_triajes(con_id=True, con_etiqueta=True)
+    return all(np.array_equal(datos[clave], bd[clave]) for clave in ("ids", "X", "y"))
+
+
+def test_anade_solo_triajes_nuevos(triajes_en_bd):
+    """Los triajes nuevos se añaden al final sin reconstruir la instantánea"""
+    triajes_en_bd(10)
+    assert sincronizar_instantanea()["anadidas"] == 10
+
+    triajes_en_bd(ids=range(11, 16), semilla=1)
+    estado = sincronizar_instantanea(tamano_lote=2)
+    assert estado["anadidas"] == 5 and not estado["reconstruida"]
+    assert estado["filas"] == 15 and estado["ultimo_id"] == 15
+
+    assert _igual_a_bd(leer_triajes(con_id=True, con_etiqueta=True))
+    assert leer_triajes(desde_id=12, con_id=True)["ids"].tolist() == [13, 14, 15]
+    assert sincronizar_instantanea()["anadidas"] == 0
+
+
+def test_reconstruye_si_cambia_el_conteo(triajes_en_bd):
+    """Si se borran triajes ya incluidos, la instantánea se reconstruye desde la BD"""
+    triajes_en_bd(10)
+    sincronizar_instantanea()
+
+    db = SessionLocal()
+    db.query(TriajeML).filter(TriajeML.id_triaje.in_([2, 3])).delete()
+    db.commit()
+    db.close()
+
+    estado = sincronizar_instantanea()
+    assert estado["reconstruida"] and estado["filas"] == 8
+    assert _igual_a_bd(leer_triajes(con_id=True, con_etiqueta=True))
+
+
+def test_bloques_y_dataframe(triajes_en_bd):
+    """La lectura por bloques recorre la instantánea completa en orden"""
+    triajes_en_bd(23)
+    bloques = list(iterar_bloques(10, con_id=True))
+    assert [len(b["ids"]) for b in bloques] == [10, 10, 3]
+    assert np.concatenate([b["ids"] for b in bloques]).tolist() == list(range(1, 24))
+
+    df = leer_triajes(con_etiqueta=True, como_dataframe=True)
+    assert list(df.columns) == [*COLUMNAS_SIGNOS, "sufre_infarto"]
+    assert len(df) == 23
+
+
+def test_reconstruye_si_se_modifica_una_fila(triajes_en_bd):
+    """Una fila modificada en su sitio (mismo id y mismo conteo) se detecta por actualizado_en"""
+    triajes_en_bd(10)
+    sincronizar_instantanea()
+
+    db = SessionLocal()
+    db.get(TriajeML, 4).temperatura = 41.5
+    db.commit()
+    db.close()
+
+    estado = sincronizar_instantanea()
+    assert estado["reconstruida"]
+    assert leer_triajes(con_id=True)["X"][3][COLUMNAS_SIGNOS.index("temperatura")] == 41.5
+    assert not sincronizar_instantanea()["reconstruida"]
@@ -0,0 +1,138 @@
+"""
+Tests de predicción de riesgo de infarto y de asignación de clusters.
+Ejecuta: python -m pytest tests/test_prediccion.py
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import joblib
+import numpy as np
+import pandas as pd
+import pytest
+
+from schema import schema
+from ml.model import predecir_paciente, predecir_pacientes_lote, COLUMNAS_SIGNOS, MODEL_PATH
+from ml.clustering import predecir_cluster, predecir_clusters_lote, MODEL_CLUSTER_PATH
+from ml.inferencia_numpy import PredictorInfartoNumpy, PredictorClustersNumpy
+
+PACIENTES = [
+    {"temperatura": 38.0, "frecuencia_cardiaca": 110, "frecuencia_respiratoria": 22,
+     "saturacion_oxigeno": 90, "peso": 90, "estatura": 1.70},
+    {"temperatura": 36.5, "frecuencia_cardiaca": 70, "frecuencia_respiratoria": 16,
+     "saturacion_oxigeno": 99, "peso": 70, "estatura": 1.80},
+    {"temperatura": 40.1, "frecuencia_cardiaca": 135, "frecuencia_respiratoria": 29,
+     "saturacion_oxigeno": 85, "peso": 113, "estatura": 1.63},
+]
+
+
+def test_lote_coincide_con_prediccion_individual():
+    """El lote devuelve, en orden, lo mismo que predecir cada paciente por separado"""
+    lote = predecir_pacientes_lote(PACIENTES)
+    assert lote == [predecir_paciente(p) for p in PACIENTES]
+    assert predecir_pacientes_lote([]) == []
+
+
+def test_mutation_predecir_pacientes_lote():
+    """La mutation devuelve una predicción por paciente con su índice de entrada"""
+    query = """
+    mutation($pacientes: [SignosVitalesInput!]!) {
+        predecirPacientesLote(pacientes: $pacientes) {
+            ok
+            predicciones { indice sufreInfarto probabilidad }
+        }
+    }
+    """
+    variables = {
+        "pacientes": [
+            {
+                "temperatura": p["temperatura"],
+                "frecuenciaCardiaca": p["frecuencia_cardiaca"],
+                "frecuenciaRespiratoria": p["frecuencia_respiratoria"],
+                "saturacionOxigeno": p["saturacion_oxigeno"],
+                "peso": p["peso"],
+                "estatura": p["estatura"],
+            }
+            for p in PACIENTES
+        ]
+    }
+
+    result = schema.execute(query, variables=variables)
+
+    assert not result.errors
+    data = result.data["predecirPacientesLote"]
+    assert data["ok"]
+    assert [p["indice"] for p in data["predicciones"]] == [0, 1, 2]
+    esperado = predecir_pacientes_lote(PACIENTES)
+    assert [p["probabilidad"] for p in data["predicciones"]] == [e["probabilidad"] for e in esperado]
+
+
+def test_clusters_lote_coincide_con_kmeans():
+    """El lote asigna el mismo cluster que predecir_cluster y la distancia al centroide"""
+    lote = predecir_clusters_lote(PACIENTES)
+
+    assert [r["cluster"] for r in lote] == [predecir_cluster(p)["cluster"] for p in PACIENTES]
+
+    modelo = joblib.load(MODEL_CLUSTER_PATH)
+    X = modelo["scaler"].transform(pd.DataFrame(PACIENTES)[COLUMNAS_SIGNOS])
+    distancias = modelo["model"].transform(X).min(axis=1)
+    assert np.allclose([r["distancia"] for r in lote], distancias)
+
+
+def _signos_aleatorios(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return np.column_stack([
+        rng.uniform(35.5, 41.0, n),
+        rng.uniform(50, 150, n),
+        rng.uniform(12, 32, n),
+        rng.uniform(80, 100, n),
+        rng.uniform(45, 130, n),
+        rng.uniform(1.45, 1.95, n),
+    ])
+
+
+def test_inferencia_numpy_coincide_con_sklearn():
+    """El predictor NumPy reproduce exactamente predict / predict_proba de sklearn"""
+    modelo = joblib.load(MODEL_PATH)
+    predictor = PredictorInfartoNumpy.desde_sklearn(modelo)
+
+    for n in (1, 50, 5000):
+        X = _signos_aleatorios(n)
+        df = pd.DataFrame(X, columns=COLUMNAS_SIGNOS)
+        assert np.array_equal(predictor.probabilidad(X), modelo.predict_proba(df)[:, 1])
+        assert np.array_equal(predictor.predecir(X), modelo.predict(df))
+
+
+@pytest.mark.parametrize("valor", [-1e6, 1e6])
+def test_valores_extremos_como_sklearn(monkeypatch, valor):
+    """Un signo vital extremo no desborda el sigmoide: NumPy y sklearn dan lo mismo, solo o en lote"""
+    from ml import model
+
+    extremos = [{**p, campo: valor} for p in PACIENTES for campo in ("temperatura", "peso")]
+    lote = extremos + PACIENTES * 30  # más filas que un lote pequeño
+
+    numpy_individual = [predecir_paciente(p) for p in extremos]
+    numpy_lote = predecir_pacientes_lote(lote)
+    monkeypatch.setattr(model, "INFERENCIA_NUMPY", False)
+    sklearn_individual = [predecir_paciente(p) for p in extremos]
+    sklearn_lote = predecir_pacientes_lote(lote)
+
+    assert numpy_individual == sklearn_individual
+    assert numpy_lote == sklearn_lote
+    assert numpy_lote[:len(extremos)] == numpy_individual
+
+
+def test_clusters_numpy_coincide_con_sklearn():
+    """El predictor NumPy asigna los mismos clusters que scaler.transform + kmeans.predict"""
+    modelo = joblib.load(MODEL_CLUSTER_PATH)
+    predictor = PredictorClustersNumpy.desde_sklearn(modelo)
+
+    X = _signos_aleatorios(5000, semilla=1)
+    X_scaled = modelo["scaler"].transform(pd.DataFrame(X, columns=COLUMNAS_SIGNOS))
+    clusters, distancias = predictor.asignar(X)
+
+    assert np.array_equal(predictor.escalar(X), X_scaled)
+    assert np.array_equal(clusters, modelo["model"].predict(X_scaled))
+    assert np.allclose(distancias, modelo["model"].transform(X_scaled).min(axis=1))
@@ -0,0 +1,72 @@
+"""
+Tests del registro de modelos en memoria (carga única y recarga en caliente).
+Ejecuta: python -m pytest tests/test_registro_modelos.py
+"""
+
+import sys
+import os
+import shutil
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+from ml.registro import RegistroModelos, guardar_modelo
+
+RUTA_MODELO = os.path.join(os.path.dirname(__file__), "..", "ml", "model_infarto.pkl")
+
+
+def test_carga_unica(tmp_path):
+    """El artefacto se deserializa una sola vez y luego se sirve desde memoria"""
+    ruta = str(tmp_path / "modelo.pkl")
+    shutil.copy(RUTA_MODELO, ruta)
+    registro = RegistroModelos()
+
+    primero = registro.obtener(ruta)
+    segundo = registro.obtener(ruta)
+
+    assert primero is segundo
+    estadisticas = registro.estadisticas()[0]
+    assert estadisticas["cargas"] == 1
+    assert estadisticas["aciertos"] == 1
+    assert estadisticas["segundos_ultima_carga"] > 0
+
+
+def test_recarga_tras_guardar(tmp_path):
+    """Al guardar una versión nueva el registro la recarga en el siguiente acceso"""
+    ruta = str(tmp_path / "modelo.pkl")
+    registro = RegistroModelos()
+
+    guardar_modelo({"version": 1}, ruta)
+    assert registro.obtener(ruta)["version"] == 1
+
+    guardar_modelo({"version": 2}, ruta)
+    assert registro.obtener(ruta)["version"] == 2
+    assert registro.estadisticas()[0]["cargas"] == 2
+    assert not [f for f in os.listdir(tmp_path) if f.endswith(".tmp")]
+
+
+def test_lectores_no_esperan_recarga(tmp_path):
+    """Mientras un hilo recarga, el resto recibe la versión anterior sin bloquearse"""
+    ruta = str(tmp_path / "modelo.pkl")
+    guardar_modelo({"version": 1}, ruta)
+    registro = RegistroModelos()
+    registro.obtener(ruta)
+
+    cargando = threading.Event()
+    liberar = threading.Event()
+
+    def cargador_lento(r):
+        cargando.set()
+        liberar.wait(5)
+        return {"version": 2}
+
+    guardar_modelo({"version": 2}, ruta)
+    hilo = threading.Thread(target=registro.obtener, args=(ruta, cargador_lento))
+    hilo.start()
+    cargando.wait(5)
+
+    assert registro.obtener(ruta)["version"] == 1
+    liberar.set()
+    hilo.join()
+    assert registro.obtener(ruta)["version"] == 2
+    assert registro.estadisticas()[0]["aciertos_durante_recarga"] == 1
@@ -0,0 +1,76 @@
+"""
+Tests de la serialización de respuestas de /graphql (respuesta_json.py) y del tipo Triaje.
+Ejecuta: python -m pytest tests/test_respuesta_json.py
+"""
+
+import sys
+import os
+import json
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+from respuesta_json import fragmentos_json, respuesta_json
+from db.connection import SessionLocal
+from ml.model import TriajeML
+
+
+def _triaje(i):
+    return {
+        "id_triaje": i, "nombre_paciente": f"Paciente_ñ_{i}", "temperatura": 38.5, "frecuencia_cardiaca": 120.0,
+        "frecuencia_respiratoria": 24.0, "saturacion_oxigeno": 88.0, "peso": 95.0, "estatura": 1.70,
+        "alergias": None, "enfermedades_cronicas": "hipertensión", "motivo_consulta": "dolor torácico",
+        "sufre_infarto": True,
+    }
+
+
+@pytest.fixture
+def triajes_riesgo():
+    db = SessionLocal()
+    db.add_all([TriajeML(**_triaje(i)) for i in range(1, 31)])
+    db.add(TriajeML(**{**_triaje(31), "sufre_infarto": False}))
+    db.commit()
+    db.close()
+    yield
+    db = SessionLocal()
+    db.query(TriajeML).delete()
+    db.commit()
+    db.close()
+
+
+def test_fragmentos_equivalen_a_json():
+    """Codificar por bloques da el mismo JSON que de una vez"""
+    valor = {"data": {"a": [_triaje(i) for i in range(23)], "b": list(range(7)), "c": [], "d": None}}
+
+    cuerpo = b"".join(fragmentos_json(valor, tamano_bloque=5))
+
+    assert json.loads(cuerpo) == valor
+
+
+def test_respuesta_por_partes_sobre_el_umbral():
+    """Hasta el umbral el cuerpo va de una vez; por encima se envía por partes"""
+    valor = {"data": {"triajes": [_triaje(i) for i in range(2000)]}}
+
+    pequena = respuesta_json({"data": {"hello": "hola"}})
+    grande = respuesta_json(valor, umbral_streaming=10_000)
+
+    assert not pequena.is_streamed and pequena.content_length
+    assert grande.is_streamed
+    assert json.loads(b"".join(grande.response)) == valor
+
+
+def test_obtener_triajes_riesgo_tipado(triajes_riesgo):
+    """obtenerTriajesRiesgo devuelve objetos Triaje con los campos pedidos, no cadenas JSON"""
+    from app import app
+
+    consulta = "mutation { obtenerTriajesRiesgo { ok triajes { idTriaje nombrePaciente enfermedadesCronicas } } }"
+    respuesta = app.test_client().post("/graphql", json={"query": consulta})
+
+    assert respuesta.status_code == 200 and respuesta.mimetype == "application/json"
+    resultado = respuesta.get_json()["data"]["obtenerTriajesRiesgo"]
+    assert resultado["ok"]
+    assert resultado["triajes"] == [
+        {"idTriaje": i, "nombrePaciente": f"Paciente_ñ_{i}", "enfermedadesCronicas": "hipertensión"}
+        for i in range(1, 31)
+    ]
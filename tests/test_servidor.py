@@ -0,0 +1,80 @@
+"""
+Tests del modo de servicio en producción: preparación, líder del planificador y endpoint /graphql.
+Ejecuta: python -m pytest tests/test_servidor.py
+"""
+
+import sys
+import os
+import subprocess
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import servidor
+from cache_graphql import huella_consulta
+
+RAIZ = os.path.join(os.path.dirname(__file__), "..")
+
+
+def test_un_solo_lider(tmp_path, monkeypatch):
+    """Solo un proceso obtiene el bloqueo del planificador, y lo conserva"""
+    lock = str(tmp_path / "planificador.lock")
+    monkeypatch.setattr(servidor, "LOCK_PLANIFICADOR", lock)
+    monkeypatch.setattr(servidor, "_archivo_lider", None)
+
+    assert servidor.es_lider() and servidor.es_lider()
+
+    codigo = f"import servidor; servidor.LOCK_PLANIFICADOR = {lock!r}; print(servidor.es_lider())"
+    otro = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+    assert otro.stdout.strip() == "False"
+
+    # Al liberarse (el líder termina) otro proceso toma el relevo
+    servidor._archivo_lider.close()
+    monkeypatch.setattr(servidor, "_archivo_lider", None)
+    otro = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, capture_output=True, text=True, check=True)
+    assert otro.stdout.strip() == "True"
+
+
+def test_salud_y_preparacion(monkeypatch):
+    """/listo responde 503 hasta que los modelos están cargados; /graphql acepta consultas persistidas"""
+    from app import app
+
+    monkeypatch.setattr(servidor, "_modelos", {})
+    cliente = app.test_client()
+    assert cliente.get("/salud").status_code == 200
+    assert cliente.get("/listo").status_code == 503
+
+    modelos = servidor.precargar_modelos()
+    assert all(m["ok"] for m in modelos.values())
+    respuesta = cliente.get("/listo")
+    assert respuesta.status_code == 200 and respuesta.get_json()["base_datos"]["ok"]
+
+    consulta = "{ hello }"
+    extensiones = {"persistedQuery": {"version": 1, "sha256Hash": huella_consulta(consulta)}}
+    no_encontrada = cliente.post("/graphql", json={"extensions": extensiones}).get_json()
+    assert no_encontrada["errors"][0]["message"] == "PersistedQueryNotFound"
+    cliente.post("/graphql", json={"query": consulta, "extensions": extensiones})
+    assert cliente.post("/graphql", json={"extensions": extensiones}).get_json()["data"]["hello"]
+    assert cliente.get("/graphql/estadisticas").get_json()["aciertos"] >= 1
+
+
+def test_preparacion_reintenta_modelos_fallidos(monkeypatch):
+    """Un fallo transitorio al arrancar no deja /listo en 503: el modelo se reintenta al consultar"""
+    from app import app
+    from ml import model
+
+    cargar = model.precargar_modelo
+    fallos = iter([RuntimeError("BD no disponible")])
+
+    def precargar_con_fallo():
+        error = next(fallos, None)
+        if error:
+            raise error
+        return cargar()
+
+    monkeypatch.setattr(model, "precargar_modelo", precargar_con_fallo)
+    monkeypatch.setattr(servidor, "_modelos", {})
+    monkeypatch.setattr(servidor, "REINTENTO_PRECARGA_SEGUNDOS", 0)
+    assert not servidor.precargar_modelos()["infarto"]["ok"]
+
+    respuesta = app.test_client().get("/listo")
+    assert respuesta.status_code == 200 and respuesta.get_json()["modelos"]["infarto"]["ok"]
@@ -123,7 +123,7 @@ def test_entrenamiento():
 
     query = """
     mutation {
-        entrenarModeloEcg {
+        entrenarModeloEcg(esperar: true) {
             ok
             message
             resultado {
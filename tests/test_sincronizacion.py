@@ -0,0 +1,130 @@
+"""
+Tests de la sincronización de triajes desde el backend.
+Ejecuta: python -m pytest tests/test_sincronizacion.py
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+from db.connection import SessionLocal
+from ml.model import TriajeML, predecir_pacientes_lote
+from backend_stub import triaje_backend
+from ml.ingesta import ClienteTriajes
+from ml.utils import (
+    EstadoSincronizacion,
+    FUENTE_GRAPHQL,
+    FUENTE_REST,
+    insertar_triajes_lote,
+    leer_marca_agua,
+    sincronizar_triajes,
+)
+
+
+@pytest.fixture(autouse=True)
+def bd_vacia():
+    yield
+    db = SessionLocal()
+    db.query(TriajeML).delete()
+    db.query(EstadoSincronizacion).delete()
+    db.commit()
+    db.close()
+
+
+def test_insercion_por_lotes_omite_existentes():
+    """Los triajes ya guardados o repetidos se omiten y los nuevos se insertan con su predicción"""
+    primera = insertar_triajes_lote([triaje_backend(i) for i in range(1, 11)], tamano_lote=4)
+    assert primera["insertados"] == 10
+    assert primera["omitidos"] == 0
+
+    segunda = [triaje_backend(i) for i in range(5, 16)] + [triaje_backend(15)]
+    resultado = insertar_triajes_lote(segunda, tamano_lote=4)
+    assert resultado["insertados"] == 5
+    assert resultado["omitidos"] == 7
+    assert resultado["segundos"] >= 0
+
+    db = SessionLocal()
+    guardados = db.query(TriajeML).order_by(TriajeML.id_triaje).all()
+    db.close()
+    assert [t.id_triaje for t in guardados] == list(range(1, 16))
+    assert guardados[0].nombre_paciente == "Paciente_1"
+
+    esperado = predecir_pacientes_lote(
+        [
+            {
+                "temperatura": t.temperatura,
+                "frecuencia_cardiaca": t.frecuencia_cardiaca,
+                "frecuencia_respiratoria": t.frecuencia_respiratoria,
+                "saturacion_oxigeno": t.saturacion_oxigeno,
+                "peso": t.peso,
+                "estatura": t.estatura,
+            }
+            for t in guardados
+        ]
+    )
+    assert [t.sufre_infarto for t in guardados] == [e["sufre_infarto"] for e in esperado]
+
+
+def test_insercion_concurrente_no_cuenta_descartados(monkeypatch):
+    """Los triajes que otra sincronización inserta entre la consulta y el INSERT cuentan como omitidos"""
+    from ml import utils
+
+    predecir = utils.predecir_pacientes_lote
+
+    def predecir_y_adelantarse(filas):
+        # Otra sincronización guarda los triajes 2 y 3 mientras se predice el lote
+        otra = SessionLocal()
+        otra.add_all([TriajeML(id_triaje=i, nombre_paciente=f"Otro_{i}", sufre_infarto=False) for i in (2, 3)])
+        otra.commit()
+        otra.close()
+        return predecir(filas)
+
+    monkeypatch.setattr(utils, "predecir_pacientes_lote", predecir_y_adelantarse)
+    resultado = insertar_triajes_lote([triaje_backend(i) for i in range(1, 6)], tamano_lote=10)
+
+    assert resultado["insertados"] == 3
+    assert resultado["omitidos"] == 2
+
+
+@pytest.mark.parametrize("admite_filtro", [True, False])
+def test_sincronizacion_incremental(backend_triajes, admite_filtro):
+    """Tras la primera sincronización solo se procesan los triajes posteriores a la marca de agua"""
+    backend_triajes.ids = list(range(1, 21))
+    backend_triajes.admite_filtro = admite_filtro
+    cliente = ClienteTriajes(url_graphql=backend_triajes.url_graphql, tamano_pagina=8)
+
+    primera = sincronizar_triajes(FUENTE_GRAPHQL, cliente=cliente)
+    assert primera["insertados"] == 20
+    assert leer_marca_agua(FUENTE_GRAPHQL) == 20
+
+    backend_triajes.ids.extend(range(21, 26))
+    segunda = sincronizar_triajes(FUENTE_GRAPHQL, cliente=cliente)
+    assert segunda["desde_id"] == 20
+    assert segunda["recibidos"] == 5
+    assert segunda["insertados"] == 5
+    assert segunda["omitidos"] == 0
+    if admite_filtro:
+        assert backend_triajes.peticiones[-1] == ("graphql", {"pagina": 0, "tamano": 8, "desdeId": 20})
+
+    completa = sincronizar_triajes(FUENTE_GRAPHQL, completa=True, cliente=cliente)
+    assert completa["recibidos"] == 25
+    assert completa["insertados"] == 0
+    assert completa["omitidos"] == 25
+    assert leer_marca_agua(FUENTE_GRAPHQL) == 25
+
+
+def test_sincronizacion_rest_usa_desde_id(backend_triajes):
+    """La ruta REST envía desdeId con la marca de agua de su propia fuente"""
+    backend_triajes.ids = list(range(1, 11))
+    cliente = ClienteTriajes(url_rest=backend_triajes.url_rest, tamano_pagina=100)
+
+    assert sincronizar_triajes(FUENTE_REST, cliente=cliente)["insertados"] == 10
+    assert sincronizar_triajes(FUENTE_REST, cliente=cliente)["recibidos"] == 0
+    assert backend_triajes.peticiones == [
+        ("rest", {"page": 0, "size": 100}),
+        ("rest", {"page": 0, "size": 100, "desdeId": 10}),
+    ]
+    assert leer_marca_agua(FUENTE_GRAPHQL) is None
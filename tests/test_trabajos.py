@@ -0,0 +1,73 @@
+"""
+Tests de los entrenamientos asíncronos en el pool de procesos.
+Ejecuta: python -m pytest tests/test_trabajos.py
+"""
+
+import sys
+import os
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+
+from schema import schema
+from ml.trabajos import gestor_trabajos, encolar_entrenamiento, obtener_trabajo, ESTADO_COMPLETADO
+
+
+def test_entrenamiento_ecg_en_segundo_plano():
+    """El trabajo se encola al instante y termina completado con su duración y resultado"""
+    inicio = time.time()
+    id_trabajo = encolar_entrenamiento("ecg")
+    assert time.time() - inicio < 1.0
+    assert obtener_trabajo(id_trabajo)["estado"] in ("pendiente", "en_ejecucion")
+
+    trabajo = gestor_trabajos.esperar(id_trabajo, timeout=60)
+
+    assert trabajo["estado"] == ESTADO_COMPLETADO
+    assert trabajo["progreso"] == 1.0
+    assert trabajo["duracion_segundos"] >= 1.0
+    assert trabajo["resultado"]["estado"] == "Completado"
+
+
+def test_tipo_desconocido():
+    """Un tipo de entrenamiento no registrado se rechaza antes de encolar"""
+    with pytest.raises(ValueError):
+        encolar_entrenamiento("inexistente")
+
+
+def test_query_estado_trabajo():
+    """La mutation devuelve el ID del trabajo y la query consulta su estado"""
+    result = schema.execute("mutation { entrenarModeloEcg { ok idTrabajo } }")
+    assert not result.errors
+    id_trabajo = result.data["entrenarModeloEcg"]["idTrabajo"]
+    assert result.data["entrenarModeloEcg"]["ok"]
+
+    gestor_trabajos.esperar(id_trabajo, timeout=60)
+    query = """
+    query($id: String!) {
+        trabajoEntrenamiento(id: $id) { id tipo estado progreso duracionSegundos }
+    }
+    """
+    result = schema.execute(query, variables={"id": id_trabajo})
+
+    assert not result.errors
+    trabajo = result.data["trabajoEntrenamiento"]
+    assert trabajo["tipo"] == "ecg"
+    assert trabajo["estado"] == ESTADO_COMPLETADO
+    assert schema.execute(query, variables={"id": "no-existe"}).data["trabajoEntrenamiento"] is None
+
+
+def test_estado_visible_desde_otro_worker():
+    """Otro worker (otro gestor, sin el trabajo en memoria) lee el estado de la BD"""
+    from ml.trabajos import GestorTrabajos
+
+    id_trabajo = encolar_entrenamiento("ecg")
+    otro_worker = GestorTrabajos()
+    assert otro_worker.obtener(id_trabajo)["estado"] in ("pendiente", "en_ejecucion", ESTADO_COMPLETADO)
+
+    local = gestor_trabajos.esperar(id_trabajo, timeout=60)
+    remoto = otro_worker.obtener(id_trabajo)
+    assert remoto == local and remoto["estado"] == ESTADO_COMPLETADO
+    assert id_trabajo in [t["id"] for t in otro_worker.listar()]
+    assert otro_worker.obtener("no-existe") is None
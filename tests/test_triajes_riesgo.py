@@ -0,0 +1,134 @@
+"""
+Tests de la query paginada de pacientes con riesgo de infarto (ml/triajes_riesgo.py).
+Ejecuta: python -m pytest tests/test_triajes_riesgo.py
+"""
+
+import sys
+import os
+
+sys.path.append(os.path.join(os.path.dirname(__file__), ".."))
+
+import pytest
+from sqlalchemy import create_engine, event, inspect, text
+
+from schema import schema
+from db.connection import engine
+from ml.model import predecir_pacientes_lote
+from ml.triajes_riesgo import completar_probabilidades_riesgo
+
+
+@pytest.fixture
+def triajes_riesgo(triajes_en_bd):
+    # Sin probabilidad_infarto, como los triajes guardados antes de existir la columna
+    triajes = triajes_en_bd(40)
+    # Lo que hace init_db al arrancar con triajes antiguos
+    assert completar_probabilidades_riesgo() == sum(t["sufre_infarto"] for t in triajes)
+    return [t for t in triajes if t["sufre_infarto"]]
+
+
+def _recorrer(orden, first=7, campos="idTriaje probabilidadInfarto"):
+    query = f"""
+    query($first: Int, $after: Int, $orden: String) {{
+        triajesRiesgo(first: $first, after: $after, orden: $orden) {{ {campos} }}
+    }}
+    """
+    vistos, after = [], None
+    while True:
+        result = schema.execute(query, variables={"first": first, "after": after, "orden": orden})
+        assert not result.errors
+        pagina = result.data["triajesRiesgo"]
+        if not pagina:
+            return vistos
+        vistos.extend(pagina)
+        after = pagina[-1]["idTriaje"]
+
+
+def test_paginacion_por_id_y_por_probabilidad(triajes_riesgo):
+    """Los dos órdenes recorren todos los pacientes con riesgo sin repetir ni saltar"""
+    por_id = _recorrer("id")
+    assert [t["idTriaje"] for t in por_id] == [t["id_triaje"] for t in triajes_riesgo]
+    esperadas = [p["probabilidad"] for p in predecir_pacientes_lote(triajes_riesgo)]
+    assert [t["probabilidadInfarto"] for t in por_id] == esperadas
+
+    por_probabilidad = _recorrer("probabilidad", first=5)
+    clave = [(t["probabilidadInfarto"], t["idTriaje"]) for t in por_probabilidad]
+    assert clave == sorted(clave, reverse=True)
+    assert sorted(t["idTriaje"] for t in por_probabilidad) == [t["id_triaje"] for t in triajes_riesgo]
+    assert completar_probabilidades_riesgo() == 0
+
+    result = schema.execute('{ triajesRiesgo(orden: "edad") { idTriaje } }')
+    assert "Orden no válido" in result.errors[0].message
+    for first in (0, -1):
+        result = schema.execute(f"{{ triajesRiesgo(first: {first}) {{ idTriaje }} }}")
+        assert "first" in result.errors[0].message
+
+
+def test_solo_columnas_pedidas(triajes_riesgo):
+    """El SELECT lee solo las columnas de los campos pedidos (también dentro de fragmentos)"""
+    sentencias = []
+
+    def capturar(conn, cursor, sentencia, *args):
+        sentencias.append(sentencia)
+
+    event.listen(engine, "before_cursor_execute", capturar)
+    try:
+        result = schema.execute("""
+        { triajesRiesgo(first: 3) { ...Datos } }
+        fragment Datos on Triaje { nombrePaciente }
+        """)
+    finally:
+        event.remove(engine, "before_cursor_execute", capturar)
+
+    assert not result.errors and len(result.data["triajesRiesgo"]) == 3
+    (lectura,) = [s for s in sentencias if s.lstrip().startswith("SELECT")]
+    columnas = lectura.split("FROM")[0]
+    assert "nombre_paciente" in columnas and "id_triaje" in columnas
+    assert "temperatura" not in columnas and "probabilidad_infarto" not in columnas
+
+
+def test_lectura_no_escribe(triajes_en_bd):
+    """La query solo hace SELECT: sin probabilidad, el paciente no aparece en el orden por probabilidad"""
+    triajes_en_bd(6)
+    sentencias = []
+
+    def capturar(conn, cursor, sentencia, *args):
+        sentencias.append(sentencia)
+
+    event.listen(engine, "before_cursor_execute", capturar)
+    try:
+        result = schema.execute('{ triajesRiesgo(orden: "probabilidad") { idTriaje probabilidadInfarto } }')
+        por_id = schema.execute("{ triajesRiesgo { idTriaje probabilidadInfarto } }")
+    finally:
+        event.remove(engine, "before_cursor_execute", capturar)
+
+    assert result.data["triajesRiesgo"] == []
+    assert all(t["probabilidadInfarto"] is None for t in por_id.data["triajesRiesgo"])
+    assert all(s.lstrip().startswith("SELECT") for s in sentencias)
+
+
+def test_indices_parciales_y_migracion(tmp_path, monkeypatch):
+    """init_db agrega probabilidad_infarto e índices parciales a una tabla triajes_ml antigua"""
+    import db.connection as conexion
+
+    motor = create_engine(f"sqlite:///{tmp_path / 'antigua.db'}")
+    with motor.begin() as c:
+        c.execute(text(
+            "CREATE TABLE triajes_ml (id_triaje INTEGER PRIMARY KEY, nombre_paciente VARCHAR(100), "
+            "temperatura FLOAT, frecuencia_cardiaca FLOAT, frecuencia_respiratoria FLOAT, "
+            "saturacion_oxigeno FLOAT, peso FLOAT, estatura FLOAT, alergias VARCHAR(255), "
+            "enfermedades_cronicas VARCHAR(255), motivo_consulta VARCHAR(255), sufre_infarto BOOLEAN)"
+        ))
+    monkeypatch.setattr(conexion, "engine", motor)
+    conexion.init_db()
+
+    inspector = inspect(motor)
+    assert "probabilidad_infarto" in {c["name"] for c in inspector.get_columns("triajes_ml")}
+    assert {"ix_triajes_ml_riesgo_id", "ix_triajes_ml_riesgo_probabilidad"} <= {
+        i["name"] for i in inspector.get_indexes("triajes_ml")
+    }
+    with motor.connect() as c:
+        plan = c.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id_triaje FROM triajes_ml WHERE sufre_infarto = 1 "
+            "ORDER BY probabilidad_infarto DESC, id_triaje DESC LIMIT 50"
+        )).all()
+    assert "ix_triajes_ml_riesgo_probabilidad" in " ".join(str(fila) for fila in plan)
@@ -0,0 +1,19 @@
+"""
+Punto de entrada WSGI para producción.
+Ejecuta: gunicorn -c gunicorn.conf.py
+
+Con preload_app (gunicorn.conf.py) este módulo se importa una sola vez en el
+proceso maestro: las tablas se crean y los modelos se cargan antes del fork.
+"""
+
+from app import app, iniciar_planificador  # noqa: F401
+from db.connection import init_db
+from servidor import precargar_modelos
+
+try:
+    init_db()
+except Exception as e:
+    # /listo responde 503 mientras la BD no esté accesible
+    print(f"⚠️ No se pudieron crear las tablas: {str(e)}")
+
+precargar_modelos()